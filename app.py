@@ -1,7 +1,25 @@
-from flask import Flask, render_template, request, send_file, jsonify
+from flask import Flask, render_template, request, send_file, jsonify, url_for, Response, stream_with_context
 import os
 import logging
-from crawl.thodiamomo import crawl_momo_data
+import threading
+import zipfile
+from datetime import datetime
+from crawl.pipeline import DEFAULT_CHUNK_SIZE, SOURCES, crawl_sources, get_source
+from crawl.checkpoint import checkpoint_path, prune_checkpoints
+from crawl.thodiamomo import MomoSource, iter_momo_data, STAGE_SECONDS
+from crawl.ticketbox import TicketboxSource
+from crawl.http_client import configure_client
+from crawl.response_cache import ResponseCache
+from crawl.incremental import crawl_momo_incremental
+from services.jobs import JobQueue, DONE, file_lock
+from services.artifacts import ArtifactStore
+from common.formats import iter_json_array, iter_jsonl, gzip_stream
+from common.metrics import RunMetrics, registry
+from common.lazy import lazy_module
+from index.catalog import load_catalog
+
+# Chỉ cần numpy khi có truy vấn /nearby, /open_now: nạp lúc đó để worker khởi động nhanh
+open_hours = lazy_module('index.open_hours')
 
 # Thiết lập logging
 logging.basicConfig(level=logging.INFO)
@@ -14,12 +32,77 @@ UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'outputs'
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['OUTPUT_FOLDER'] = OUTPUT_FOLDER
+# Số luồng tải trang chi tiết merchant song song khi cào dữ liệu
+app.config['CRAWL_WORKERS'] = int(os.environ.get('CRAWL_WORKERS', 8))
+# Giới hạn số request/giây gửi tới MoMo (0 = không giới hạn)
+app.config['CRAWL_RATE_LIMIT'] = float(os.environ.get('CRAWL_RATE_LIMIT', 0))
+
+# HTTP client dùng chung cho crawler: pool kết nối đủ cho số luồng, có retry và rate limit
+configure_client(
+    pool_size=max(app.config['CRAWL_WORKERS'], 10),
+    rate=app.config['CRAWL_RATE_LIMIT'] or None
+)
+
+# Cache oaData của từng merchant giữa các lần cào (TTL tính bằng giây)
+app.config['OA_CACHE_PATH'] = os.environ.get('OA_CACHE_PATH', os.path.join(OUTPUT_FOLDER, 'cache', 'oa_cache.sqlite'))
+app.config['OA_CACHE_TTL'] = int(os.environ.get('OA_CACHE_TTL', 7 * 24 * 3600))
+oa_cache = ResponseCache(app.config['OA_CACHE_PATH'], ttl=app.config['OA_CACHE_TTL'])
+# Chi tiết sự kiện Ticketbox cache riêng (id sự kiện và id merchant có thể trùng nhau)
+app.config['TICKETBOX_CACHE_PATH'] = os.environ.get(
+    'TICKETBOX_CACHE_PATH', os.path.join(OUTPUT_FOLDER, 'cache', 'ticketbox_cache.sqlite')
+)
+ticketbox_cache = ResponseCache(app.config['TICKETBOX_CACHE_PATH'], ttl=app.config['OA_CACHE_TTL'])
+source_caches = {MomoSource.name: oa_cache, TicketboxSource.name: ticketbox_cache}
+# Endpoint Ticketbox chưa được đối chiếu với API thật (xem crawl/ticketbox.py): /process_ticketbox và
+# trang ticketbox giữ nguyên như cũ, nguồn ticketbox chỉ có trong /process_sources khi TICKETBOX_ENABLED=1
+app.config['TICKETBOX_ENABLED'] = os.environ.get('TICKETBOX_ENABLED') == '1'
+
+def enabled_sources():
+    return [name for name in SOURCES if name != TicketboxSource.name or app.config['TICKETBOX_ENABLED']]
+
+# Hàng đợi job cào dữ liệu chạy nền, giới hạn số job chạy đồng thời
+app.config['CRAWL_JOB_WORKERS'] = int(os.environ.get('CRAWL_JOB_WORKERS', 2))
+crawl_jobs = JobQueue(os.path.join(OUTPUT_FOLDER, 'jobs'), max_workers=app.config['CRAWL_JOB_WORKERS'])
+# File trạng thái của chế độ incremental dùng chung, chỉ cho một job incremental chạy một lúc
+# (khóa file nên có hiệu lực giữa các worker gunicorn)
+app.config['MOMO_STATE_PATH'] = os.path.join(OUTPUT_FOLDER, 'momo_state.json')
+CRAWL_JOB_SECONDS = registry.histogram(
+    'crawl_job_seconds', 'Duration of crawl jobs by source and mode', ('source', 'mode'),
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+)
 
 # Đảm bảo thư mục tồn tại
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 logger.info("Upload and output directories created successfully")
 
+# Kho file kết quả: mỗi job ghi ra file riêng (ghi tạm rồi rename), dọn theo tuổi/dung lượng.
+# Kết quả cào full giống hệt (cùng pageSize) trong RESULT_REUSE_SECONDS giây được dùng lại.
+app.config['ARTIFACT_MAX_BYTES'] = int(os.environ.get('ARTIFACT_MAX_BYTES', 2 * 1024 ** 3))
+app.config['ARTIFACT_MAX_AGE'] = int(os.environ.get('ARTIFACT_MAX_AGE', 7 * 24 * 3600))
+app.config['RESULT_REUSE_SECONDS'] = int(os.environ.get('RESULT_REUSE_SECONDS', 600))
+# File merchant cho /nearby (mặc định: kết quả cào full mới nhất) và số kết quả tối đa mỗi truy vấn
+app.config['MERCHANT_SOURCE'] = os.environ.get('MERCHANT_SOURCE')
+# COMPACT_JSON=1: file kết quả/stream JSON ghi mỗi merchant một dòng rút gọn thay vì indent=2
+app.config['COMPACT_JSON'] = os.environ.get('COMPACT_JSON') == '1'
+app.config['NEARBY_MAX_RESULTS'] = int(os.environ.get('NEARBY_MAX_RESULTS', 100))
+# Chỉ mục /search được lưu ở đây theo phiên bản file merchant, khởi động lại không phải dựng lại
+app.config['SEARCH_INDEX_FOLDER'] = os.environ.get('SEARCH_INDEX_FOLDER', os.path.join(OUTPUT_FOLDER, 'search_index'))
+artifacts = ArtifactStore(
+    os.path.join(OUTPUT_FOLDER, 'artifacts'),
+    max_bytes=app.config['ARTIFACT_MAX_BYTES'],
+    max_age=app.config['ARTIFACT_MAX_AGE']
+)
+artifacts.evict()
+
+# Tiến độ của các lần cào đang dở: job bị lỗi/worker bị kill thì lần gửi lại cùng yêu cầu
+# (cùng nguồn, cùng pageSize) cào tiếp từ trang còn thiếu thay vì từ đầu
+app.config['CHECKPOINT_FOLDER'] = os.environ.get('CHECKPOINT_FOLDER', os.path.join(OUTPUT_FOLDER, 'checkpoints'))
+prune_checkpoints(app.config['CHECKPOINT_FOLDER'])
+
+def crawl_checkpoint(name, page_size):
+    return checkpoint_path(app.config['CHECKPOINT_FOLDER'], name, page_size, DEFAULT_CHUNK_SIZE)
+
 @app.route('/')
 def home():
     return render_template('index.html')
@@ -32,32 +115,362 @@ def thodiamomo():
 def ticketbox():
     return render_template('ticketbox.html')
 
+def job_metrics(metrics, source_name, mode, fallback_records):
+    summary = metrics.summary()
+    CRAWL_JOB_SECONDS.observe(summary['wallSeconds'], source=source_name, mode=mode)
+    records = summary['counts'].get('records', fallback_records)
+    summary['recordsPerSecond'] = round(records / summary['wallSeconds'], 2) if summary['wallSeconds'] else 0.0
+    return summary
+
+def crawl_to_artifacts(job, names, page_size):
+    # Cào full các nguồn song song, mỗi nguồn một file trong kho; nguồn có kết quả giống hệt
+    # (cùng pageSize) trong RESULT_REUSE_SECONDS giây thì dùng lại. Trả về {tên nguồn: kết quả}.
+    results = {}
+    crawls = []
+    pending = []
+    progress = {}
+    progress_lock = threading.Lock()
+
+    def reporter(name):
+        def report(done):
+            with progress_lock:
+                progress[name] = done
+                crawl_jobs.report_progress(job, sum(progress.values()))
+        return report
+
+    for name in names:
+        source = get_source(name, cache=source_caches.get(name))
+        key = (name, page_size, 'full', app.config['COMPACT_JSON'])
+        result = {'downloadName': f'{source.output_name}.json', 'mimetype': 'application/json'}
+        output_path = artifacts.find_recent(key, app.config['RESULT_REUSE_SECONDS'])
+        if output_path is not None:
+            logger.info(f"Reusing recent {name} result: {output_path}")
+            results[name] = dict(result, path=output_path, reused=True)
+            reporter(name)(page_size)
+            continue
+        artifact = artifacts.create(key, f'.{name}.json')
+        metrics = source.run_metrics()
+        crawls.append({
+            'source': source,
+            'limit': page_size,
+            'output_path': artifact.tmp_path,
+            'max_workers': app.config['CRAWL_WORKERS'],
+            'progress': reporter(name),
+            'metrics': metrics,
+            'compact': app.config['COMPACT_JSON'],
+            'checkpoint_dir': crawl_checkpoint(name, page_size),
+            # Mỗi nguồn xong là commit ngay (trước khi xóa checkpoint của nó): nguồn khác lỗi thì
+            # lần chạy lại dùng lại file này thay vì cào lại từ đầu
+            'on_complete': lambda _, artifact=artifact: artifacts.commit(artifact)
+        })
+        pending.append((name, artifact, metrics, result))
+    try:
+        output_paths = crawl_sources(crawls)
+    except Exception:
+        for _, artifact, _, _ in pending:
+            artifacts.discard(artifact)
+        raise
+    for (name, _, metrics, result), output_path in zip(pending, output_paths):
+        logger.info(f"{name} processed successfully: {output_path}")
+        results[name] = dict(result, path=output_path, reused=False,
+                             metrics=job_metrics(metrics, name, 'full', progress.get(name, 0)))
+    return results
+
+def run_source_crawl(job, name, page_size):
+    # Chạy trong pool của crawl_jobs; kết quả là thông tin file để tải về kèm thống kê từng bước
+    return crawl_to_artifacts(job, [name], page_size)[name]
+
+def run_sources_crawl(job, names, page_size):
+    # Nhiều nguồn trong một job: các file kết quả được gói chung vào một file zip
+    results = crawl_to_artifacts(job, names, page_size)
+    artifact = artifacts.create(('sources', job.id), '.zip')
+    try:
+        with zipfile.ZipFile(artifact.tmp_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for result in results.values():
+                archive.write(result['path'], result['downloadName'])
+        output_path = artifacts.commit(artifact)
+    except Exception:
+        artifacts.discard(artifact)
+        raise
+    return {
+        'path': output_path, 'downloadName': 'crawl_results.zip', 'mimetype': 'application/zip', 'reused': False,
+        'sources': {
+            name: {'reused': result['reused'], 'metrics': result.get('metrics')} for name, result in results.items()
+        }
+    }
+
+def run_momo_crawl(job, page_size, mode):
+    if mode != 'incremental':
+        return run_source_crawl(job, 'thodiamomo', page_size)
+    # Delta phụ thuộc trạng thái lần cào trước nên không bao giờ dùng lại
+    metrics = RunMetrics(STAGE_SECONDS)
+    artifact = artifacts.create(('thodiamomo', 'delta', job.id), '.jsonl')
+    try:
+        with file_lock(f"{app.config['MOMO_STATE_PATH']}.lock"):
+            crawl_momo_incremental(
+                page_size,
+                state_path=app.config['MOMO_STATE_PATH'],
+                delta_path=artifact.tmp_path,
+                max_workers=app.config['CRAWL_WORKERS'],
+                cache=oa_cache,
+                progress=lambda done: crawl_jobs.report_progress(job, done),
+                metrics=metrics,
+                checkpoint_dir=crawl_checkpoint('thodiamomo', page_size)
+            )
+        output_path = artifacts.commit(artifact)
+    except Exception:
+        artifacts.discard(artifact)
+        raise
+    logger.info(f"MoMo processed successfully: {output_path}")
+    return {'path': output_path, 'downloadName': 'momo_delta.jsonl', 'mimetype': 'application/x-ndjson',
+            'reused': False, 'metrics': job_metrics(metrics, 'thodiamomo', mode, job.progress)}
+
+def page_size_arg():
+    # pageSize của form (mặc định 10), None nếu không phải số nguyên dương
+    page_size = request.form.get('pageSize', '10')
+    if not page_size.isdigit() or int(page_size) <= 0:
+        return None
+    return int(page_size)
+
+def job_response(job, created):
+    return jsonify({
+        'status': job.status,
+        'jobId': job.id,
+        'deduplicated': not created,
+        'statusUrl': url_for('job_status', job_id=job.id),
+        'resultUrl': url_for('job_result', job_id=job.id)
+    }), 202
+
 @app.route('/process_thodiamomo', methods=['POST'])
 def process_thodiamomo():
     try:
-        # Lấy pageSize từ form
-        page_size = request.form.get('pageSize', '10')  # Mặc định là 10 nếu không nhập
-        if not page_size.isdigit() or int(page_size) <= 0:
+        # Lấy pageSize từ form, mặc định là 10 nếu không nhập
+        page_size = page_size_arg()
+        if page_size is None:
             return jsonify({'status': 'error', 'message': 'pageSize phải là số nguyên dương'}), 400
 
-        # Gọi hàm cào dữ liệu
-        output_path = crawl_momo_data(int(page_size))
-        
-        # Trả file JSON về máy người dùng
-        logger.info(f"MoMo processed successfully: {output_path}")
-        return send_file(
-            output_path,
-            as_attachment=True,
-            download_name='momo_data.json',
-            mimetype='application/json'
+        # mode=incremental: chỉ trả về các merchant thêm/sửa/xóa so với lần cào trước
+        mode = request.form.get('mode', 'full')
+        if mode not in ('full', 'incremental'):
+            return jsonify({'status': 'error', 'message': 'mode phải là full hoặc incremental'}), 400
+
+        # Tạo job chạy nền và trả về job id ngay; yêu cầu giống hệt đang chạy dùng lại job cũ
+        job, created = crawl_jobs.submit(
+            ('thodiamomo', page_size, mode),
+            lambda job: run_momo_crawl(job, page_size, mode),
+            total=page_size
         )
+        return job_response(job, created)
     except Exception as e:
         logger.error(f"Error in process_thodiamomo: {e}")
         return jsonify({'status': 'error', 'message': f'Error processing MoMo data: {str(e)}'}), 500
 
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = crawl_jobs.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Không tìm thấy job'}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = crawl_jobs.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Không tìm thấy job'}), 404
+    if job['status'] != DONE:
+        return jsonify({'status': job['status'], 'message': job['error'] or 'Job chưa hoàn thành'}), 409
+    result = job['result']
+    if not os.path.exists(result['path']):
+        # File kết quả đã bị dọn khỏi kho
+        return jsonify({'status': 'error', 'message': 'Kết quả đã hết hạn, hãy chạy lại'}), 410
+    return send_file(
+        os.path.abspath(result['path']),
+        as_attachment=True,
+        download_name=result['downloadName'],
+        mimetype=result['mimetype']
+    )
+
+@app.route('/stream_thodiamomo', methods=['POST'])
+def stream_thodiamomo():
+    # Trả từng merchant về client ngay khi cào xong thay vì đợi cả file.
+    # format=jsonl (mặc định) hoặc json (mảng JSON); gzip=1 để nén trực tiếp.
+    page_size = request.form.get('pageSize', '10')
+    if not page_size.isdigit() or int(page_size) <= 0:
+        return jsonify({'status': 'error', 'message': 'pageSize phải là số nguyên dương'}), 400
+    output_format = request.form.get('format', 'jsonl')
+    if output_format not in ('jsonl', 'json'):
+        return jsonify({'status': 'error', 'message': 'format phải là jsonl hoặc json'}), 400
+    use_gzip = request.form.get('gzip') == '1'
+
+    records = iter_momo_data(int(page_size), max_workers=app.config['CRAWL_WORKERS'], cache=oa_cache)
+
+    def generate():
+        if output_format == 'jsonl':
+            chunks = iter_jsonl(records)
+        else:
+            chunks = iter_json_array(records, compact=app.config['COMPACT_JSON'])
+        try:
+            yield from chunks
+        except Exception as e:
+            # Header đã gửi nên không đổi được status code: JSON Lines nhận thêm một dòng lỗi,
+            # mảng JSON bị cắt cụt (thiếu dấu ]) để client biết kết quả không đầy đủ
+            logger.error(f"Error in stream_thodiamomo: {e}")
+            if output_format == 'jsonl':
+                yield from iter_jsonl([{'error': str(e)}])
+
+    body = generate()
+    headers = {'X-Accel-Buffering': 'no'}
+    if use_gzip:
+        body = gzip_stream(body)
+        headers['Content-Encoding'] = 'gzip'
+    mimetype = 'application/x-ndjson' if output_format == 'jsonl' else 'application/json'
+    return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
+
+def merchant_source():
+    # Dữ liệu cho các truy vấn: kết quả cào full mới nhất trong kho, không có thì dùng file mẫu
+    return (app.config['MERCHANT_SOURCE'] or artifacts.latest('.thodiamomo.json')
+            or os.path.join(OUTPUT_FOLDER, 'momo_data.json'))
+
+def float_arg(name):
+    value = request.args.get(name)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def time_arg():
+    # Tham số at (ISO 8601, không có múi giờ thì là giờ Việt Nam); None nếu không có, False nếu sai
+    value = request.args.get('at')
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return False
+
+@app.route('/nearby')
+def nearby():
+    # GET /nearby?lat=..&long=..&k=10[&radius=mét][&open=1[&at=ISO]]: k merchant gần nhất, hoặc trong
+    # bán kính nếu có radius; open=1 chỉ lấy merchant đang mở cửa (lúc at, mặc định bây giờ)
+    lat, lon = float_arg('lat'), float_arg('long')
+    if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return jsonify({'status': 'error', 'message': 'lat/long không hợp lệ'}), 400
+    k = request.args.get('k', '10')
+    max_results = app.config['NEARBY_MAX_RESULTS']
+    if not k.isdigit() or not 0 < int(k) <= max_results:
+        return jsonify({'status': 'error', 'message': f'k phải trong khoảng 1..{max_results}'}), 400
+    when = time_arg()
+    if when is False:
+        return jsonify({'status': 'error', 'message': 'at phải là thời điểm ISO 8601'}), 400
+    radius = float_arg('radius')
+    if 'radius' in request.args and (radius is None or radius <= 0):
+        return jsonify({'status': 'error', 'message': 'radius phải là số mét dương'}), 400
+
+    source = merchant_source()
+    if not os.path.exists(source):
+        return jsonify({'status': 'error', 'message': 'Chưa có dữ liệu merchant, hãy cào trước'}), 404
+    catalog = load_catalog(source, app.config['SEARCH_INDEX_FOLDER'])
+    mask = None
+    if request.args.get('open') == '1':
+        slot = open_hours.week_slot(when or datetime.now(open_hours.LOCAL_TIMEZONE))
+        mask = catalog.open_hours.open_mask(slot)
+    if radius is None:
+        positions, distances = catalog.spatial.nearest(lat, lon, int(k), mask=mask)
+    else:
+        positions, distances = catalog.spatial.radius(lat, lon, radius, limit=int(k), mask=mask)
+    results = [
+        dict(catalog.records[position], distanceMeters=round(float(distance), 1))
+        for position, distance in zip(positions, distances)
+    ]
+    return jsonify({'status': 'success', 'count': len(results), 'results': results})
+
+@app.route('/open_now')
+def open_now():
+    # GET /open_now[?at=ISO][&limit=100]: các merchant mở cửa tại thời điểm at (mặc định bây giờ)
+    when = time_arg()
+    if when is False:
+        return jsonify({'status': 'error', 'message': 'at phải là thời điểm ISO 8601'}), 400
+    limit = request.args.get('limit', str(app.config['NEARBY_MAX_RESULTS']))
+    if not limit.isdigit():
+        return jsonify({'status': 'error', 'message': 'limit phải là số nguyên không âm'}), 400
+    source = merchant_source()
+    if not os.path.exists(source):
+        return jsonify({'status': 'error', 'message': 'Chưa có dữ liệu merchant, hãy cào trước'}), 404
+    catalog = load_catalog(source, app.config['SEARCH_INDEX_FOLDER'])
+    positions = catalog.open_hours.open_at(when)
+    return jsonify({
+        'status': 'success',
+        'total': len(positions),
+        'results': [catalog.records[position] for position in positions[:int(limit)]]
+    })
+
+# Tham số lọc của /search -> facet của chỉ mục
+SEARCH_FILTERS = {'category': 'categories', 'ext': 'exts', 'type': 'type', 'district': 'district'}
+
+@app.route('/search')
+def search():
+    # GET /search?q=phở bò[&category=pho][&ext=wifi_available][&type=..][&district=Quận 1][&limit=20][&offset=0]:
+    # tìm toàn văn không phân biệt dấu (từ cuối khớp theo tiền tố), điểm cao trước. Một tham số lọc lặp lại
+    # hoặc cách nhau bởi dấu phẩy là HOẶC, các tham số khác nhau là VÀ; facets đếm trên toàn bộ kết quả
+    limit = request.args.get('limit', '20')
+    offset = request.args.get('offset', '0')
+    max_results = app.config['NEARBY_MAX_RESULTS']
+    if not limit.isdigit() or not 0 < int(limit) <= max_results:
+        return jsonify({'status': 'error', 'message': f'limit phải trong khoảng 1..{max_results}'}), 400
+    if not offset.isdigit():
+        return jsonify({'status': 'error', 'message': 'offset phải là số nguyên không âm'}), 400
+    filters = {
+        facet: [value for arg in request.args.getlist(name) for value in arg.split(',') if value]
+        for name, facet in SEARCH_FILTERS.items() if name in request.args
+    }
+
+    source = merchant_source()
+    if not os.path.exists(source):
+        return jsonify({'status': 'error', 'message': 'Chưa có dữ liệu merchant, hãy cào trước'}), 404
+    catalog = load_catalog(source, app.config['SEARCH_INDEX_FOLDER'])
+    positions, scores, total, facets = catalog.search.search(
+        request.args.get('q', ''), filters, limit=int(limit), offset=int(offset), facet_limit=20
+    )
+    results = [
+        dict(catalog.records[position], score=round(float(score), 4))
+        for position, score in zip(positions, scores)
+    ]
+    return jsonify({'status': 'success', 'total': total, 'count': len(results), 'results': results,
+                    'facets': facets})
+
+@app.route('/metrics')
+def metrics():
+    # Định dạng text của Prometheus: thời gian từng bước, độ trễ HTTP, số lần retry/lỗi, tốc độ cào
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/process_ticketbox', methods=['POST'])
 def process_ticketbox():
     return jsonify({'status': 'error', 'message': 'Chưa triển khai chức năng Ticketbox'}), 501
 
+@app.route('/process_sources', methods=['POST'])
+def process_sources():
+    # Cào song song nhiều nguồn trong một job: sources=thodiamomo,ticketbox (mặc định: mọi nguồn đang bật)
+    try:
+        page_size = page_size_arg()
+        if page_size is None:
+            return jsonify({'status': 'error', 'message': 'pageSize phải là số nguyên dương'}), 400
+        available = enabled_sources()
+        names = [name.strip() for name in request.form.get('sources', ','.join(available)).split(',') if name.strip()]
+        names = list(dict.fromkeys(names))
+        unknown = [name for name in names if name not in available]
+        if not names or unknown:
+            return jsonify({
+                'status': 'error', 'message': f"sources phải là các nguồn trong {', '.join(sorted(available))}"
+            }), 400
+        job, created = crawl_jobs.submit(
+            ('sources', tuple(sorted(names)), page_size),
+            lambda job: run_sources_crawl(job, names, page_size),
+            total=page_size * len(names)
+        )
+        return job_response(job, created)
+    except Exception as e:
+        logger.error(f"Error in process_sources: {e}")
+        return jsonify({'status': 'error', 'message': f'Error processing sources: {str(e)}'}), 500
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), debug=False)
\ No newline at end of file
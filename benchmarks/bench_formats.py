@@ -0,0 +1,82 @@
+# So sánh thời gian ghi, thời gian đọc và kích thước file giữa các định dạng đầu ra
+# trên các file mẫu trong repo. Chạy từ thư mục gốc:
+#   python -m benchmarks.bench_formats --repeat 1000
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from common.formats import (
+    normalize_processed_record, output_suffix, parquet_schema_for_crawl, pa, pq, read_jsonl, write_records,
+    zstandard,
+)
+
+SAMPLES = {
+    'crawl': 'outputs/momo_data.json',
+    'processed': 'preprocessor/ThoDiaMoMo_Version6.json',
+}
+
+
+def variants():
+    yield 'json', None
+    yield 'jsonl', None
+    yield 'jsonl', 'gzip'
+    if zstandard is not None:
+        yield 'jsonl', 'zstd'
+    if pa is not None:
+        yield 'parquet', None
+
+
+def write(records, path, output_format, compression, schema):
+    if output_format == 'json':
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+    else:
+        write_records(records, path, output_format, compression, schema)
+
+
+def read(path, output_format):
+    if output_format == 'json':
+        with open(path, 'r', encoding='utf-8') as f:
+            return len(json.load(f))
+    if output_format == 'jsonl':
+        return sum(1 for _ in read_jsonl(path))
+    return pq.read_table(path).num_rows
+
+
+def run(name, sample_path, repeat, workdir):
+    with open(sample_path, 'r', encoding='utf-8') as f:
+        records = json.load(f) * repeat
+    schema = None
+    if name == 'crawl' and pa is not None:
+        schema = parquet_schema_for_crawl()
+    else:
+        records = [normalize_processed_record(record) for record in records]
+
+    print(f'\n{name}: {sample_path} x{repeat} = {len(records)} records')
+    print(f'{"format":<14}{"write s":>10}{"read s":>10}{"size MB":>10}')
+    for output_format, compression in variants():
+        path = os.path.join(workdir, name + output_suffix(output_format, compression))
+        start = time.perf_counter()
+        write(records, path, output_format, compression, schema)
+        write_time = time.perf_counter() - start
+        start = time.perf_counter()
+        count = read(path, output_format)
+        read_time = time.perf_counter() - start
+        assert count == len(records)
+        label = output_format + (f'+{compression}' if compression else '')
+        print(f'{label:<14}{write_time:>10.3f}{read_time:>10.3f}{os.path.getsize(path) / 1e6:>10.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=100, help='nhân bản mẫu để có đủ dữ liệu đo')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, sample_path in SAMPLES.items():
+            run(name, sample_path, args.repeat, workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# Đo bộ nhớ giữ lại (tracemalloc) và thời gian nạp cùng một tập bản ghi ở ba dạng: list dict như
+# json.load trả về, DataFrame (pandas.read_json) và Merchant của common.models, cho cả bản ghi
+# crawl_momo_data lẫn process_momo. Kết quả quy về mỗi 100k bản ghi (đo thẳng 100k cần hơn 6 GB RAM
+# vì tracemalloc và chuỗi JSON nguồn cũng nằm trong bộ nhớ). Chạy từ thư mục gốc:
+#   python -m benchmarks.bench_models --size 20000
+import argparse
+import gc
+import io
+import json
+import time
+import tracemalloc
+
+import pandas as pd
+
+from common.formats import dataframe_records
+from common.models import Merchant
+from preprocessor.thodiamomo import transform_momo
+
+from .bench_pipeline import synthetic_export
+from .bench_serializer import synthetic_records
+
+PER_RECORDS = 100000
+DEFAULT_SIZE = 20000
+
+
+def crawl_lines(size):
+    return [json.dumps(record, ensure_ascii=False) for record in synthetic_records(size)]
+
+
+def processed_lines(size):
+    export = json.dumps(synthetic_export(size), ensure_ascii=False)
+    records = dataframe_records(transform_momo(pd.read_json(io.StringIO(export), orient='records')))
+    return [json.dumps(record, ensure_ascii=False) for record in records]
+
+
+def measure(build):
+    # (byte giữ lại sau khi dựng, giây) của build(); rác tạm thời trong lúc dựng không được tính
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    value = build()
+    seconds = time.perf_counter() - start
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del value
+    return retained, seconds
+
+
+def representations(lines, from_dict):
+    return {
+        'dict': lambda: [json.loads(line) for line in lines],
+        'DataFrame': lambda: pd.read_json(io.StringIO('\n'.join(lines)), orient='records', lines=True),
+        'Merchant': lambda: [from_dict(json.loads(line)) for line in lines],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=DEFAULT_SIZE, help='số bản ghi tổng hợp mỗi loại')
+    args = parser.parse_args()
+
+    datasets = {
+        'crawl': (crawl_lines(args.size), Merchant.from_crawl),
+        'processed': (processed_lines(args.size), Merchant.from_processed),
+    }
+    scale = PER_RECORDS / args.size
+    print(f'{"records":<11}{"dạng":<11}{"MB/100k":>10}{"so với dict":>13}{"giây":>8}')
+    for label, (lines, from_dict) in datasets.items():
+        baseline = None
+        for name, build in representations(lines, from_dict).items():
+            retained, seconds = measure(build)
+            baseline = baseline or retained
+            print(f'{label:<11}{name:<11}{retained * scale / 1e6:>10.1f}{retained / baseline:>12.0%}'
+                  f'{seconds:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+# Đo crawl_momo_data (qua máy chủ giả lập) và process_momo (trên dữ liệu tổng hợp) ở nhiều cỡ dữ liệu,
+# lưu kết quả vào benchmarks/results/ và so với lần chạy trước để phát hiện chậm đi. Chạy từ thư mục gốc:
+#   python -m benchmarks.bench_pipeline --sizes 1000,10000,100000 --latency 0.005 --workers 16
+#   python -m benchmarks.bench_pipeline --only process --compare benchmarks/results/<file>.json
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+
+from common.metrics import RunMetrics
+from crawl.http_client import configure_client
+from crawl.thodiamomo import crawl_momo_data
+from preprocessor.thodiamomo import read_momo, transform_momo, write_momo
+
+from .mock_momo import MockMomoProcess
+
+RESULTS_DIR = 'benchmarks/results'
+EXPORT_TEMPLATE_PATH = 'preprocessor/ThoDiaMoMo_Version2.json'
+DEFAULT_SIZES = (1000, 10000, 100000)
+# Chậm hơn lần trước quá ngưỡng này (tỉ lệ) thì báo regression
+DEFAULT_THRESHOLD = 0.10
+
+# Thành phần để ghép giá trị cho từng dòng, với số giá trị khác nhau gần với export thật: địa chỉ và tọa
+# độ gần như khác nhau ở mọi dòng, giờ mở cửa và giá lặp lại nhiều. Có cả giá trị "bẩn" thường gặp trong
+# file export để bộ tiền xử lý đi qua đủ nhánh
+WEEKDAYS = ['Thứ 2', 'Thứ 3', 'Thứ 4', 'Thứ 5', 'Thứ 6']
+OPEN_HOURS_DIRTY = [
+    'Thứ 7, 10:00 đến 02:00;  Thứ 5, 09:00 đến 10:00; ; Ngày lễ, 08:00 đến 09:00',
+    '', None,
+]
+PRICES_DIRTY = ['Liên hệ', '1.000.000 đ/ người', '', None]
+STREETS = ['Tôn Thất Đạm', 'Lương Hữu Khánh', 'Cống Quỳnh', 'Đinh Tiên Hoàng', 'Nguyễn Trãi', 'Lê Lợi',
+           'Hai Bà Trưng', 'Pasteur', 'Võ Văn Tần', 'Cách Mạng Tháng 8', 'Trần Hưng Đạo', 'Nguyễn Huệ']
+WARDS = ['Bến Nghé', 'Phạm Ngũ Lão', 'Nguyễn Cư Trinh', 'Đa Kao', 'Bến Thành', 'Võ Thị Sáu', 'Phường 7',
+         'Phường 12', 'Tân Định', 'Cầu Kho']
+DISTRICTS = ['Quận 1', 'Quận 3', 'Quận 5', 'Quận 10', 'Bình Thạnh', 'Phú Nhuận', 'Tân Bình', 'Gò Vấp']
+ADDRESSES_DIRTY = ['Chợ Bến Thành', 'Tầng 3, Vincom', '', None]
+
+
+def random_hours(rng):
+    return f'{rng.randrange(6, 11):02d}:{rng.choice(["00", "30"])} đến {rng.randrange(20, 24):02d}:00'
+
+
+def random_open_hour(rng):
+    # Như export thật: mỗi ngày một mục, cuối tuần có thể khác giờ, đôi khi nghỉ một ngày
+    if rng.random() < 0.2:
+        return rng.choice(OPEN_HOURS_DIRTY)
+    weekday = random_hours(rng)
+    weekend = weekday if rng.random() < 0.7 else random_hours(rng)
+    days = [(day, weekday) for day in WEEKDAYS]
+    days += [('Thứ 7', weekend), (rng.choice(['Chủ nhật', 'Chủ Nhật']), weekend)]
+    if rng.random() < 0.2:
+        days.pop(rng.randrange(len(days)))
+    if rng.random() < 0.1:
+        days.append(('Ngày lễ', random_hours(rng)))
+    return '; '.join(f'{day}, {hours}' for day, hours in days)
+
+
+def random_price(rng):
+    if rng.random() < 0.1:
+        return rng.choice(PRICES_DIRTY)
+    return f'{rng.randrange(10, 500) * 1000:,}'.replace(',', '.') + rng.choice(['đ/ người', 'đ'])
+
+
+def random_address(rng):
+    if rng.random() < 0.05:
+        return rng.choice(ADDRESSES_DIRTY)
+    number = f'{rng.randrange(1, 500)}{rng.choice(["", "", "A", "B", "/12"])}'
+    separator = rng.choice([' ', ', '])
+    return (f'{number}{separator}{rng.choice(STREETS)}, {rng.choice(WARDS)}, {rng.choice(DISTRICTS)}, '
+            f'Hồ Chí Minh')
+
+
+def synthetic_export(size, seed=0, template_path=EXPORT_TEMPLATE_PATH):
+    # File export ThoDiaMoMo tổng hợp: bản ghi mẫu nhân bản, tên/tọa độ/địa chỉ riêng từng dòng,
+    # giờ mở cửa và giá ghép ngẫu nhiên
+    rng = random.Random(seed)
+    with open(template_path, 'r', encoding='utf-8') as f:
+        templates = json.load(f)
+    rows = []
+    for index in range(size):
+        row = dict(templates[index % len(templates)])
+        row['name'] = f"{row['name']} #{index}"
+        lat, lon = 10.77 + rng.uniform(-0.1, 0.1), 106.70 + rng.uniform(-0.1, 0.1)
+        row['url_address'] = f'https://www.google.com/maps/search/?api=1&query={lat},{lon}'
+        row['open_hour'] = random_open_hour(rng)
+        row['price'] = random_price(rng)
+        row['address'] = random_address(rng)
+        rows.append(row)
+    return rows
+
+
+def bench_crawl(size, workdir, latency, error_rate, workers):
+    configure_client(pool_size=max(workers, 10), backoff_factor=0.01)
+    output_path = os.path.join(workdir, f'crawl_{size}.json')
+    metrics = RunMetrics()
+    with MockMomoProcess(size, latency=latency, error_rate=error_rate) as server:
+        start = time.perf_counter()
+        crawl_momo_data(size, max_workers=workers, main_url=server.main_url, thodia_url=server.base_url,
+                        output_path=output_path, metrics=metrics)
+        seconds = time.perf_counter() - start
+    summary = metrics.summary()
+    return {
+        'seconds': round(seconds, 4),
+        'recordsPerSecond': round(size / seconds, 1),
+        'stages': summary['stages'],
+        'counts': summary['counts'],
+        'bytes': os.path.getsize(output_path),
+    }
+
+
+def bench_process(size, workdir):
+    # Các bước của process_momo đo riêng: đọc/ghi JSON bằng pandas chiếm phần lớn thời gian cả hàm,
+    # transform là phần được vector hóa
+    input_path = os.path.join(workdir, f'export_{size}.json')
+    output_path = os.path.join(workdir, f'processed_{size}.json')
+    with open(input_path, 'w', encoding='utf-8') as f:
+        json.dump(synthetic_export(size), f, ensure_ascii=False)
+    stages = {}
+    start = time.perf_counter()
+    momo = read_momo(input_path)
+    stages['read'] = time.perf_counter() - start
+    momo = transform_momo(momo)
+    stages['transform'] = time.perf_counter() - start - stages['read']
+    write_momo(momo, output_path)
+    seconds = time.perf_counter() - start
+    stages['write'] = seconds - stages['read'] - stages['transform']
+    return {
+        'seconds': round(seconds, 4),
+        'recordsPerSecond': round(size / seconds, 1),
+        'stages': {name: round(value, 4) for name, value in stages.items()},
+        'bytes': os.path.getsize(output_path),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def latest_results(exclude=None):
+    paths = sorted(path for path in glob.glob(os.path.join(RESULTS_DIR, '*.json')) if path != exclude)
+    return paths[-1] if paths else None
+
+
+def compare(current, previous, threshold):
+    # So thời gian từng phép đo với lần trước; trả về số phép đo chậm đi quá ngưỡng
+    regressions = 0
+    print(f'\nSo với {previous["commit"]} ({previous["timestamp"]}):')
+    for name, results in current['results'].items():
+        for size, result in results.items():
+            before = previous['results'].get(name, {}).get(size)
+            if before is None:
+                continue
+            change = result['seconds'] / before['seconds'] - 1 if before['seconds'] else 0.0
+            flag = 'REGRESSION' if change > threshold else ''
+            regressions += bool(flag)
+            print(f'{name:<8}{size:>8}{before["seconds"]:>10.3f}{result["seconds"]:>10.3f}{change:>+9.1%}  {flag}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)))
+    parser.add_argument('--only', choices=['crawl', 'process'], default=None)
+    parser.add_argument('--latency', type=float, default=0.005, help='độ trễ mỗi request của máy chủ giả lập')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--workers', type=int, default=16, help='max_workers của crawler')
+    parser.add_argument('--compare', default=None, help='file kết quả để so (mặc định: lần chạy gần nhất)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'options': {'latency': args.latency, 'errorRate': args.error_rate, 'workers': args.workers},
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            if args.only in (None, 'crawl'):
+                result = bench_crawl(size, workdir, args.latency, args.error_rate, args.workers)
+                report['results'].setdefault('crawl', {})[str(size)] = result
+                print(f'crawl   {size:>8}: {result["seconds"]:.3f}s ({result["recordsPerSecond"]} rec/s)')
+            if args.only in (None, 'process'):
+                result = bench_process(size, workdir)
+                report['results'].setdefault('process', {})[str(size)] = result
+                stages = ', '.join(f'{name} {value:.3f}s' for name, value in result['stages'].items())
+                print(f'process {size:>8}: {result["seconds"]:.3f}s ({result["recordsPerSecond"]} rec/s; {stages})')
+
+    saved_path = None
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        saved_path = os.path.join(RESULTS_DIR, f'{time.strftime("%Y%m%d-%H%M%S")}-{report["commit"] or "local"}.json')
+        with open(saved_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'\nKết quả đã lưu: {saved_path}')
+
+    previous_path = args.compare or latest_results(exclude=saved_path)
+    if previous_path:
+        with open(previous_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        if compare(report, previous, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
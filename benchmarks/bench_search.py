@@ -0,0 +1,65 @@
+# Đo chỉ mục tìm kiếm của index/search.py trên merchant tổng hợp: thời gian dựng, lưu, nạp lại từ đĩa
+# (như lần khởi động sau) và độ trễ truy vấn toàn văn/facet; so với quét tuần tự từng bản ghi.
+# Chạy từ thư mục gốc:
+#   python -m benchmarks.bench_search --size 100000
+import argparse
+import tempfile
+import time
+
+from index.search import SearchIndex, load_search_index, tokenize
+
+from .bench_serializer import synthetic_records
+
+QUERIES = [
+    ('pho', None),
+    ('phở bò', None),
+    ('tra sua', {'district': ['Quận 1', 'Quận 3']}),
+    ('cà ph', None),
+    ('', {'categories': ['coffee'], 'exts': ['wifi_available']}),
+    ('quan an ngon binh dan', None),
+]
+ROUNDS = 20
+
+
+def scan(records, query):
+    # Cách làm không có chỉ mục: tách từ mọi bản ghi cho mỗi truy vấn
+    tokens = set(tokenize(query))
+    return [
+        position for position, record in enumerate(records)
+        if tokens <= set(tokenize(f"{record.get('name')} {record.get('description')}"))
+    ]
+
+
+def timed(function, rounds=1):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        value = function()
+    return value, (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=100000, help='số merchant tổng hợp')
+    args = parser.parse_args()
+
+    records = synthetic_records(args.size)
+    index, seconds = timed(lambda: SearchIndex.from_records(records))
+    print(f'dựng: {seconds:.2f}s, {len(index.vocab)} term, {len(index.doc_ids)} posting')
+    with tempfile.TemporaryDirectory() as root:
+        source = f'{root}/merchants.json'
+        open(source, 'w').close()
+        _, seconds = timed(lambda: load_search_index(records, source, root))
+        print(f'dựng + lưu: {seconds:.2f}s')
+        index, seconds = timed(lambda: load_search_index(records, source, root))
+        print(f'nạp từ đĩa: {seconds * 1000:.1f}ms')
+
+        print(f'{"truy vấn":<40}{"kết quả":>9}{"ms":>9}')
+        for query, filters in QUERIES:
+            (_, _, total, _), seconds = timed(lambda: index.search(query, filters), ROUNDS)
+            print(f'{query + " " + str(filters or ""):<40}{total:>9}{seconds * 1000:>9.2f}')
+        _, seconds = timed(lambda: scan(records, 'phở bò'))
+        print(f'{"quét tuần tự: phở bò":<40}{"":>9}{seconds * 1000:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
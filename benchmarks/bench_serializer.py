@@ -0,0 +1,101 @@
+# Kiểm tra serializer cho ra đúng từng byte như json của thư viện chuẩn, rồi đo tốc độ từng backend.
+# Chạy từ thư mục gốc (thoát với mã 1 nếu có khác biệt):
+#   python -m benchmarks.bench_serializer --size 20000
+import argparse
+import json
+import random
+import time
+
+from common.formats import iter_json_array, iter_jsonl
+from common.serializer import OrjsonSerializer, StdlibSerializer, orjson
+from crawl.thodiamomo import build_item
+
+from .mock_momo import MockMomoData
+
+SAMPLES = ['outputs/momo_data.json', 'preprocessor/ThoDiaMoMo_Version6.json']
+# Giá trị dễ lệch giữa các backend: float dạng mũ, NaN, số nguyên lớn, ký tự điều khiển, key không phải str
+EDGE_CASES = [
+    {'lat': 1e-05, 'big': 1e16, 'tiny': -2.5e-300, 'zero': 0.0, 'neg': -0.0, 'nan': float('nan')},
+    {'inf': float('inf'), 'int': 2 ** 70, 'neg_int': -2 ** 63},
+    {'text': 'Phở \x00\x1f\x7f  "quoted" \\ / \n\t', 'emoji': '☕🍜', 'empty': [{}, [], '']},
+    {1: 'int key', 'nested': {'a': [1, 2.5, None, True, False]}},
+    [],
+]
+
+
+def synthetic_records(size, seed=0):
+    data = MockMomoData(size, seed)
+    return [build_item(*data.merchant(index)) for index in range(size)]
+
+
+def check(records, serializer, label):
+    # Từng bản ghi phải giống hệt json.dumps của thư viện chuẩn ở cả hai dạng
+    ok = all(
+        serializer.dumps(record, indent=2) == json.dumps(record, ensure_ascii=False, indent=2)
+        and serializer.dumps(record) == json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        for record in records
+    )
+    print(f'{"ok" if ok else "MISMATCH":<9}{serializer.name:<8}{label}')
+    return ok
+
+
+def check_writers(records, label):
+    # Các writer dùng serializer mặc định: mảng JSON như json.dump(list, indent=2), JSON Lines rút gọn
+    expected_lines = ''.join(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+                             for record in records)
+    ok = (''.join(iter_json_array(records)) == json.dumps(records, ensure_ascii=False, indent=2)
+          and ''.join(iter_jsonl(records)) == expected_lines)
+    print(f'{"ok" if ok else "MISMATCH":<9}{"writers":<8}{label}')
+    return ok
+
+
+def throughput(records, serializer, repeat):
+    payload = sum(len(json.dumps(record, ensure_ascii=False).encode('utf-8')) for record in records) * repeat
+    results = {}
+    for mode, indent in (('indent=2', 2), ('compact', None)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for record in records:
+                serializer.dumps(record, indent)
+        results[mode] = payload / (time.perf_counter() - start) / 1e6
+    texts = [serializer.dumps(record) for record in records]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            serializer.loads(text)
+    results['loads'] = payload / (time.perf_counter() - start) / 1e6
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=20000, help='số bản ghi tổng hợp dùng để kiểm tra và đo')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    serializers = [StdlibSerializer()] + ([OrjsonSerializer()] if orjson is not None else [])
+    datasets = {}
+    for path in SAMPLES:
+        with open(path, 'r', encoding='utf-8') as f:
+            datasets[path] = json.load(f)
+    datasets[f'synthetic x{args.size}'] = synthetic_records(args.size)
+    datasets['edge cases'] = EDGE_CASES
+    rng = random.Random(0)
+    datasets['random floats'] = [{'value': rng.uniform(-1, 1) * 10 ** rng.randint(-20, 20)} for _ in range(10000)]
+
+    print('Byte-equivalence với json của thư viện chuẩn:')
+    ok = all([check(records, serializer, label) for label, records in datasets.items() for serializer in serializers]
+             + [check_writers(records, label) for label, records in datasets.items() if label != 'edge cases'])
+
+    records = datasets[f'synthetic x{args.size}']
+    print(f'\nThông lượng (MB/s) trên {len(records)} bản ghi x{args.repeat}:')
+    print(f'{"backend":<10}{"indent=2":>10}{"compact":>10}{"loads":>10}')
+    for serializer in serializers:
+        results = throughput(records, serializer, args.repeat)
+        print(f'{serializer.name:<10}{results["indent=2"]:>10.1f}{results["compact"]:>10.1f}{results["loads"]:>10.1f}')
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
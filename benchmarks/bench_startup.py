@@ -0,0 +1,87 @@
+# Đo thời gian import app.py như lúc một worker gunicorn khởi động (python -X importtime trong tiến trình
+# mới, chạy trong thư mục tạm để không đụng tới outputs/ thật), liệt kê các module con tốn thời gian nhất
+# và kiểm tra ngân sách: thoát với mã 1 nếu trung vị vượt --budget-ms hoặc có thư viện nặng bị import
+# ngay lúc khởi động (chúng chỉ được nạp khi dùng lần đầu). Chạy từ thư mục gốc:
+#   python -m benchmarks.bench_startup --runs 5 --budget-ms 600
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_MS = 600
+# Không được có trong sys.modules sau khi import app
+HEAVY_MODULES = ('numpy', 'pandas', 'pyarrow', 'selenium', 'scrapy', 'webdriver_manager', 'bs4', 'zstandard')
+TOP_MODULES = 10
+
+importtime_pattern = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+PROBE = f'import app, json, sys; print(json.dumps(sorted(set(sys.modules) & set({list(HEAVY_MODULES)!r}))))'
+
+
+def run_probe(workdir):
+    # (thời gian import từng module từ -X importtime, thư viện nặng đã nạp) của một lần khởi động
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        match = importtime_pattern.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            timings.append((name, (len(indent) - 1) // 2, int(self_us), int(cumulative_us)))
+    return timings, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5, help='số lần khởi động, lấy trung vị')
+    parser.add_argument('--budget-ms', type=float,
+                        default=float(os.environ.get('STARTUP_BUDGET_MS', DEFAULT_BUDGET_MS)),
+                        help='ngân sách thời gian import app (ms)')
+    args = parser.parse_args()
+
+    totals, children, heavy = [], {}, set()
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(args.runs):
+            timings, loaded = run_probe(workdir)
+            heavy.update(loaded)
+            # -X importtime in module con trước module cha: các dòng cấp 1 ngay trước dòng "app" là
+            # module import trực tiếp bởi app (thời gian cộng dồn cả module con của chúng)
+            pending = []
+            for name, level, _, cumulative in timings:
+                if level == 1:
+                    pending.append((name, cumulative))
+                elif level == 0:
+                    if name == 'app':
+                        totals.append(cumulative)
+                        for child, child_cumulative in pending:
+                            children.setdefault(child, []).append(child_cumulative)
+                    pending = []
+
+    median_ms = statistics.median(totals) / 1000
+    print(f'import app: trung vị {median_ms:.1f}ms, min {min(totals) / 1000:.1f}ms ({args.runs} lần)')
+    print(f'{"module (import bởi app)":<32}{"ms":>9}')
+    slowest = sorted(children.items(), key=lambda item: -statistics.median(item[1]))[:TOP_MODULES]
+    for name, values in slowest:
+        print(f'{name:<32}{statistics.median(values) / 1000:>9.1f}')
+
+    failed = False
+    if heavy:
+        print(f'LỖI: thư viện nặng bị import lúc khởi động: {", ".join(sorted(heavy))}')
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f'LỖI: vượt ngân sách {args.budget_ms:.0f}ms')
+        failed = True
+    if not failed:
+        print(f'ok: trong ngân sách {args.budget_ms:.0f}ms, không import thư viện nặng')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+# Máy chủ giả lập API MoMo để đo hiệu năng crawler mà không gọi endpoint thật.
+# Phục vụ recommend, /_next/data/<buildId>/oa/<id>.json và trang chủ (có __NEXT_DATA__),
+# dữ liệu tổng hợp dựng từ outputs/momo_data.json. Cùng máy chủ phục vụ luôn API Ticketbox
+# (/search/v2/events, /gin/api/v1/events/<id>) với cùng số sự kiện. Chạy riêng:
+#   python -m benchmarks.mock_momo --size 10000 --latency 0.02 --error-rate 0.01 --port 8765
+import argparse
+import json
+import multiprocessing
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from crawl.momo_map import day_mapping, server_categories_map
+from crawl.thodiamomo import THODIA_BUILD_ID
+
+TEMPLATE_PATH = 'outputs/momo_data.json'
+OA_PATH = re.compile(r'^/_next/data/([^/]+)/oa/(\d+)\.json$')
+EVENT_PATH = re.compile(r'^/gin/api/v1/events/(\d+)$')
+EVENT_KINDS = ['Liveshow', 'Hòa nhạc', 'Kịch', 'Workshop', 'Stand-up comedy']
+EVENT_CATEGORIES = ['music', 'theater', 'workshop', 'comedy', 'sport']
+VENUES = [
+    ('Nhà hát Thành phố', '7 Công Trường Lam Sơn, Bến Nghé, Quận 1, Hồ Chí Minh'),
+    ('Sân khấu Lan Anh', '291 Cách Mạng Tháng 8, Phường 12, Quận 10, Hồ Chí Minh'),
+    ('Trung tâm Hội nghị Quốc gia', 'Đại lộ Thăng Long, Mễ Trì, Nam Từ Liêm, Hà Nội'),
+]
+EVENT_EPOCH = datetime(2026, 11, 1, 19, 0, tzinfo=timezone(timedelta(hours=7)))
+DAY_NUMBERS = {day: number for number, day in day_mapping.items()}
+CATEGORY_KEYS = [key for key in server_categories_map if not key.startswith('service')]
+
+
+def load_templates(path=TEMPLATE_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def synthetic_merchant(index, template, rng):
+    # Trả về (item của recommend, oaData) cho merchant thứ index, dựa trên một bản ghi mẫu
+    lat = (template['locate']['lat'] or 10.77) + rng.uniform(-0.05, 0.05)
+    lon = (template['locate']['long'] or 106.70) + rng.uniform(-0.05, 0.05)
+    address = template.get('address') or {}
+    opening_times = [
+        {
+            'dayOfWeek': DAY_NUMBERS[day],
+            'times': [
+                dict(zip(('startTime', 'endTime'), time_range.split(' - '))) for time_range in time_ranges
+            ],
+        }
+        for day, time_ranges in template['openHour'].items() if time_ranges
+    ]
+    item = {
+        'id': index,
+        'name': f"{template['name']} #{index}",
+        'address': (template.get('geojson') or {}).get('location', {}).get('fullAddress'),
+        'location': {'lat': lat, 'lon': lon},
+        'bannerImgUrls': [{'originalUrl': url} for url in template['imgs']],
+        'rating': round(rng.uniform(3.0, 5.0), 1),
+        'ratingCount': rng.randint(0, 500),
+        'districtName': template['districtName'],
+        'cityName': template['cityName'],
+        'type': 'STORE',
+        'openingTimes': opening_times,
+        'avgPrice': template['price'],
+        'avgUnit': template['avgUnit'],
+    }
+    categories = list(template['categories']) + rng.sample(CATEGORY_KEYS, rng.randint(0, 2))
+    oa_data = {
+        'categories': [{'name': server_categories_map[key]} for key in categories],
+        'utilities': [server_categories_map[key] for key in template['exts'] if key in server_categories_map],
+        'contactNumber': f'09{index:08d}',
+        'description': template.get('description'),
+        'address': {
+            'streetId': address.get('streetId'),
+            'wardId': address.get('wardId'),
+            'districtId': address.get('districtId'),
+            'houseNumber': address.get('houseNumber'),
+            'streetName': (address.get('street') or '').replace(address.get('houseNumber') or '', '', 1).strip(),
+            'cityName': address.get('province'),
+            'districtName': address.get('district'),
+            'wardName': address.get('ward'),
+            'latitude': lat,
+            'longitude': lon,
+        },
+    }
+    return item, oa_data
+
+
+def synthetic_event(index, rng):
+    # Trả về (kết quả tìm kiếm, chi tiết sự kiện) của Ticketbox cho sự kiện thứ index
+    kind = rng.choice(EVENT_KINDS)
+    venue, address = rng.choice(VENUES)
+    start = EVENT_EPOCH + timedelta(days=rng.randint(0, 180), minutes=30 * rng.randint(0, 4))
+    showings = []
+    for day in range(rng.randint(1, 3)):
+        base = rng.choice([150000, 300000, 500000])
+        showings.append({
+            'startTime': (start + timedelta(days=day)).isoformat(),
+            'endTime': (start + timedelta(days=day, hours=2)).isoformat(),
+            'ticketTypes': [
+                {'id': index * 10 + tier, 'name': name, 'price': base * (tier + 1)}
+                for tier, name in enumerate(['Standard', 'VIP', 'SVIP'][:rng.randint(1, 3)])
+            ],
+        })
+    name = f'{kind} #{index}'
+    item = {
+        'id': index,
+        'name': name,
+        'imageUrl': f'https://images.tkbcdn.com/mock/{index}.jpg',
+        'price': showings[0]['ticketTypes'][0]['price'],
+        'day': start.isoformat(),
+        'url': f'su-kien-{index}',
+    }
+    event = {
+        'id': index,
+        'title': name,
+        'startTime': showings[0]['startTime'],
+        'endTime': showings[-1]['endTime'],
+        'venue': venue,
+        'address': address,
+        'orgName': f'Ban tổ chức {index % 50}',
+        'bannerURL': f'https://images.tkbcdn.com/mock/{index}-banner.jpg',
+        'categories': [{'name': category} for category in rng.sample(EVENT_CATEGORIES, rng.randint(1, 2))],
+        'showings': showings,
+        'description': f'<p>{name} tại {venue}</p>',
+    }
+    return item, event
+
+
+class MockMomoData:
+    # Sinh dữ liệu theo id khi được hỏi, cùng seed thì cùng kết quả, không cần giữ cả tập trong bộ nhớ
+    def __init__(self, size, seed=0, templates=None):
+        self.size = size
+        self.seed = seed
+        self.templates = templates or load_templates()
+
+    def merchant(self, index):
+        rng = random.Random(self.seed * 1_000_003 + index)
+        return synthetic_merchant(index, self.templates[index % len(self.templates)], rng)
+
+    def page(self, page_number, page_size):
+        start = (page_number - 1) * page_size
+        return [self.merchant(index)[0] for index in range(start, min(start + page_size, self.size))]
+
+    def event(self, index):
+        return synthetic_event(index, random.Random(self.seed * 1_000_003 + index))
+
+    def event_page(self, page_number, page_size):
+        start = (page_number - 1) * page_size
+        return [self.event(index)[0] for index in range(start, min(start + page_size, self.size))]
+
+
+class MockMomoHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Header và body được ghi riêng: không tắt Nagle thì mỗi response keep-alive chờ thêm ~40ms ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, status, body, content_type='application/json', headers=()):
+        payload = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        if server.latency:
+            time.sleep(server.latency)
+        if server.should_fail():
+            return self.send(503, '{"error": "mock failure"}')
+
+        if url.path.endswith('/recommend'):
+            query = parse_qs(url.query)
+            page = server.data.page(int(query['pageNumber'][0]), int(query['pageSize'][0]))
+            return self.send(200, json.dumps({'data': {'content': page, 'totalElements': server.data.size}}))
+
+        if url.path == '/search/v2/events':
+            query = parse_qs(url.query)
+            page = server.data.event_page(int(query['page'][0]), int(query['limit'][0]))
+            return self.send(200, json.dumps({'status': 1, 'data': {'results': page}}))
+
+        match = EVENT_PATH.match(url.path)
+        if match:
+            index = int(match.group(1))
+            if index >= server.data.size:
+                return self.send(404, '{}')
+            return self.send(200, json.dumps({'status': 1, 'data': {'result': server.data.event(index)[1]}}))
+
+        match = OA_PATH.match(url.path)
+        if match:
+            index = int(match.group(2))
+            server.count_oa_request()
+            # Như Next.js: buildId cũ (trước lần deploy gần nhất) trả về 404
+            if match.group(1) != server.current_build_id() or index >= server.data.size:
+                return self.send(404, '{}')
+            etag = f'"{server.data.seed}-{index}"'
+            if self.headers.get('If-None-Match') == etag:
+                return self.send(304, '')
+            oa_data = server.data.merchant(index)[1]
+            return self.send(200, json.dumps({'pageProps': {'oaData': oa_data}}), headers=[('ETag', etag)])
+
+        if url.path == '/':
+            next_data = json.dumps({'buildId': server.current_build_id(), 'page': '/'})
+            return self.send(
+                200, f'<html><script id="__NEXT_DATA__" type="application/json">{next_data}</script></html>',
+                'text/html; charset=utf-8'
+            )
+        return self.send(404, '{}')
+
+
+class MockMomoServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    # redeploy_every: đổi buildId sau mỗi chừng ấy request oaData (giả lập MoMo deploy giữa lúc cào)
+    def __init__(self, size, latency=0.0, error_rate=0.0, seed=0, host='127.0.0.1', port=0,
+                 build_id=THODIA_BUILD_ID, redeploy_every=None):
+        super().__init__((host, port), MockMomoHandler)
+        self.data = MockMomoData(size, seed)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.build_id = build_id
+        self.redeploy_every = redeploy_every
+        self.oa_requests = 0
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+
+    def current_build_id(self):
+        if not self.redeploy_every:
+            return self.build_id
+        return f'{self.build_id}-{self.oa_requests // self.redeploy_every}'
+
+    def count_oa_request(self):
+        with self.rng_lock:
+            self.oa_requests += 1
+
+    def should_fail(self):
+        if not self.error_rate:
+            return False
+        with self.rng_lock:
+            return self.rng.random() < self.error_rate
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def main_url(self):
+        return f'{self.base_url}/api/search/v2.1/tdmm/oas/recommend'
+
+
+def serve(options, ready):
+    server = MockMomoServer(**options)
+    ready.put(server.base_url)
+    server.serve_forever()
+
+
+class MockMomoProcess:
+    # Chạy máy chủ giả lập trong tiến trình riêng để không tranh GIL với crawler đang đo
+    def __init__(self, size, latency=0.0, error_rate=0.0, seed=0, **options):
+        self.options = dict(options, size=size, latency=latency, error_rate=error_rate, seed=seed)
+        self.process = None
+        self.base_url = None
+
+    def __enter__(self):
+        ready = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target=serve, args=(self.options, ready), daemon=True)
+        self.process.start()
+        self.base_url = ready.get(timeout=30)
+        return self
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.join()
+
+    @property
+    def main_url(self):
+        return f'{self.base_url}/api/search/v2.1/tdmm/oas/recommend'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=1000, help='số merchant của tập dữ liệu')
+    parser.add_argument('--latency', type=float, default=0.0, help='độ trễ mỗi request (giây)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='tỉ lệ request trả về 503')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--build-id', default=THODIA_BUILD_ID)
+    parser.add_argument('--redeploy-every', type=int, help='đổi buildId sau mỗi chừng ấy request oaData')
+    args = parser.parse_args()
+    server = MockMomoServer(args.size, args.latency, args.error_rate, args.seed, port=args.port,
+                            build_id=args.build_id, redeploy_every=args.redeploy_every)
+    print(f'Mock MoMo API on {server.base_url} (main_url={server.main_url}, thodia_url={server.base_url}, '
+          f'Ticketbox api_url={server.base_url})')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+import gzip
+import zlib
+from itertools import islice
+
+from .lazy import optional_module
+from .serializer import dumps, loads
+
+# Optional dependencies, None when not installed. Imported on first use: pyarrow alone takes longer
+# to import than the whole app otherwise, and only parquet output needs it.
+zstandard = optional_module('zstandard')
+pa = optional_module('pyarrow')
+pq = optional_module('pyarrow.parquet')
+
+# json: pretty-printed array (the historical format), jsonl: compact JSON Lines, parquet: columnar
+OUTPUT_FORMATS = ('json', 'jsonl', 'parquet')
+COMPRESSIONS = (None, 'gzip', 'zstd')
+PARQUET_BATCH_SIZE = 10000
+
+WEEK_DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+
+def check_format(output_format, compression=None):
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {output_format!r}, expected one of {OUTPUT_FORMATS}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression {compression!r}, expected one of {COMPRESSIONS}")
+    if compression and output_format != 'jsonl':
+        raise ValueError("Compression is only supported for the jsonl format")
+    if compression == 'zstd' and zstandard is None:
+        raise RuntimeError("zstd compression requires the 'zstandard' package")
+    if output_format == 'parquet' and pa is None:
+        raise RuntimeError("Parquet output requires the 'pyarrow' package")
+
+
+def output_suffix(output_format, compression=None):
+    suffix = '.' + output_format
+    if compression == 'gzip':
+        suffix += '.gz'
+    elif compression == 'zstd':
+        suffix += '.zst'
+    return suffix
+
+
+def compression_for_path(path):
+    if path.endswith('.gz'):
+        return 'gzip'
+    if path.endswith('.zst'):
+        return 'zstd'
+    return None
+
+
+def open_text(path, mode='r', compression=None):
+    # Text handle over a plain, gzip or zstd file; mode is 'r' or 'w'
+    if compression == 'gzip':
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstd compression requires the 'zstandard' package")
+        return zstandard.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def iter_json_array(records, compact=False):
+    # Text chunks of a JSON array, byte-identical to json.dump(list, ensure_ascii=False, indent=2);
+    # compact writes one minified record per line instead
+    first = True
+    for record in records:
+        if compact:
+            yield ("[\n" if first else ",\n") + dumps(record)
+        else:
+            yield "[\n  " if first else ",\n  "
+            yield dumps(record, indent=2).replace("\n", "\n  ")
+        first = False
+    yield "[]" if first else "\n]"
+
+
+def iter_jsonl(records):
+    for record in records:
+        yield dumps(record) + '\n'
+
+
+def gzip_stream(chunks, level=6, flush_bytes=16384):
+    # Gzip text chunks on the fly; sync-flush after the first chunk and then every
+    # flush_bytes of input so the client receives data while the producer is still running
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    pending = 0
+    first = True
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        pending += len(chunk)
+        if first or pending >= flush_bytes:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+            first = False
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def write_jsonl(records, path, compression=None):
+    count = 0
+    with open_text(path, 'w', compression) as f:
+        for line in iter_jsonl(records):
+            f.write(line)
+            count += 1
+    return count
+
+
+def read_jsonl(path):
+    with open_text(path, 'r', compression_for_path(path)) as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
+
+
+def parquet_schema_for_crawl():
+    # Schema of crawl_momo_data records with nested address/openHour/locate structs
+    address_fields = [
+        ('streetId', pa.int64()), ('wardId', pa.int64()), ('districtId', pa.int64()),
+        ('houseNumber', pa.string()), ('province', pa.string()), ('district', pa.string()),
+        ('ward', pa.string()), ('street', pa.string()),
+    ]
+    location = pa.struct(
+        [('lat', pa.float64()), ('long', pa.float64())] + address_fields + [('fullAddress', pa.string())]
+    )
+    return pa.schema([
+        ('id', pa.int64()),
+        ('name', pa.string()),
+        ('address', pa.struct(address_fields)),
+        ('locate', pa.struct([('lat', pa.float64()), ('long', pa.float64())])),
+        ('geojson', pa.struct([
+            ('type', pa.string()),
+            ('coordinates', pa.list_(pa.float64())),
+            ('location', location),
+        ])),
+        ('imgs', pa.list_(pa.string())),
+        ('rating', pa.float64()),
+        ('ratingCount', pa.int64()),
+        ('districtName', pa.string()),
+        ('cityName', pa.string()),
+        ('type', pa.string()),
+        ('openHour', pa.struct([(day, pa.list_(pa.string())) for day in WEEK_DAYS])),
+        ('price', pa.float64()),
+        ('avgUnit', pa.string()),
+        ('categories', pa.list_(pa.string())),
+        ('phones', pa.list_(pa.string())),
+        ('exts', pa.list_(pa.string())),
+        ('description', pa.string()),
+    ])
+
+
+def concrete_type(data_type):
+    # Columns that are empty in the first batch infer as null; widen them to string
+    if pa.types.is_null(data_type):
+        return pa.string()
+    if pa.types.is_list(data_type):
+        return pa.list_(concrete_type(data_type.value_type))
+    if pa.types.is_struct(data_type):
+        return pa.struct([pa.field(field.name, concrete_type(field.type)) for field in data_type])
+    return data_type
+
+
+def write_parquet(records, path, schema=None, batch_size=PARQUET_BATCH_SIZE, compression='zstd'):
+    # Write records in row groups of batch_size; without a schema it is inferred from the first batch.
+    # compression is the parquet codec of every column chunk, None for uncompressed
+    if pa is None:
+        raise RuntimeError("Parquet output requires the 'pyarrow' package")
+    records = iter(records)
+    writer = None
+    count = 0
+    try:
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            if schema is None:
+                inferred = pa.Table.from_pylist(batch).schema
+                schema = pa.schema([pa.field(field.name, concrete_type(field.type)) for field in inferred])
+            table = pa.Table.from_pylist(batch, schema=schema)
+            if writer is None:
+                writer = pq.ParquetWriter(path, schema, compression=compression or 'none')
+            writer.write_table(table)
+            count += len(batch)
+        if writer is None:
+            pq.write_table(pa.Table.from_pylist([], schema=schema or pa.schema([])), path,
+                           compression=compression or 'none')
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def write_records(records, path, output_format='jsonl', compression=None, schema=None):
+    # Streaming writer for the non-legacy formats; 'json' stays with the caller's own writer
+    check_format(output_format, compression)
+    if output_format == 'jsonl':
+        return write_jsonl(records, path, compression)
+    if output_format == 'parquet':
+        return write_parquet(records, path, schema)
+    raise ValueError("write_records does not handle the legacy json format")
+
+
+def dataframe_records(frame):
+    # DataFrame -> plain dict records with the same null handling as DataFrame.to_json
+    return loads(frame.to_json(orient='records', force_ascii=False))
+
+
+def normalize_processed_record(record):
+    # process_momo writes '' for unknown coordinates; columnar formats need a single type
+    locate = record.get('locate')
+    if isinstance(locate, dict):
+        record['locate'] = {key: (None if value == '' else value) for key, value in locate.items()}
+    return record
@@ -0,0 +1,41 @@
+import importlib
+import importlib.util
+import threading
+
+
+class LazyModule:
+    # Stand-in for a module that is only imported on first attribute access, so importing the
+    # modules that reference it (app.py at worker boot) does not pay for numpy, pyarrow, ...
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_module(name):
+    return LazyModule(name)
+
+
+def optional_module(name):
+    # Lazy stand-in for name, or None if its package is not installed; checked without importing it
+    if importlib.util.find_spec(name.partition(".")[0]) is None:
+        return None
+    return LazyModule(name)
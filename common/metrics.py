@@ -0,0 +1,176 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from a fast cache hit to a slow paginated crawl
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self.lock:
+            for values, sample in sorted(self.values.items()):
+                lines.extend(self.render_sample(values, sample))
+        return lines
+
+    def render_sample(self, values, sample):
+        return [f'{self.name}{format_labels(self.labelnames, values)} {format_value(sample)}']
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            sample = self.values.get(key)
+            if sample is None:
+                sample = self.values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample['buckets'][i] += 1
+                    break
+            sample['sum'] += value
+            sample['count'] += 1
+
+    def render_sample(self, values, sample):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, sample['buckets']):
+            cumulative += count
+            labels = format_labels(self.labelnames, values, [('le', format_value(bound))])
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = format_labels(self.labelnames, values)
+        lines.append(f'{self.name}_sum{labels} {format_value(sample["sum"])}')
+        lines.append(f'{self.name}_count{labels} {sample["count"]}')
+        return lines
+
+
+class Registry:
+    # Process-wide metrics rendered in the Prometheus text exposition format.
+    # Registering the same name twice returns the existing metric so modules can be reloaded.
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, cls, name, documentation, labelnames=(), **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name!r} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class RunMetrics:
+    # Stage timings and counters of a single run (one crawl job), for the per-job summary.
+    # Stage seconds are summed over threads, so parallel stages can exceed the wall time.
+    # Every stage duration is also observed on the shared histogram, if one is given.
+    def __init__(self, stage_histogram=None):
+        self.stage_histogram = stage_histogram
+        self.stages = {}
+        self.counts = {}
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        with self.lock:
+            total, calls = self.stages.get(name, (0.0, 0))
+            self.stages[name] = (total + seconds, calls + 1)
+        if self.stage_histogram is not None:
+            self.stage_histogram.observe(seconds, stage=name)
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def summary(self):
+        with self.lock:
+            return {
+                'wallSeconds': round(time.perf_counter() - self.started, 4),
+                'stages': {
+                    name: {'seconds': round(total, 4), 'calls': calls}
+                    for name, (total, calls) in self.stages.items()
+                },
+                'counts': dict(self.counts),
+            }
@@ -0,0 +1,439 @@
+import math
+import sys
+from dataclasses import dataclass
+from functools import partial
+from itertools import chain, repeat
+
+from .formats import WEEK_DAYS
+from .lazy import lazy_module
+
+# Only the column checks of the preprocessor need numpy: not imported at app startup
+np = lazy_module('numpy')
+
+# Shared typed view of a merchant for both record shapes:
+#   crawl:     crawl_momo_data output (id, address with ids, locate floats, geojson, rating, ...)
+#   processed: process_momo output (avgRating, address with 4 text keys, locate '' when unknown,
+#              phones [''] when unknown)
+# Values are normalized on the way in (unknown coordinates are None, empty phones are dropped) and
+# stored compactly: slotted instances, tuples instead of lists, interned repeated strings and one
+# shared tuple per distinct opening schedule.
+
+MAX_RATING = 5.0
+
+
+class RecordError(ValueError):
+    # A record that does not match the model; field is the dotted path of the offending value
+    def __init__(self, field, message):
+        super().__init__(f"{field}: {message}")
+        self.field = field
+
+
+def is_missing(value):
+    # None, or NaN as written by pandas for empty cells
+    return value is None or (type(value) is float and math.isnan(value))
+
+
+def check_text(value, field, required=False):
+    if is_missing(value):
+        if required:
+            raise RecordError(field, "is required")
+        return None
+    if type(value) is not str:
+        raise RecordError(field, f"expected a string, got {type(value).__name__}")
+    if required and not value.strip():
+        raise RecordError(field, "is empty")
+    return value
+
+
+def check_label(value, field):
+    # Short strings repeated across many records (district, city, type, ...) share one object
+    value = check_text(value, field)
+    return sys.intern(value) if value is not None else None
+
+
+def check_number(value, field, low=None, high=None, coerce=False):
+    # coerce: also accept numeric text, as left by pandas when a column does not parse as a whole
+    if is_missing(value) or value == '':
+        return None
+    if coerce and type(value) is str:
+        try:
+            value = float(value)
+        except ValueError:
+            raise RecordError(field, f"expected a number, got {value!r}") from None
+    elif type(value) not in (int, float):
+        raise RecordError(field, f"expected a number, got {type(value).__name__}")
+    if math.isnan(value):
+        return None
+    if math.isinf(value) or (low is not None and value < low) or (high is not None and value > high):
+        raise RecordError(field, f"{value!r} is out of range")
+    return value
+
+
+def check_count(value, field, coerce=False):
+    value = check_number(value, field, low=0, coerce=coerce)
+    if value is not None and value != int(value):
+        raise RecordError(field, f"expected an integer, got {value!r}")
+    return int(value) if value is not None else None
+
+
+def check_coordinates(lat, lon, field):
+    # Both coordinates or neither; '' (process_momo) and None mean unknown
+    lat = check_number(lat, f"{field}.lat", -90, 90)
+    lon = check_number(lon, f"{field}.long", -180, 180)
+    if (lat is None) != (lon is None):
+        raise RecordError(field, "needs both lat and long")
+    return lat, lon
+
+
+def check_strings(value, field, intern=False, skip_empty=False):
+    if value is None:
+        return ()
+    if type(value) not in (list, tuple):
+        raise RecordError(field, f"expected a list, got {type(value).__name__}")
+    try:
+        ''.join(value)
+    except TypeError:
+        item = next(item for item in value if not isinstance(item, str))
+        raise RecordError(field, f"expected strings, got {type(item).__name__}") from None
+    if skip_empty:
+        value = [item for item in value if item]
+    return tuple(map(sys.intern, value)) if intern else tuple(value)
+
+
+WEEK_DAY_SET = frozenset(WEEK_DAYS)
+# Distinct schedules shared between records; emptied when full so long-running processes that
+# validate many files do not keep every schedule ever seen
+MAX_SHARED_SCHEDULES = 4096
+_schedules = {}
+
+
+def check_open_hour(value, field):
+    # {'monday': ['08:00 - 22:00'], ...} -> one tuple of ranges per WEEK_DAYS entry, shared between
+    # records with the same schedule; schedules seen before skip the per-day checks
+    if value is None:
+        return None
+    if type(value) is not dict:
+        raise RecordError(field, f"expected a dict, got {type(value).__name__}")
+    if not value.keys() <= WEEK_DAY_SET:
+        raise RecordError(field, f"unknown days {sorted(value.keys() - WEEK_DAY_SET)}")
+    try:
+        shared = _schedules.get(tuple(tuple(value.get(day) or ()) for day in WEEK_DAYS))
+    except TypeError:
+        shared = None
+    if shared is not None:
+        return shared
+    key = tuple(check_strings(value.get(day), f"{field}.{day}", intern=True) for day in WEEK_DAYS)
+    if len(_schedules) >= MAX_SHARED_SCHEDULES:
+        _schedules.clear()
+    return _schedules.setdefault(key, key)
+
+
+def check_dict(value, field):
+    if value is not None and type(value) is not dict:
+        raise RecordError(field, f"expected a dict, got {type(value).__name__}")
+    return value
+
+
+def check_locate(value, field='locate'):
+    locate = check_dict(value, field) or {}
+    return check_coordinates(locate.get('lat'), locate.get('long'), field)
+
+
+def check_type(value, field='type'):
+    # Older process_momo exports store type as a list; the first entry wins
+    if type(value) is list:
+        value = value[0] if value else None
+    return check_label(value, field)
+
+
+@dataclass(slots=True)
+class Address:
+    province: str = None
+    district: str = None
+    ward: str = None
+    street: str = None
+    # Only in crawl records (from the oaData address)
+    street_id: int = None
+    ward_id: int = None
+    district_id: int = None
+    house_number: str = None
+    lat: float = None
+    lon: float = None
+    full_address: str = None
+
+    @classmethod
+    def from_crawl(cls, address, geojson, field='address'):
+        address = check_dict(address, field)
+        if address is None:
+            return None
+        location = (check_dict(geojson, 'geojson') or {}).get('location') or {}
+        lat, lon = check_coordinates(location.get('lat'), location.get('long'), 'geojson.location')
+        return cls(
+            province=check_label(address.get('province'), f"{field}.province"),
+            district=check_label(address.get('district'), f"{field}.district"),
+            ward=check_label(address.get('ward'), f"{field}.ward"),
+            street=check_text(address.get('street'), f"{field}.street"),
+            street_id=check_count(address.get('streetId'), f"{field}.streetId"),
+            ward_id=check_count(address.get('wardId'), f"{field}.wardId"),
+            district_id=check_count(address.get('districtId'), f"{field}.districtId"),
+            house_number=check_text(address.get('houseNumber'), f"{field}.houseNumber"),
+            lat=lat,
+            lon=lon,
+            full_address=check_text(location.get('fullAddress'), 'geojson.location.fullAddress'),
+        )
+
+    @classmethod
+    def from_processed(cls, address, field='address'):
+        address = check_dict(address, field)
+        if address is None:
+            return None
+        return cls(
+            province=check_label(address.get('province'), f"{field}.province"),
+            district=check_label(address.get('district'), f"{field}.district"),
+            ward=check_label(address.get('ward'), f"{field}.ward"),
+            street=check_text(address.get('street'), f"{field}.street"),
+        )
+
+    def to_crawl(self):
+        return {
+            "streetId": self.street_id,
+            "wardId": self.ward_id,
+            "districtId": self.district_id,
+            "houseNumber": self.house_number,
+            "province": self.province,
+            "district": self.district,
+            "ward": self.ward,
+            "street": self.street,
+        }
+
+    def to_processed(self):
+        return {
+            'province': self.province or '',
+            'district': self.district or '',
+            'ward': self.ward or '',
+            'street': self.street or '',
+        }
+
+
+@dataclass(slots=True)
+class Merchant:
+    name: str
+    id: int = None
+    address: Address = None
+    lat: float = None
+    lon: float = None
+    rating: float = None
+    rating_count: int = None
+    price: float = None
+    avg_unit: str = None
+    district_name: str = None
+    city_name: str = None
+    type: str = None
+    open_hour: tuple = None
+    categories: tuple = ()
+    exts: tuple = ()
+    phones: tuple = ()
+    imgs: tuple = ()
+    description: str = None
+
+    @classmethod
+    def from_crawl(cls, record):
+        # crawl_momo_data record -> Merchant; RecordError if a field has the wrong type or range
+        lat, lon = check_locate(record.get('locate'))
+        record_id = record.get('id')
+        if record_id is not None and type(record_id) is not int:
+            raise RecordError('id', f"expected an integer, got {type(record_id).__name__}")
+        return cls(
+            name=check_text(record.get('name'), 'name', required=True),
+            id=record_id,
+            address=Address.from_crawl(record.get('address'), record.get('geojson')),
+            lat=lat,
+            lon=lon,
+            rating=check_number(record.get('rating'), 'rating', 0, MAX_RATING),
+            rating_count=check_count(record.get('ratingCount'), 'ratingCount'),
+            price=check_number(record.get('price'), 'price', low=0),
+            avg_unit=check_label(record.get('avgUnit'), 'avgUnit'),
+            district_name=check_label(record.get('districtName'), 'districtName'),
+            city_name=check_label(record.get('cityName'), 'cityName'),
+            type=check_label(record.get('type'), 'type'),
+            open_hour=check_open_hour(record.get('openHour'), 'openHour'),
+            categories=check_strings(record.get('categories'), 'categories', intern=True),
+            exts=check_strings(record.get('exts'), 'exts', intern=True),
+            phones=check_strings(record.get('phones'), 'phones', skip_empty=True),
+            imgs=check_strings(record.get('imgs'), 'imgs'),
+            description=check_text(record.get('description'), 'description'),
+        )
+
+    @classmethod
+    def from_processed(cls, record):
+        # process_momo record -> Merchant
+        lat, lon = check_locate(record.get('locate'))
+        address = Address.from_processed(record.get('address'))
+        return cls(
+            name=check_text(record.get('name'), 'name', required=True),
+            address=address,
+            lat=lat,
+            lon=lon,
+            rating=check_number(record.get('avgRating'), 'avgRating', 0, MAX_RATING, coerce=True),
+            rating_count=check_count(record.get('ratingCount'), 'ratingCount', coerce=True),
+            price=check_number(record.get('price'), 'price', low=0),
+            district_name=check_label(record.get('district'), 'district'),
+            city_name=address.province if address is not None else None,
+            type=check_type(record.get('type')),
+            open_hour=check_open_hour(record.get('openHour'), 'openHour'),
+            categories=check_strings(record.get('categories'), 'categories', intern=True),
+            exts=check_strings(record.get('exts'), 'exts', intern=True),
+            phones=check_strings(record.get('phones'), 'phones', skip_empty=True),
+            imgs=check_strings(record.get('imgs'), 'imgs'),
+        )
+
+    @classmethod
+    def from_record(cls, record):
+        # Either shape; only process_momo records carry avgRating
+        return cls.from_processed(record) if 'avgRating' in record else cls.from_crawl(record)
+
+    def open_hour_dict(self):
+        if self.open_hour is None:
+            return None
+        return {day: list(ranges) for day, ranges in zip(WEEK_DAYS, self.open_hour)}
+
+    def to_crawl(self):
+        # Same keys, order and values as crawl.thodiamomo.build_item
+        address = self.address
+        geojson = None
+        if address is not None:
+            location = {"lat": address.lat, "long": address.lon}
+            location.update(address.to_crawl())
+            location["fullAddress"] = address.full_address
+            geojson = {"type": "Point", "coordinates": [address.lon, address.lat], "location": location}
+        return {
+            "id": self.id,
+            "name": self.name,
+            "address": address.to_crawl() if address is not None else None,
+            "locate": {"lat": self.lat, "long": self.lon},
+            "geojson": geojson,
+            "imgs": list(self.imgs),
+            "rating": self.rating,
+            "ratingCount": self.rating_count,
+            "districtName": self.district_name,
+            "cityName": self.city_name,
+            "type": self.type,
+            "openHour": self.open_hour_dict(),
+            "price": self.price,
+            "avgUnit": self.avg_unit,
+            "categories": list(self.categories),
+            "phones": list(self.phones),
+            "exts": list(self.exts),
+            "description": self.description,
+        }
+
+    def to_processed(self):
+        # Same keys and placeholders as process_momo ('' coordinates, [''] phones when unknown)
+        return {
+            'name': self.name,
+            'avgRating': self.rating if self.rating is not None else 0.0,
+            'ratingCount': self.rating_count or 0,
+            'district': self.district_name,
+            'price': self.price,
+            'phones': list(self.phones) or [''],
+            'categories': list(self.categories),
+            'address': (self.address or Address()).to_processed(),
+            'exts': list(self.exts),
+            'openHour': self.open_hour_dict() or {day: [] for day in WEEK_DAYS},
+            'imgs': list(self.imgs),
+            'locate': {'long': self.lon, 'lat': self.lat} if self.lat is not None else {'long': '', 'lat': ''},
+            'type': self.type,
+        }
+
+
+# Checks applied column by column to a process_momo DataFrame, the same as Merchant.from_processed
+PROCESSED_COLUMN_CHECKS = {
+    'name': partial(check_text, field='name', required=True),
+    'avgRating': partial(check_number, field='avgRating', low=0, high=MAX_RATING, coerce=True),
+    'ratingCount': partial(check_count, field='ratingCount', coerce=True),
+    'district': partial(check_text, field='district'),
+    'price': partial(check_number, field='price', low=0),
+    'phones': partial(check_strings, field='phones'),
+    'categories': partial(check_strings, field='categories'),
+    'address': Address.from_processed,
+    'exts': partial(check_strings, field='exts'),
+    'openHour': partial(check_open_hour, field='openHour'),
+    'imgs': partial(check_strings, field='imgs'),
+    'locate': check_locate,
+    'type': check_type,
+}
+
+
+# Cheap checks for the processed columns whose values are mostly distinct (one per merchant), run
+# over a whole list of values: True where the value certainly passes PROCESSED_COLUMN_CHECKS.
+# Only the other values go through the full check, which also names the error.
+def accept_required_text(values):
+    return [type(value) is str and value != '' and not value.isspace() for value in values]
+
+
+def accept_strings(values):
+    # Usual case first: every value is a list of strings, one join over all of them
+    if set(map(type, values)) == {list}:
+        try:
+            ''.join(chain.from_iterable(values))
+        except TypeError:
+            pass
+        else:
+            return [True] * len(values)
+    accepted = []
+    for value in values:
+        if type(value) is list or type(value) is tuple:
+            try:
+                ''.join(value)
+            except TypeError:
+                accepted.append(False)
+            else:
+                accepted.append(True)
+        else:
+            accepted.append(value is None)
+    return accepted
+
+
+def dict_column(values, key):
+    # value.get(key) for every value, or None if some value is not a dict
+    try:
+        return list(map(dict.get, values, repeat(key)))
+    except TypeError:
+        return None
+
+
+def accept_coordinates(values, key, limit):
+    # (exactly a float within +-limit, exactly '') masks of value[key] over dict values
+    column = np.fromiter(dict_column(values, key), dtype=object, count=len(values))
+    is_float = np.fromiter(map(type, column), dtype=object, count=len(column)) == float
+    in_range = np.zeros(len(column), dtype=bool)
+    numbers = column[is_float].astype(np.float64)
+    in_range[is_float] = (numbers >= -limit) & (numbers <= limit)
+    is_empty = column == ''
+    return in_range, is_empty
+
+
+def accept_locates(values):
+    if not values or dict_column(values, 'lat') is None:
+        return [False] * len(values)
+    lat, lat_empty = accept_coordinates(values, 'lat', 90)
+    lon, lon_empty = accept_coordinates(values, 'long', 180)
+    return ((lat & lon) | (lat_empty & lon_empty)).tolist()
+
+
+def accept_addresses(values):
+    keys = ('province', 'district', 'ward', 'street')
+    text = {str, type(None)}
+    columns = [dict_column(values, key) for key in keys]
+    if None not in columns and all(set(map(type, column)) <= text for column in columns):
+        return [True] * len(values)
+    return [type(value) is dict and all(type(value.get(key)) in text for key in keys) for value in values]
+
+
+PROCESSED_COLUMN_FAST_CHECKS = {
+    'name': accept_required_text,
+    'phones': accept_strings,
+    'imgs': accept_strings,
+    'address': accept_addresses,
+    'locate': accept_locates,
+}
@@ -0,0 +1,86 @@
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# JSON_BACKEND=stdlib forces the standard library even when orjson is installed
+BACKENDS = ('orjson', 'stdlib')
+# Python writes floats outside [1e-4, 1e16) in exponent form ("1e-05"), orjson does not ("0.00001")
+PLAIN_FLOAT_MIN = 1e-4
+PLAIN_FLOAT_MAX = 1e16
+
+
+def has_exotic_floats(obj):
+    # True if obj contains a float that orjson would format differently from json.dumps
+    # (exponent form, NaN/Infinity, which orjson writes as null)
+    stack = [obj]
+    while stack:
+        value = stack.pop()
+        kind = type(value)
+        if kind is dict:
+            stack.extend(value.values())
+        elif kind is list or kind is tuple:
+            stack.extend(value)
+        elif kind is float and value != 0.0 and not PLAIN_FLOAT_MIN <= abs(value) < PLAIN_FLOAT_MAX:
+            return True
+    return False
+
+
+class StdlibSerializer:
+    name = 'stdlib'
+
+    def dumps(self, obj, indent=None):
+        # indent=None is the compact form; otherwise the historical pretty-printed output
+        if indent is None:
+            return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+        return json.dumps(obj, ensure_ascii=False, indent=indent)
+
+    def loads(self, text):
+        return json.loads(text)
+
+
+class OrjsonSerializer(StdlibSerializer):
+    # Byte-identical to StdlibSerializer (same key order, escapes and separators). Values orjson
+    # cannot reproduce exactly (exotic floats, indent other than 2, ints over 64 bits, non-str keys)
+    # go through the standard library instead.
+    name = 'orjson'
+
+    def dumps(self, obj, indent=None):
+        if indent not in (None, 2) or has_exotic_floats(obj):
+            return super().dumps(obj, indent)
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode('utf-8')
+        except TypeError:
+            return super().dumps(obj, indent)
+
+    def loads(self, text):
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            # NaN/Infinity and other inputs only the standard library accepts
+            return json.loads(text)
+
+
+def create_serializer(backend=None):
+    backend = backend or os.environ.get('JSON_BACKEND') or ('orjson' if orjson is not None else 'stdlib')
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown JSON backend {backend!r}, expected one of {BACKENDS}")
+    if backend == 'orjson':
+        if orjson is None:
+            raise RuntimeError("The orjson JSON backend requires the 'orjson' package")
+        return OrjsonSerializer()
+    return StdlibSerializer()
+
+
+serializer = create_serializer()
+
+
+def dumps(obj, indent=None):
+    return serializer.dumps(obj, indent)
+
+
+def loads(text):
+    return serializer.loads(text)
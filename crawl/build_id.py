@@ -0,0 +1,136 @@
+import json
+import re
+import threading
+import time
+import requests
+from .http_client import get_client
+
+# How long a discovered buildId is trusted before the home page is read again
+DEFAULT_TTL = 3600
+# 404s on the id in use are checked against the home page: right away if it was not checked in the
+# last MIN_CHECK_INTERVAL seconds, otherwise once every NOT_FOUND_BURST 404s in a row. Genuine
+# 404s (removed merchants) thus cost few extra requests while a redeploy is caught immediately.
+NOT_FOUND_BURST = 3
+MIN_CHECK_INTERVAL = 30
+
+next_data_pattern = re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL)
+
+
+def parse_build_id(html):
+    # buildId from the __NEXT_DATA__ JSON embedded in a Next.js page, None if absent
+    match = next_data_pattern.search(html or "")
+    if match is None:
+        return None
+    try:
+        build_id = json.loads(match.group(1)).get("buildId")
+    except (ValueError, AttributeError):
+        return None
+    return build_id if isinstance(build_id, str) and build_id else None
+
+
+class BuildIdResolver:
+    # Current Next.js buildId of a site, discovered from its home page and cached for ttl seconds.
+    # A 404 on the id in use triggers a re-discovery shared by all worker threads; callers then
+    # retry with the new id instead of failing every remaining detail request.
+    # The home page is fetched outside the lock by a single thread at a time (single flight):
+    # threads needing the result wait for it, the others keep using the current id meanwhile.
+    def __init__(self, base_url, fallback=None, ttl=DEFAULT_TTL, burst=NOT_FOUND_BURST,
+                 min_interval=MIN_CHECK_INTERVAL):
+        self.base_url = base_url
+        self.build_id = fallback
+        self.ttl = ttl
+        self.burst = burst
+        self.min_interval = min_interval
+        self.discovered_at = None
+        self.failed_at = None
+        self.checked_at = None
+        self.not_found_count = 0
+        self.discoveries = 0
+        self.discovering = False
+        self.lock = threading.Lock()
+        self.discovered = threading.Condition(self.lock)
+
+    def fetch_build_id(self):
+        # buildId on the home page, None if it cannot be read
+        try:
+            response = get_client().get(f"{self.base_url}/")
+            return parse_build_id(response.text) if response.status_code == 200 else None
+        except requests.exceptions.RequestException as e:
+            print(f"buildId discovery failed for {self.base_url}: {e}")
+            return None
+
+    def discover(self):
+        # Re-read the buildId, keeping the previous id if that fails. Called with the lock held; if
+        # another thread is already reading the home page, wait for its result instead.
+        if self.discovering:
+            while self.discovering:
+                self.discovered.wait()
+            return
+        self.discovering = True
+        self.lock.release()
+        try:
+            build_id = self.fetch_build_id()
+        finally:
+            self.lock.acquire()
+            self.discovering = False
+            self.discovered.notify_all()
+        if build_id is None:
+            print(f"buildId not found on {self.base_url}, keeping {self.build_id}")
+            self.failed_at = time.time()
+            return
+        if build_id != self.build_id:
+            print(f"buildId of {self.base_url}: {build_id}")
+        self.build_id = build_id
+        self.discovered_at = time.time()
+        self.failed_at = None
+        self.discoveries += 1
+
+    def fresh(self):
+        discovered_at = self.discovered_at
+        return discovered_at is not None and time.time() - discovered_at < self.ttl
+
+    def get(self):
+        # Lock-free while the discovered id is fresh (build_id is always set before discovered_at)
+        if self.fresh():
+            return self.build_id
+        with self.lock:
+            if self.fresh():
+                return self.build_id
+            if self.discovering and self.discovered_at is not None:
+                # Expired id being refreshed by another thread: still usable until then
+                return self.build_id
+            if self.failed_at is None or time.time() - self.failed_at >= self.min_interval:
+                self.discover()
+            return self.build_id
+
+    def found(self):
+        # A request with the current id succeeded
+        self.not_found_count = 0
+
+    def not_found(self, build_id):
+        # A request with build_id returned 404: the id to retry with, or None if it is a real 404
+        with self.lock:
+            if build_id != self.build_id:
+                # Another thread already switched to a new id
+                return self.build_id
+            self.not_found_count += 1
+            recently_checked = self.checked_at is not None and time.time() - self.checked_at < self.min_interval
+            if recently_checked and self.not_found_count < self.burst:
+                return None
+            self.discover()
+            self.checked_at = time.time()
+            self.not_found_count = 0
+            return self.build_id if self.build_id != build_id else None
+
+
+_resolvers = {}
+_resolvers_lock = threading.Lock()
+
+
+def build_id_resolver(base_url, fallback=None):
+    # One resolver per site, shared by every crawl of this process
+    with _resolvers_lock:
+        resolver = _resolvers.get(base_url)
+        if resolver is None:
+            resolver = _resolvers[base_url] = BuildIdResolver(base_url, fallback)
+        return resolver
@@ -0,0 +1,177 @@
+import fcntl
+import json
+import os
+import shutil
+import time
+
+from common.formats import iter_jsonl, read_jsonl
+from common.serializer import dumps, loads
+
+# An older checkpoint is started over instead of resumed: the listing has changed too much since
+DEFAULT_MAX_AGE = 24 * 3600
+
+META_FILE = "meta.json"
+RECORDS_FILE = "records.jsonl"
+CHUNKS_FILE = "chunks.jsonl"
+LOCK_FILE = "lock"
+
+
+class CheckpointInUse(RuntimeError):
+    pass
+
+
+def checkpoint_path(root, name, limit, chunk_size):
+    # One checkpoint per crawl of the same source, limit and chunk size (the page layout)
+    return os.path.join(root, f"{name}-{limit}-{chunk_size}")
+
+
+def lock_directory(directory):
+    # Exclusive lock held while a crawl uses the checkpoint, so two processes never append to it
+    os.makedirs(directory, exist_ok=True)
+    lock_file = open(os.path.join(directory, LOCK_FILE), "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        raise CheckpointInUse(f"Checkpoint {directory} is in use by another crawl")
+    return lock_file
+
+
+def fsync_append(f, data):
+    f.write(data)
+    f.flush()
+    os.fsync(f.fileno())
+
+
+class CrawlCheckpoint:
+    # Durable progress of one crawl, in a directory:
+    # - meta.json: what is crawled (source, limit, chunk size) and when the crawl started
+    # - records.jsonl: the records of every completed chunk, one compact JSON record per line
+    # - chunks.jsonl: one line per completed chunk (= listing page) with the ids of its items and
+    #   the size of records.jsonl after it
+    # Both files are only appended and fsynced, records first, so the last complete line of
+    # chunks.jsonl always describes a valid prefix of records.jsonl: a crash loses at most the
+    # chunk in flight, whatever is past the last chunk line is truncated on resume.
+    def __init__(self, directory, name, limit, chunk_size, max_age=DEFAULT_MAX_AGE):
+        self.directory = directory
+        self.key = {"source": name, "limit": limit, "chunkSize": chunk_size}
+        self.pages_done = 0
+        self.items_done = 0
+        self.record_count = 0
+        self.records_bytes = 0
+        self.ids = set()
+        self.lock_file = lock_directory(directory)
+        try:
+            if self.load(max_age):
+                print(f"Resuming {name} crawl from {directory}: {self.pages_done} pages, "
+                      f"{self.items_done} items, {self.record_count} records")
+            else:
+                self.reset()
+            self.records_file = open(self.path(RECORDS_FILE), "ab")
+            self.chunks_file = open(self.path(CHUNKS_FILE), "ab")
+        except BaseException:
+            self.lock_file.close()
+            raise
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def load(self, max_age):
+        # Restore the completed chunks; False if there is no usable checkpoint for this crawl
+        try:
+            with open(self.path(META_FILE), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if meta.get("key") != self.key or time.time() - meta.get("createdAt", 0) > max_age:
+            return False
+        valid_bytes = 0
+        try:
+            with open(self.path(CHUNKS_FILE), "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        entry = loads(line.decode("utf-8"))
+                    except ValueError:
+                        break
+                    valid_bytes += len(line)
+                    self.pages_done = entry["page"]
+                    self.items_done += entry["items"]
+                    self.record_count += entry["records"]
+                    self.records_bytes = entry["bytes"]
+                    self.ids.update(entry["ids"])
+            with open(self.path(RECORDS_FILE), "r+b") as f:
+                if os.fstat(f.fileno()).st_size < self.records_bytes:
+                    return False
+                f.truncate(self.records_bytes)
+            with open(self.path(CHUNKS_FILE), "r+b") as f:
+                f.truncate(valid_bytes)
+        except (OSError, KeyError, TypeError):
+            return False
+        return True
+
+    def reset(self):
+        self.pages_done = self.items_done = self.record_count = self.records_bytes = 0
+        self.ids = set()
+        for name in (RECORDS_FILE, CHUNKS_FILE):
+            open(self.path(name), "wb").close()
+        tmp_path = self.path(f"{META_FILE}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": self.key, "createdAt": time.time()}, f)
+        os.replace(tmp_path, self.path(META_FILE))
+
+    def done(self, item):
+        # True if the item was processed by an earlier run (listing pages shift between runs)
+        return item.get("id") is not None and item.get("id") in self.ids
+
+    def commit(self, chunk, records):
+        # Durably record one completed chunk: the listed items and the records built from them
+        data = "".join(iter_jsonl(records)).encode("utf-8")
+        fsync_append(self.records_file, data)
+        ids = [item.get("id") for item in chunk if item.get("id") is not None]
+        self.pages_done += 1
+        self.items_done += len(chunk)
+        self.record_count += len(records)
+        self.records_bytes += len(data)
+        self.ids.update(ids)
+        entry = {"page": self.pages_done, "items": len(chunk), "records": len(records),
+                 "bytes": self.records_bytes, "ids": ids}
+        fsync_append(self.chunks_file, (dumps(entry) + "\n").encode("utf-8"))
+
+    def iter_records(self):
+        self.records_file.flush()
+        return read_jsonl(self.path(RECORDS_FILE))
+
+    def close(self):
+        # Keep the checkpoint on disk for a later resume
+        self.records_file.close()
+        self.chunks_file.close()
+        self.lock_file.close()
+
+    def clear(self):
+        # The crawl finished and its output is written: the checkpoint is no longer needed
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def prune_checkpoints(root, max_age=DEFAULT_MAX_AGE):
+    # Delete checkpoints too old to be resumed, unless a crawl is using them
+    try:
+        entries = [entry for entry in os.scandir(root) if entry.is_dir()]
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            with open(os.path.join(entry.path, META_FILE), "r", encoding="utf-8") as f:
+                created_at = json.load(f).get("createdAt", 0)
+        except (OSError, ValueError):
+            created_at = entry.stat().st_mtime
+        if time.time() - created_at <= max_age:
+            continue
+        try:
+            lock_file = lock_directory(entry.path)
+        except CheckpointInUse:
+            continue
+        shutil.rmtree(entry.path, ignore_errors=True)
+        lock_file.close()
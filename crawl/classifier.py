@@ -0,0 +1,79 @@
+import logging
+import unicodedata
+
+from .momo_map import server_categories_map, type_map
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_label(text):
+    # Lowercase, strip Vietnamese diacritics (đ -> d) and collapse whitespace
+    text = unicodedata.normalize("NFD", text.lower().replace("đ", "d"))
+    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+    return " ".join(text.split())
+
+
+class CategoryClassifier:
+    # Lookup tables compiled once from server_categories_map / type_map:
+    # - exact: lowercased label -> key (same result as the old reverse map, last key wins)
+    # - normalized: diacritic/case-insensitive label -> key, only for unambiguous labels
+    # - type_rank: category -> position of the first type in type_map listing it,
+    #   so picking the type of a merchant is one dict lookup per category
+    def __init__(self, categories_map, types):
+        self.conflicts = []
+        self.exact = {}
+        for key, label in categories_map.items():
+            previous = self.exact.get(label.lower())
+            if previous is not None and previous != key:
+                self.conflicts.append(f"label {label!r} maps to both {previous!r} and {key!r}; using {key!r}")
+            self.exact[label.lower()] = key
+
+        candidates = {}
+        for label, key in self.exact.items():
+            candidates.setdefault(normalize_label(label), set()).add(key)
+        self.normalized = {}
+        for label, keys in candidates.items():
+            if len(keys) == 1:
+                self.normalized[label] = next(iter(keys))
+            else:
+                self.conflicts.append(f"normalized label {label!r} is ambiguous between {sorted(keys)}")
+
+        self.type_names = list(types)
+        self.type_rank = {}
+        self.category_types = {}
+        for rank, (type_key, type_categories) in enumerate(types.items()):
+            for category in type_categories:
+                self.category_types.setdefault(category, set()).add(type_key)
+                self.type_rank.setdefault(category, rank)
+        self.category_types = {category: frozenset(keys) for category, keys in self.category_types.items()}
+
+        known = set(categories_map)
+        for category in sorted(self.category_types):
+            if category not in known:
+                self.conflicts.append(f"type_map category {category!r} is not in server_categories_map")
+            if len(self.category_types[category]) > 1:
+                first = self.type_names[self.type_rank[category]]
+                self.conflicts.append(
+                    f"category {category!r} belongs to {sorted(self.category_types[category])}; {first!r} wins"
+                )
+
+    def lookup(self, name):
+        key = self.exact.get(name.lower())
+        if key is None:
+            key = self.normalized.get(normalize_label(name))
+        return key
+
+    def types_for(self, category):
+        return self.category_types.get(category, frozenset())
+
+    def classify(self, categories, default=None):
+        # First type in type_map order that lists any of the categories
+        ranks = [self.type_rank[cat] for cat in categories if cat in self.type_rank]
+        return self.type_names[min(ranks)] if ranks else default
+
+
+classifier = CategoryClassifier(server_categories_map, type_map)
+# Shared categories and type_map keys without a display label are how momo_map is laid out, not
+# errors: report them once at debug level instead of warning on every import
+if classifier.conflicts:
+    logger.debug(f"momo_map has {len(classifier.conflicts)} mapping conflicts:\n" + "\n".join(classifier.conflicts))
@@ -0,0 +1,170 @@
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from common.metrics import registry
+
+# Status codes worth retrying: throttling and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+REQUEST_SECONDS = registry.histogram(
+    "crawl_http_request_seconds", "Latency of each HTTP attempt made by the crawler", ("host",)
+)
+REQUESTS_TOTAL = registry.counter(
+    "crawl_http_requests_total", "HTTP attempts by host and status (error = no response)", ("host", "status")
+)
+RETRIES_TOTAL = registry.counter("crawl_http_retries_total", "HTTP attempts that were retried", ("host",))
+ERRORS_TOTAL = registry.counter(
+    "crawl_http_errors_total", "HTTP attempts that failed (connection error or status >= 400)", ("host",)
+)
+
+
+class TokenBucket:
+    # Token-bucket rate limiter shared by all threads using the client.
+    # clock and sleep can be replaced (tests use a fake clock that sleep advances)
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+class HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def as_dict(self):
+        avg = self.total_latency / self.requests if self.requests else 0.0
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_latency": round(avg, 4),
+            "max_latency": round(self.max_latency, 4),
+        }
+
+
+class HttpClient:
+    # Pooled keep-alive session with rate limiting, retries and per-host counters.
+    # clock and sleep are used by the rate limiter and between retries
+    def __init__(self, pool_size=32, rate=None, burst=None, max_retries=3, backoff_factor=0.5,
+                 max_backoff=30.0, timeout=30, retry_statuses=RETRY_STATUSES, clock=time.monotonic,
+                 sleep=time.sleep):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.limiter = TokenBucket(rate, burst, clock, sleep) if rate else None
+        self.sleep = sleep
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.retry_statuses = set(retry_statuses)
+        self.host_stats = {}
+        self.lock = threading.Lock()
+
+    def backoff(self, attempt, response=None):
+        # Honour Retry-After on 429/503, otherwise exponential backoff with full jitter
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * (2 ** attempt)))
+
+    def record(self, host, latency, status="error", error=False, retry=False):
+        REQUEST_SECONDS.observe(latency, host=host)
+        REQUESTS_TOTAL.inc(host=host, status=status)
+        if error:
+            ERRORS_TOTAL.inc(host=host)
+        if retry:
+            RETRIES_TOTAL.inc(host=host)
+        with self.lock:
+            stats = self.host_stats.setdefault(host, HostStats())
+            stats.requests += 1
+            stats.total_latency += latency
+            stats.max_latency = max(stats.max_latency, latency)
+            if error:
+                stats.errors += 1
+            if retry:
+                stats.retries += 1
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).netloc
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, **kwargs)
+            except requests.exceptions.RequestException:
+                retry = attempt < self.max_retries
+                self.record(host, time.perf_counter() - start, error=True, retry=retry)
+                if not retry:
+                    raise
+                self.sleep(self.backoff(attempt))
+                attempt += 1
+                continue
+
+            failed = response.status_code >= 400
+            retry = response.status_code in self.retry_statuses and attempt < self.max_retries
+            self.record(host, time.perf_counter() - start, response.status_code, error=failed, retry=retry)
+            if not retry:
+                return response
+            self.sleep(self.backoff(attempt, response))
+            attempt += 1
+
+    def stats(self):
+        with self.lock:
+            return {host: stats.as_dict() for host, stats in self.host_stats.items()}
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    # Shared client for all crawler modules
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def configure_client(**kwargs):
+    # Replace the shared client, e.g. to change pool size or rate limit
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = HttpClient(**kwargs)
+        return _client
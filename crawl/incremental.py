@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import time
+
+from .pipeline import DEFAULT_CHUNK_SIZE, open_checkpoint, write_json_array
+from .thodiamomo import MomoSource, iter_momo_data
+
+DEFAULT_STATE_PATH = "outputs/momo_state.json"
+DEFAULT_DELTA_PATH = "outputs/momo_delta.jsonl"
+
+
+def record_hash(record):
+    # Stable content hash: key order and whitespace do not matter
+    payload = json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def load_state(state_path=DEFAULT_STATE_PATH):
+    # State index from the last run: merchant id -> content hash
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, "r", encoding="utf-8") as f:
+        return json.load(f).get("hashes", {})
+
+
+def save_state(hashes, state_path=DEFAULT_STATE_PATH):
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"updatedAt": time.time(), "hashes": hashes}, f)
+    os.replace(tmp_path, state_path)
+
+
+def write_delta(records, state_path=DEFAULT_STATE_PATH, delta_path=DEFAULT_DELTA_PATH, seen=None):
+    # Delta file is JSON Lines, one operation per line; the state index is only
+    # replaced once the whole crawl succeeded so a failed run cannot drop merchants.
+    # seen: ids listed by this crawl, filled while records are consumed. A listed merchant without
+    # a record (dropped by validation) is not removed: it keeps its previous state until it is
+    # valid again or no longer listed.
+    previous = load_state(state_path)
+    counts = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0, "invalid": 0}
+    current = {}
+    tmp_path = f"{delta_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            key = str(record["id"])
+            digest = record_hash(record)
+            current[key] = digest
+            old = previous.get(key)
+            if old == digest:
+                counts["unchanged"] += 1
+                continue
+            op = "added" if old is None else "changed"
+            counts[op] += 1
+            f.write(json.dumps({"op": op, "id": key, "record": record}, ensure_ascii=False) + "\n")
+        seen = {str(key) for key in seen} if seen is not None else set()
+        for key, digest in previous.items():
+            if key in current:
+                continue
+            if key in seen:
+                counts["invalid"] += 1
+                current[key] = digest
+            else:
+                counts["removed"] += 1
+                f.write(json.dumps({"op": "removed", "id": key}) + "\n")
+    os.replace(tmp_path, delta_path)
+    save_state(current, state_path)
+    return counts
+
+
+def read_delta(delta_path):
+    with open(delta_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def merge_deltas(snapshot_path, delta_paths, output_path):
+    # Apply delta files in order to a full snapshot: changed records are replaced in
+    # place, added records are appended and removed records are dropped
+    if snapshot_path and os.path.exists(snapshot_path):
+        with open(snapshot_path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    else:
+        snapshot = []
+    merged = {str(record["id"]): record for record in snapshot}
+    for delta_path in delta_paths:
+        for entry in read_delta(delta_path):
+            if entry["op"] == "removed":
+                merged.pop(entry["id"], None)
+            else:
+                merged[entry["id"]] = entry["record"]
+    write_json_array(merged.values(), output_path)
+    return output_path
+
+
+def crawl_momo_incremental(page_size, state_path=DEFAULT_STATE_PATH, delta_path=DEFAULT_DELTA_PATH,
+                           checkpoint_dir=None, **kwargs):
+    # Same crawl as crawl_momo_data but only added/changed/removed merchants are written.
+    # Removal is relative to this run's page_size, so keep it stable between runs.
+    # checkpoint_dir: as for crawl_momo_data; the records of a full crawl are the same, so both may share one.
+    checkpoint = None
+    if checkpoint_dir:
+        chunk_size = kwargs.get("chunk_size", DEFAULT_CHUNK_SIZE)
+        checkpoint = open_checkpoint(MomoSource, checkpoint_dir, page_size, chunk_size)
+    seen = set()
+    records = iter_momo_data(page_size, checkpoint=checkpoint, seen=seen, **kwargs)
+    try:
+        counts = write_delta(records, state_path, delta_path, seen)
+    except BaseException:
+        if checkpoint is not None:
+            checkpoint.close()
+        raise
+    if checkpoint is not None:
+        checkpoint.clear()
+    print(f"Incremental crawl: {counts}")
+    return delta_path
@@ -11,7 +11,7 @@ day_mapping = {
 
 server_categories_map = {
     "service": "Dịch vụ",
-    "placeholder": "Chọn dịch vụ",
+    "service_placeholder": "Chọn dịch vụ",
     "service_desc": "Thêm thông tin dịch vụ cho cửa hàng",
     "air_conditioning": "Điều hòa",
     "open_24_7": "Mở cửa 24/7",
@@ -0,0 +1,337 @@
+import os
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+from common.formats import check_format, iter_json_array, output_suffix, write_records
+from common.metrics import RunMetrics, registry
+from common.models import RecordError
+from .checkpoint import CheckpointInUse, CrawlCheckpoint
+from .http_client import get_client
+
+# Number of items listed and processed per chunk
+DEFAULT_CHUNK_SIZE = 100
+
+# Registered sources by name, see register()
+SOURCES = {}
+
+
+def timed(metrics, stage):
+    return metrics.stage(stage) if metrics is not None else nullcontext()
+
+
+class SourceMetrics:
+    # Process-wide metrics of one source, named <prefix>_crawl_*
+    def __init__(self, prefix, label):
+        self.stage_seconds = registry.histogram(
+            f"{prefix}_crawl_stage_seconds", f"Time spent per {label} crawl stage call", ("stage",)
+        )
+        self.records_total = registry.counter(
+            f"{prefix}_crawl_records_total", f"{label} records written by finished crawls"
+        )
+        self.records_per_second = registry.gauge(
+            f"{prefix}_crawl_records_per_second", f"Throughput of the last finished {label} crawl"
+        )
+        self.invalid_records_total = registry.counter(
+            f"{prefix}_crawl_invalid_records_total", f"{label} records dropped by validation"
+        )
+
+
+class Source:
+    # A crawlable site. Subclasses list raw items page by page (iter_items), optionally fetch one
+    # detail document per item (fetch_detail, run on the worker threads) and turn both into an
+    # output record (build_record). The pipeline below adds chunked concurrency, validation,
+    # metrics and streaming output in every format.
+    name = None
+    # Default output file is outputs/<output_name><suffix>
+    output_name = None
+    record_label = "records"
+    detail_stage = "detail"
+    metrics = None
+    # Optional pyarrow schema factory for parquet output
+    parquet_schema = None
+
+    def __init__(self, cache=None):
+        # cache: a ResponseCache for the detail documents, or None
+        self.cache = cache
+
+    def iter_items(self, limit, chunk_size=DEFAULT_CHUNK_SIZE, metrics=None, start_page=1):
+        # Listed items from page start_page on, pages of chunk_size items (see iter_paged)
+        raise NotImplementedError
+
+    def fetch_detail(self, item, metrics=None):
+        return None
+
+    def build_record(self, item, detail):
+        raise NotImplementedError
+
+    def validate(self, record):
+        # Raise RecordError if the record must not be written
+        pass
+
+    def process(self, item, metrics=None):
+        # Output record for one listed item, or None if it fails validation
+        with timed(metrics, self.detail_stage):
+            detail = self.fetch_detail(item, metrics)
+        with timed(metrics, "transform"):
+            record = self.build_record(item, detail)
+            try:
+                self.validate(record)
+            except RecordError as e:
+                print(f"Skipping invalid {self.name} record {record.get('id')}: {e}")
+                self.metrics.invalid_records_total.inc()
+                if metrics is not None:
+                    metrics.count("invalid_records")
+                return None
+            return record
+
+    def run_metrics(self):
+        return RunMetrics(self.metrics.stage_seconds)
+
+
+def register(source_class):
+    # Class decorator making a source available by name (get_source, /process_sources)
+    SOURCES[source_class.name] = source_class
+    return source_class
+
+
+def get_source(name, **options):
+    source_class = SOURCES.get(name)
+    if source_class is None:
+        raise ValueError(f"Unknown source {name!r}, expected one of {sorted(SOURCES)}")
+    return source_class(**options)
+
+
+def fetch_cached_json(url, key, cache=None, extract=None, outcome=None, label="Detail API", on_not_found=None):
+    # GET a JSON document, None on any failure. extract picks the cached part of the payload;
+    # outcome, if given, is called with hit, revalidated, miss or error.
+    # url may be a callable returning the URL, only called when the network is actually used.
+    # With a cache, fresh entries skip the network and stale ones are revalidated.
+    # on_not_found, if given, is called on a 404 and returns a URL to retry with, or None.
+    outcome = outcome or (lambda name: None)
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None and cached.fresh:
+        cache.record("hits")
+        outcome("hit")
+        return cached.data
+
+    headers = cached.validators() if cached is not None else {}
+    if callable(url):
+        url = url()
+    try:
+        while True:
+            response = get_client().get(url, headers=headers)
+            if response.status_code != 404 or on_not_found is None:
+                break
+            url = on_not_found()
+            if url is None:
+                break
+        if response.status_code == 304 and cached is not None:
+            cache.touch(key)
+            cache.record("revalidated")
+            outcome("revalidated")
+            return cached.data
+        if response.status_code == 200:
+            payload = response.json()
+            data = extract(payload) if extract is not None else payload
+            if cache is not None:
+                cache.record("misses")
+                cache.put(
+                    key, data,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified")
+                )
+            outcome("miss")
+            return data
+        print(f"{label} error for ID {key}: {response.status_code}")
+    except requests.exceptions.RequestException as e:
+        print(f"{label} request failed for ID {key}: {e}")
+    outcome("error")
+    return None
+
+
+def iter_paged(fetch_page, limit, chunk_size=DEFAULT_CHUNK_SIZE, start_page=1):
+    # Walk page numbers in fixed-size chunks until limit items or the last page;
+    # fetch_page(page_number, page_size) returns the list of items on that page.
+    # start_page > 1 resumes a walk of the same limit after its first start_page - 1 pages.
+    chunk_size = min(chunk_size, limit)
+    remaining = limit - (start_page - 1) * chunk_size
+    page_number = start_page
+    while remaining > 0:
+        page = fetch_page(page_number, chunk_size)
+        for item in page[:remaining]:
+            yield item
+        remaining -= len(page)
+        if len(page) < chunk_size:
+            break
+        page_number += 1
+
+
+def iter_record_chunks(source, items, chunk_size=DEFAULT_CHUNK_SIZE, max_workers=1, metrics=None, skip=None):
+    # (listed items, iterator over their valid records) chunk by chunk; each records iterator must be
+    # consumed before the next chunk is read. Items for which skip(item) is true are not processed.
+    executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+    try:
+        while True:
+            chunk = list(islice(items, chunk_size))
+            if not chunk:
+                break
+            todo = [item for item in chunk if not skip(item)] if skip is not None else chunk
+            if executor is not None:
+                # executor.map keeps the output in the same order as the listing
+                processed = executor.map(lambda item: source.process(item, metrics), todo)
+            else:
+                processed = (source.process(item, metrics) for item in todo)
+            yield chunk, (record for record in processed if record is not None)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def listed_ids(chunk):
+    return [item.get("id") for item in chunk if item.get("id") is not None]
+
+
+def iter_records(source, limit, chunk_size=DEFAULT_CHUNK_SIZE, max_workers=1, progress=None, metrics=None,
+                 checkpoint=None, seen=None):
+    # Yield records chunk by chunk, dropping those that fail validation; only one chunk is
+    # held in memory at a time.
+    # progress, if given, is called with the number of items processed after each chunk.
+    # metrics, if given, is a RunMetrics collecting per-stage timings of this crawl.
+    # checkpoint, if given, is a CrawlCheckpoint: see iter_checkpointed_records.
+    # seen, if given, is a set receiving the id of every listed item, including those without a
+    # valid record, so callers can tell a dropped record from an item that is no longer listed.
+    if metrics is None:
+        metrics = source.run_metrics()
+    if checkpoint is not None:
+        yield from iter_checkpointed_records(source, checkpoint, limit, chunk_size, max_workers, progress, metrics,
+                                             seen)
+        return
+    items = source.iter_items(limit, chunk_size, metrics)
+    done = 0
+    for chunk, records in iter_record_chunks(source, items, chunk_size, max_workers, metrics):
+        if seen is not None:
+            seen.update(listed_ids(chunk))
+        yield from records
+        done += len(chunk)
+        if progress is not None:
+            progress(done)
+
+
+def iter_checkpointed_records(source, checkpoint, limit, chunk_size=DEFAULT_CHUNK_SIZE, max_workers=1,
+                              progress=None, metrics=None, seen=None):
+    # Crawl the pages the checkpoint does not have yet, committing every chunk durably as it
+    # completes, then yield all records from the checkpoint. An interrupted crawl thus resumes at
+    # its first missing page instead of starting over; items already done are not fetched again.
+    done = checkpoint.items_done
+    if progress is not None and done:
+        progress(done)
+    if done < limit:
+        items = source.iter_items(limit, chunk_size, metrics, start_page=checkpoint.pages_done + 1)
+        chunks = iter_record_chunks(source, items, chunk_size, max_workers, metrics, skip=checkpoint.done)
+        for chunk, records in chunks:
+            checkpoint.commit(chunk, list(records))
+            done += len(chunk)
+            if progress is not None:
+                progress(done)
+    if seen is not None:
+        seen.update(checkpoint.ids)
+    yield from checkpoint.iter_records()
+
+
+def write_json_array(records, output_path, compact=False):
+    # Stream records as a JSON array, byte-identical to json.dump(list, indent=2) unless compact
+    count = 0
+
+    def counted():
+        nonlocal count
+        for record in records:
+            count += 1
+            yield record
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.writelines(iter_json_array(counted(), compact))
+    return count
+
+
+def open_checkpoint(source, checkpoint_dir, limit, chunk_size):
+    # CrawlCheckpoint of this crawl, or None (crawl without one) if another crawl is using it
+    try:
+        return CrawlCheckpoint(checkpoint_dir, source.name, limit, chunk_size)
+    except CheckpointInUse as e:
+        print(f"{e}; crawling without a checkpoint")
+        return None
+
+
+def crawl_source(source, limit, output_path=None, chunk_size=DEFAULT_CHUNK_SIZE, max_workers=1,
+                 output_format="json", compression=None, progress=None, metrics=None, compact=False,
+                 checkpoint_dir=None, on_complete=None):
+    # Crawl up to limit records of source into output_path, written as they arrive.
+    # compact: json format with one minified record per line instead of indent=2
+    # checkpoint_dir: keep the progress there and resume from it if an earlier run was interrupted;
+    # records are then written once all pages are crawled and the checkpoint is deleted after that.
+    # on_complete, if given, is called with output_path once it is fully written and returns the
+    # final path (e.g. after moving the file into place); the checkpoint is only deleted after it
+    # succeeds, so an output that was never stored can still be rebuilt from the checkpoint.
+    check_format(output_format, compression)
+    if output_path is None:
+        output_path = os.path.join("outputs", source.output_name + output_suffix(output_format, compression))
+    if metrics is None:
+        metrics = source.run_metrics()
+    checkpoint = open_checkpoint(source, checkpoint_dir, limit, chunk_size) if checkpoint_dir else None
+    produced = iter_records(source, limit, chunk_size, max_workers, progress, metrics, checkpoint)
+
+    # Time spent waiting on the crawl generator; the rest of the writing time is serialization
+    waiting = 0.0
+
+    def records():
+        nonlocal waiting
+        while True:
+            start = time.perf_counter()
+            record = next(produced, None)
+            waiting += time.perf_counter() - start
+            if record is None:
+                return
+            yield record
+
+    start = time.perf_counter()
+    try:
+        if output_format == "json":
+            count = write_json_array(records(), output_path, compact)
+        else:
+            schema = source.parquet_schema() if output_format == "parquet" and source.parquet_schema else None
+            count = write_records(records(), output_path, output_format, compression, schema)
+        if on_complete is not None:
+            output_path = on_complete(output_path)
+    except BaseException:
+        if checkpoint is not None:
+            checkpoint.close()
+        raise
+    if checkpoint is not None:
+        checkpoint.clear()
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0.0
+    metrics.add("serialize", max(elapsed - waiting, 0.0))
+    metrics.count("records", count)
+    source.metrics.records_total.inc(count)
+    source.metrics.records_per_second.set(rate)
+    print(f"Processed {count} {source.record_label} in {elapsed:.2f}s "
+          f"({rate:.1f} {source.record_label}/s, max_workers={max_workers})")
+    for host, stats in get_client().stats().items():
+        print(f"HTTP {host}: {stats}")
+    if source.cache is not None:
+        print(f"{source.name} cache: {source.cache.stats()}")
+    print(f"Stages: {metrics.summary()['stages']}")
+
+    print(f"Data successfully saved to {output_path}")
+    return output_path
+
+
+def crawl_sources(crawls, max_workers=None):
+    # Run several crawls at once, one thread each; every entry of crawls is a dict of crawl_source
+    # keyword arguments. Returns the output paths in the same order; the first failure is raised
+    # once all crawls have finished.
+    with ThreadPoolExecutor(max_workers=max_workers or len(crawls) or 1) as executor:
+        futures = [executor.submit(crawl_source, **crawl) for crawl in crawls]
+    return [future.result() for future in futures]
@@ -0,0 +1,153 @@
+import os
+import sqlite3
+import threading
+import time
+
+from common.serializer import dumps, loads
+
+DEFAULT_CACHE_PATH = "outputs/cache/oa_cache.sqlite"
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Hits only update accessed_at in memory; they are written in one batch every this many hits and
+# before any eviction, so the LRU order stays exact without a write per hit
+ACCESS_FLUSH_SIZE = 256
+
+
+class CachedResponse:
+    def __init__(self, data, etag, last_modified, fetched_at, ttl):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.ttl = ttl
+
+    @property
+    def fresh(self):
+        return time.time() - self.fetched_at < self.ttl
+
+    def validators(self):
+        # Headers for a conditional GET against the origin
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    # Persistent SQLite cache of decoded payloads keyed by oa_id, with TTL and size-bounded LRU eviction.
+    # The total body size is kept in the meta table, updated in the same transaction as every write,
+    # so puts do not sum the whole table and processes sharing the file see the same total.
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, body TEXT NOT NULL, etag TEXT, last_modified TEXT, "
+            "fetched_at REAL NOT NULL, accessed_at REAL NOT NULL, size INTEGER NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        # Caches created before the meta table: start from the current total
+        self.conn.execute(
+            "INSERT OR IGNORE INTO meta SELECT 'bytes', COALESCE(SUM(size), 0) FROM responses"
+        )
+        self.conn.commit()
+        self.accessed = {}
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE key = ?", (str(key),)
+            ).fetchone()
+            if row is None:
+                return None
+            self.accessed[str(key)] = time.time()
+            if len(self.accessed) >= ACCESS_FLUSH_SIZE:
+                self.flush_accessed()
+                self.conn.commit()
+        body, etag, last_modified, fetched_at = row
+        return CachedResponse(loads(body), etag, last_modified, fetched_at, self.ttl)
+
+    def put(self, key, data, etag=None, last_modified=None):
+        body = dumps(data)
+        now = time.time()
+        size = len(body.encode("utf-8"))
+        with self.lock:
+            self.accessed.pop(str(key), None)
+            self.conn.execute(
+                "UPDATE meta SET value = value + ? - COALESCE((SELECT size FROM responses WHERE key = ?), 0) "
+                "WHERE name = 'bytes'", (size, str(key))
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (str(key), body, etag, last_modified, now, now, size)
+            )
+            self.evict()
+            self.conn.commit()
+
+    def touch(self, key):
+        # Origin answered 304 Not Modified: the cached body is fresh again
+        now = time.time()
+        with self.lock:
+            self.accessed.pop(str(key), None)
+            self.conn.execute(
+                "UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE key = ?", (now, now, str(key))
+            )
+            self.conn.commit()
+
+    def flush_accessed(self):
+        # Write the pending hit times; called with the lock held, committed by the caller
+        if self.accessed:
+            self.conn.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self.accessed.items()]
+            )
+            self.accessed.clear()
+
+    def total_bytes(self):
+        return self.conn.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()[0]
+
+    def evict(self):
+        # Drop least recently used entries until the cache fits in max_bytes; the LRU scan only runs
+        # once the running total is over the limit and stops as soon as enough has been dropped
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        self.flush_accessed()
+        stale = []
+        freed = 0
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if total - freed <= self.max_bytes:
+                break
+            stale.append((key,))
+            freed += size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+        self.conn.execute("UPDATE meta SET value = value - ? WHERE name = 'bytes'", (freed,))
+
+    def record(self, outcome):
+        # outcome is one of "hits", "revalidated", "misses"
+        with self.lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self):
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            size = self.total_bytes()
+        return {"entries": entries, "bytes": size, "hits": self.hits,
+                "revalidated": self.revalidated, "misses": self.misses}
+
+    def close(self):
+        with self.lock:
+            self.flush_accessed()
+            self.conn.commit()
+            self.conn.close()
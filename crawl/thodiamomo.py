@@ -1,161 +1,254 @@
 import requests
-import json
-from .momo_map import type_map, server_categories_map, day_mapping
-
-def crawl_momo_data(page_size):
-    # API endpoints
-    main_url = f"https://business.momo.vn/api/search/v2.1/tdmm/oas/recommend?language=vi&pageSize={page_size}&pageNumber=1&isPromotion=false"
-
-    # Reverse server_categories_map for mapping Vietnamese to English
-    reverse_categories_map = {v.lower(): k for k, v in server_categories_map.items()}
-
-    # Initialize output as a list
-    content = []
-
-    try:
-        # Make GET request to main API
-        response = requests.get(main_url)
-        
-        # Check if request was successful
-        if response.status_code == 200:
-            data = response.json()
-            
-            # Process each item in the main response
-            for item in data.get("data", {}).get("content", []):
-                # Process openHour
-                open_hour = {
-                    "monday": [], "tuesday": [], "wednesday": [], "thursday": [],
-                    "friday": [], "saturday": [], "sunday": []
-                }
-                for time_entry in item.get("openingTimes", []):
-                    day = day_mapping.get(time_entry.get("dayOfWeek"))
-                    if day:
-                        for time in time_entry.get("times", []):
-                            time_str = f"{time.get('startTime')} - {time.get('endTime')}"
-                            open_hour[day].append(time_str)
-                
-                # Fetch additional data from secondary API
-                oa_id = item.get("id")
-                secondary_url = f"https://thodia.momo.vn/_next/data/Ngjmk6dQuP_03fqJ-1q8t/oa/{oa_id}.json?oaId={oa_id}"
-                try:
-                    secondary_response = requests.get(secondary_url)
-                    if secondary_response.status_code == 200:
-                        secondary_data = secondary_response.json()
-                        oa_data = secondary_data.get("pageProps", {}).get("oaData", {})
-                        
-                        # Extract and process categories
-                        raw_categories = oa_data.get("categories", []) or []
-                        categories = []
-                        for cat in raw_categories:
-                            cat_name = cat.get("name", cat) if isinstance(cat, dict) else cat
-                            if not isinstance(cat_name, str):
-                                continue
-                            cat_key = reverse_categories_map.get(cat_name.lower())
-                            if cat_key and cat_key not in ["service", "placeholder", "service_desc"]:
-                                categories.append(cat_key)
-                        
-                        # Extract and process utilities
-                        raw_utilities = oa_data.get("utilities", []) or []
-                        utilities = []
-                        for ut in raw_utilities:
-                            ut_name = ut.get("name", ut) if isinstance(ut, dict) else ut
-                            if not isinstance(ut_name, str):
-                                continue
-                            ut_key = reverse_categories_map.get(ut_name.lower())
-                            if ut_key:
-                                utilities.append(ut_key)
-
-                        # Extract and transform address
-                        secondary_address = oa_data.get("address")
-                        address = None
-                        if isinstance(secondary_address, dict):
-                            address = {
-                                "streetId": secondary_address.get("streetId"),
-                                "wardId": secondary_address.get("wardId"),
-                                "districtId": secondary_address.get("districtId"),
-                                "houseNumber": secondary_address.get("houseNumber"),
-                                "province": secondary_address.get("cityName"),
-                                "district": secondary_address.get("districtName"),
-                                "ward": secondary_address.get("wardName"),
-                                "street": f"{secondary_address.get('houseNumber', '')} {secondary_address.get('streetName', '')}".strip()
-                            }
-                            geojson = {
-                                "type": "Point",
-                                "coordinates": [secondary_address.get("longitude"), secondary_address.get("latitude")],
-                                "location": {
-                                    "lat": secondary_address.get("latitude"),
-                                    "long": secondary_address.get("longitude"),
-                                    "streetId": secondary_address.get("streetId"),
-                                    "wardId": secondary_address.get("wardId"),
-                                    "districtId": secondary_address.get("districtId"),
-                                    "houseNumber": secondary_address.get("houseNumber"),
-                                    "province": secondary_address.get("cityName"),
-                                    "district": secondary_address.get("districtName"),
-                                    "ward": secondary_address.get("wardName"),
-                                    "street": f"{secondary_address.get('houseNumber', '')} {secondary_address.get('streetName', '')}".strip(),
-                                    "fullAddress": item.get("address")
-                                }
-                            }
-                        
-                        contact_number = oa_data.get("contactNumber")
-                        description = oa_data.get("description")
-                    else:
-                        print(f"Secondary API error for ID {oa_id}: {secondary_response.status_code}")
-                        categories = []
-                        utilities = []
-                        secondary_address = None
-                        contact_number = None
-                        description = None
-                except requests.exceptions.RequestException as e:
-                    print(f"Secondary API request failed for ID {oa_id}: {e}")
-                    categories = []
-                    utilities = []
-                    secondary_address = None
-                    contact_number = None
-                    description = None
-                
-                # Determine type
-                determined_type = item.get("type")
-                for type_key, type_categories in type_map.items():
-                    if any(cat in type_categories for cat in categories):
-                        determined_type = type_key
-                        break
-                
-                # Construct processed item
-                processed_item = {
-                    "name": item.get("name"),
-                    "address": address,
-                    "locate": {
-                        "lat": item.get("location", {}).get("lat"),
-                        "long": item.get("location", {}).get("lon")
-                    },
-                    "geojson": geojson,
-                    "imgs": [img.get("originalUrl") for img in item.get("bannerImgUrls", [])],
-                    "rating": item.get("rating"),
-                    "ratingCount": item.get("ratingCount"),
-                    "districtName": item.get("districtName"),
-                    "cityName": item.get("cityName"),
-                    "type": determined_type,
-                    "openHour": open_hour,
-                    "price": item.get("avgPrice"),
-                    "avgUnit": item.get("avgUnit"),
-                    "categories": categories,
-                    "phones": [contact_number] if contact_number else [],
-                    "exts": utilities,
-                    "description": description
+from common.formats import parquet_schema_for_crawl
+from common.metrics import registry
+from common.models import Merchant
+from .build_id import build_id_resolver
+from .http_client import get_client
+from .classifier import classifier
+from .momo_map import day_mapping
+from .pipeline import (
+    DEFAULT_CHUNK_SIZE, Source, SourceMetrics, crawl_source, fetch_cached_json, iter_paged, iter_records, register,
+    timed,
+)
+
+# API endpoints (override these to point the crawler at a local stub server)
+MAIN_API_URL = "https://business.momo.vn/api/search/v2.1/tdmm/oas/recommend"
+THODIA_BASE_URL = "https://thodia.momo.vn"
+# Next.js build id of thodia; the current one is read from the site (crawl.build_id),
+# this one is only used if discovery fails
+THODIA_BUILD_ID = "Ngjmk6dQuP_03fqJ-1q8t"
+
+# Placeholder labels of the MoMo merchant form that are not real categories/utilities
+EXCLUDED_CATEGORIES = ("service", "placeholder", "service_placeholder", "service_desc")
+EXCLUDED_UTILITIES = ("service_placeholder",)
+
+# Stages: recommend (main API pages), oa_data (per-merchant detail), transform (build_item),
+# serialize (writing records to the output file)
+MOMO_METRICS = SourceMetrics("momo", "MoMo")
+STAGE_SECONDS = MOMO_METRICS.stage_seconds
+OA_DATA_TOTAL = registry.counter(
+    "momo_oa_data_total", "oaData lookups by outcome (hit, revalidated, miss, error, build_id_retry)", ("outcome",)
+)
+RECORDS_TOTAL = MOMO_METRICS.records_total
+RECORDS_PER_SECOND = MOMO_METRICS.records_per_second
+
+
+def count_oa_outcome(metrics, outcome):
+    OA_DATA_TOTAL.inc(outcome=outcome)
+    if metrics is not None:
+        metrics.count(f"oa_data_{outcome}")
+
+
+def build_open_hour(item):
+    open_hour = {
+        "monday": [], "tuesday": [], "wednesday": [], "thursday": [],
+        "friday": [], "saturday": [], "sunday": []
+    }
+    for time_entry in item.get("openingTimes", []):
+        day = day_mapping.get(time_entry.get("dayOfWeek"))
+        if day:
+            for time_range in time_entry.get("times", []):
+                time_str = f"{time_range.get('startTime')} - {time_range.get('endTime')}"
+                open_hour[day].append(time_str)
+    return open_hour
+
+
+def oa_data_url(thodia_url, build_id, oa_id):
+    return f"{thodia_url}/_next/data/{build_id}/oa/{oa_id}.json?oaId={oa_id}"
+
+
+def fetch_oa_data(oa_id, thodia_url=THODIA_BASE_URL, cache=None, metrics=None):
+    # Fetch additional data from secondary API, None on any failure.
+    # With a cache, fresh entries skip the network and stale ones are revalidated.
+    # A burst of 404s means thodia was redeployed: the buildId is re-discovered and the request retried.
+    # The buildId is only looked up when the request goes to the network (not for fresh cache hits).
+    build_ids = build_id_resolver(thodia_url, THODIA_BUILD_ID)
+    build_id = None
+
+    def url():
+        nonlocal build_id
+        build_id = build_ids.get()
+        return oa_data_url(thodia_url, build_id, oa_id)
+
+    def retry_url():
+        nonlocal build_id
+        retry_id = build_ids.not_found(build_id)
+        if retry_id is None:
+            return None
+        build_id = retry_id
+        count_oa_outcome(metrics, "build_id_retry")
+        return oa_data_url(thodia_url, build_id, oa_id)
+
+    def outcome(name):
+        if name in ("miss", "revalidated"):
+            build_ids.found()
+        count_oa_outcome(metrics, name)
+
+    return fetch_cached_json(
+        url, oa_id, cache,
+        extract=lambda payload: payload.get("pageProps", {}).get("oaData", {}),
+        outcome=outcome,
+        label="Secondary API",
+        on_not_found=retry_url
+    )
+
+
+def map_category_names(raw_items, excluded=()):
+    keys = []
+    for raw in raw_items or []:
+        name = raw.get("name", raw) if isinstance(raw, dict) else raw
+        if not isinstance(name, str):
+            continue
+        key = classifier.lookup(name)
+        if key and key not in excluded:
+            keys.append(key)
+    return keys
+
+
+def build_item(item, oa_data):
+    categories = []
+    utilities = []
+    address = None
+    geojson = None
+    contact_number = None
+    description = None
+
+    if oa_data is not None:
+        # Extract and process categories / utilities
+        categories = map_category_names(oa_data.get("categories", []), excluded=EXCLUDED_CATEGORIES)
+        utilities = map_category_names(oa_data.get("utilities", []), excluded=EXCLUDED_UTILITIES)
+
+        # Extract and transform address
+        secondary_address = oa_data.get("address")
+        if isinstance(secondary_address, dict):
+            street = f"{secondary_address.get('houseNumber', '')} {secondary_address.get('streetName', '')}".strip()
+            address = {
+                "streetId": secondary_address.get("streetId"),
+                "wardId": secondary_address.get("wardId"),
+                "districtId": secondary_address.get("districtId"),
+                "houseNumber": secondary_address.get("houseNumber"),
+                "province": secondary_address.get("cityName"),
+                "district": secondary_address.get("districtName"),
+                "ward": secondary_address.get("wardName"),
+                "street": street
+            }
+            geojson = {
+                "type": "Point",
+                "coordinates": [secondary_address.get("longitude"), secondary_address.get("latitude")],
+                "location": {
+                    "lat": secondary_address.get("latitude"),
+                    "long": secondary_address.get("longitude"),
+                    "streetId": secondary_address.get("streetId"),
+                    "wardId": secondary_address.get("wardId"),
+                    "districtId": secondary_address.get("districtId"),
+                    "houseNumber": secondary_address.get("houseNumber"),
+                    "province": secondary_address.get("cityName"),
+                    "district": secondary_address.get("districtName"),
+                    "ward": secondary_address.get("wardName"),
+                    "street": street,
+                    "fullAddress": item.get("address")
                 }
-                content.append(processed_item)
-            
-            # Save to JSON file
-            output_path = "outputs/momo_data.json"
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(content, f, ensure_ascii=False, indent=2)
-            
-            print(f"Data successfully saved to {output_path}")
-            return output_path
-            
-        else:
+            }
+
+        contact_number = oa_data.get("contactNumber")
+        description = oa_data.get("description")
+
+    # Determine type
+    determined_type = classifier.classify(categories, default=item.get("type"))
+
+    # Construct processed item
+    return {
+        "id": item.get("id"),
+        "name": item.get("name"),
+        "address": address,
+        "locate": {
+            "lat": item.get("location", {}).get("lat"),
+            "long": item.get("location", {}).get("lon")
+        },
+        "geojson": geojson,
+        "imgs": [img.get("originalUrl") for img in item.get("bannerImgUrls", [])],
+        "rating": item.get("rating"),
+        "ratingCount": item.get("ratingCount"),
+        "districtName": item.get("districtName"),
+        "cityName": item.get("cityName"),
+        "type": determined_type,
+        "openHour": build_open_hour(item),
+        "price": item.get("avgPrice"),
+        "avgUnit": item.get("avgUnit"),
+        "categories": categories,
+        "phones": [contact_number] if contact_number else [],
+        "exts": utilities,
+        "description": description
+    }
+
+
+def fetch_recommend_page(page_number, chunk_size, main_url=MAIN_API_URL, metrics=None):
+    params = {"language": "vi", "pageSize": chunk_size, "pageNumber": page_number, "isPromotion": "false"}
+    with timed(metrics, "recommend"):
+        try:
+            response = get_client().get(main_url, params=params)
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Main API request failed: {e}")
+        if response.status_code != 200:
             raise Exception(f"Main API error: {response.status_code} - {response.text}")
-            
-    except requests.exceptions.RequestException as e:
-        raise Exception(f"Main API request failed: {e}")
\ No newline at end of file
+        return response.json().get("data", {}).get("content", [])
+
+
+def iter_recommend_items(page_size, chunk_size=DEFAULT_CHUNK_SIZE, main_url=MAIN_API_URL, metrics=None,
+                         start_page=1):
+    # Walk pageNumber in fixed-size chunks until page_size items or the last page
+    return iter_paged(
+        lambda page_number, size: fetch_recommend_page(page_number, size, main_url, metrics), page_size, chunk_size,
+        start_page
+    )
+
+
+@register
+class MomoSource(Source):
+    # Thổ Địa MoMo merchants: recommend pages, then the oaData of every merchant
+    name = "thodiamomo"
+    output_name = "momo_data"
+    record_label = "merchants"
+    detail_stage = "oa_data"
+    metrics = MOMO_METRICS
+    parquet_schema = staticmethod(parquet_schema_for_crawl)
+
+    def __init__(self, main_url=MAIN_API_URL, thodia_url=THODIA_BASE_URL, cache=None):
+        super().__init__(cache)
+        self.main_url = main_url
+        self.thodia_url = thodia_url
+
+    def iter_items(self, limit, chunk_size=DEFAULT_CHUNK_SIZE, metrics=None, start_page=1):
+        return iter_recommend_items(limit, chunk_size, self.main_url, metrics, start_page)
+
+    def fetch_detail(self, item, metrics=None):
+        return fetch_oa_data(item.get("id"), self.thodia_url, self.cache, metrics)
+
+    def build_record(self, item, detail):
+        return build_item(item, detail)
+
+    def validate(self, record):
+        Merchant.from_crawl(record)
+
+
+def process_item(item, thodia_url=THODIA_BASE_URL, cache=None, metrics=None):
+    # Processed record, or None if it fails validation
+    return MomoSource(thodia_url=thodia_url, cache=cache).process(item, metrics)
+
+
+def iter_momo_data(page_size, chunk_size=DEFAULT_CHUNK_SIZE, max_workers=1, main_url=MAIN_API_URL,
+                   thodia_url=THODIA_BASE_URL, cache=None, progress=None, metrics=None, checkpoint=None, seen=None):
+    # Yield processed items page by page, see pipeline.iter_records
+    source = MomoSource(main_url, thodia_url, cache)
+    return iter_records(source, page_size, chunk_size, max_workers, progress, metrics, checkpoint, seen)
+
+
+def crawl_momo_data(page_size, max_workers=1, main_url=MAIN_API_URL, thodia_url=THODIA_BASE_URL,
+                    output_path=None, chunk_size=DEFAULT_CHUNK_SIZE, cache=None, output_format="json",
+                    compression=None, progress=None, metrics=None, compact=False, checkpoint_dir=None):
+    # Crawl page_size merchants into output_path (default outputs/momo_data.<format>), see pipeline.crawl_source.
+    # With checkpoint_dir an interrupted crawl resumes where it stopped when called again.
+    return crawl_source(
+        MomoSource(main_url, thodia_url, cache), page_size, output_path, chunk_size, max_workers,
+        output_format, compression, progress, metrics, compact, checkpoint_dir
+    )
@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+
+import requests
+from common.models import RecordError, check_number, check_strings, check_text
+from .http_client import get_client
+from .pipeline import DEFAULT_CHUNK_SIZE, Source, SourceMetrics, fetch_cached_json, iter_paged, register, timed
+
+# API endpoints (override these to point the crawler at a local stub server).
+# NOT VERIFIED against the live API: the paths and payload shapes below (data.results for search,
+# data.result for an event) are assumptions, and the mock server encodes the same assumptions, so it
+# cannot check them. The app keeps /process_ticketbox unimplemented and the source out of
+# /process_sources (unless TICKETBOX_ENABLED=1) until real responses, recorded with
+#   python -m crawl.ticketbox --capture tests/fixtures/ticketbox
+# are committed and tests/test_ticketbox.py passes on them.
+TICKETBOX_API_URL = "https://api-v2.ticketbox.vn"
+TICKETBOX_WEB_URL = "https://ticketbox.vn"
+SEARCH_PATH = "/search/v2/events"
+EVENT_PATH = "/gin/api/v1/events/{event_id}"
+
+# Stages: search (event list pages), event (per-event detail), transform (build_event), serialize
+TICKETBOX_METRICS = SourceMetrics("ticketbox", "Ticketbox")
+
+
+def fetch_search_page(page_number, page_size, api_url=TICKETBOX_API_URL, metrics=None):
+    params = {"page": page_number, "limit": page_size}
+    with timed(metrics, "search"):
+        try:
+            response = get_client().get(f"{api_url}{SEARCH_PATH}", params=params)
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Ticketbox search request failed: {e}")
+        if response.status_code != 200:
+            raise Exception(f"Ticketbox search error: {response.status_code} - {response.text}")
+        return search_results(response.json())
+
+
+def search_results(payload):
+    # Listed events of one search response
+    return (payload.get("data") or {}).get("results") or []
+
+
+def event_result(payload):
+    # Event detail of one event response
+    return (payload.get("data") or {}).get("result") or {}
+
+
+def count_event_outcome(metrics, outcome):
+    if metrics is not None:
+        metrics.count(f"event_{outcome}")
+
+
+def fetch_event(event_id, api_url=TICKETBOX_API_URL, cache=None, metrics=None):
+    # Event detail, None on any failure; cached like the MoMo oaData
+    return fetch_cached_json(
+        f"{api_url}{EVENT_PATH.format(event_id=event_id)}", event_id, cache,
+        extract=event_result,
+        outcome=lambda outcome: count_event_outcome(metrics, outcome),
+        label="Ticketbox event API"
+    )
+
+
+def ticket_prices(showings):
+    prices = []
+    for showing in showings:
+        for ticket in showing.get("ticketTypes") or []:
+            price = ticket.get("price")
+            if isinstance(price, (int, float)):
+                prices.append(price)
+    return prices
+
+
+def build_showings(showings):
+    return [
+        {
+            "startTime": showing.get("startTime"),
+            "endTime": showing.get("endTime"),
+            "ticketTypes": [
+                {"name": ticket.get("name"), "price": ticket.get("price")}
+                for ticket in showing.get("ticketTypes") or []
+            ]
+        }
+        for showing in showings
+    ]
+
+
+def category_names(categories):
+    names = [category.get("name") if isinstance(category, dict) else category for category in categories or []]
+    return [name for name in names if isinstance(name, str)]
+
+
+def build_event(item, event, web_url=TICKETBOX_WEB_URL):
+    # Search result (+ event detail when it could be fetched) -> output record
+    event = event or {}
+    showings = event.get("showings") or []
+    prices = ticket_prices(showings)
+    listed_price = item.get("price")
+    if not prices and isinstance(listed_price, (int, float)):
+        prices = [listed_price]
+    imgs = [url for url in (event.get("bannerURL") or event.get("logoURL") or item.get("imageUrl"),) if url]
+    path = item.get("url") or event.get("url")
+    return {
+        "id": item.get("id"),
+        "name": event.get("title") or item.get("name"),
+        "url": f"{web_url}/{path.lstrip('/')}" if path and not path.startswith("http") else path,
+        "imgs": imgs,
+        "startTime": event.get("startTime") or item.get("day"),
+        "endTime": event.get("endTime"),
+        "venue": event.get("venue"),
+        "address": event.get("address"),
+        "categories": category_names(event.get("categories")),
+        "organizer": event.get("orgName"),
+        "minPrice": min(prices) if prices else None,
+        "maxPrice": max(prices) if prices else None,
+        "showings": build_showings(showings),
+        "description": event.get("description")
+    }
+
+
+@register
+class TicketboxSource(Source):
+    # Ticketbox events: search pages, then the detail (showings, ticket types) of every event
+    name = "ticketbox"
+    output_name = "ticketbox_data"
+    record_label = "events"
+    detail_stage = "event"
+    metrics = TICKETBOX_METRICS
+
+    def __init__(self, api_url=TICKETBOX_API_URL, web_url=TICKETBOX_WEB_URL, cache=None):
+        super().__init__(cache)
+        self.api_url = api_url
+        self.web_url = web_url
+
+    def iter_items(self, limit, chunk_size=DEFAULT_CHUNK_SIZE, metrics=None, start_page=1):
+        return iter_paged(
+            lambda page_number, size: fetch_search_page(page_number, size, self.api_url, metrics), limit, chunk_size,
+            start_page
+        )
+
+    def fetch_detail(self, item, metrics=None):
+        return fetch_event(item.get("id"), self.api_url, self.cache, metrics)
+
+    def build_record(self, item, detail):
+        return build_event(item, detail, self.web_url)
+
+    def validate(self, record):
+        if record["id"] is None:
+            raise RecordError("id", "is required")
+        check_text(record["name"], "name", required=True)
+        check_number(record["minPrice"], "minPrice", low=0)
+        check_strings(record["imgs"], "imgs")
+        check_strings(record["categories"], "categories")
+
+
+def capture_fixtures(output_dir, api_url=TICKETBOX_API_URL, page_size=5):
+    # Record one raw search page and the detail of its events, to check the assumed endpoints and
+    # payload shapes against the live API (see tests/test_ticketbox.py)
+    os.makedirs(output_dir, exist_ok=True)
+
+    def save(name, url, params=None):
+        response = get_client().get(url, params=params)
+        response.raise_for_status()
+        payload = response.json()
+        with open(os.path.join(output_dir, name), "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        return payload
+
+    items = search_results(save("search.json", f"{api_url}{SEARCH_PATH}", {"page": 1, "limit": page_size}))
+    for item in items:
+        save(f"event-{item.get('id')}.json", f"{api_url}{EVENT_PATH.format(event_id=item.get('id'))}")
+    print(f"Captured {len(items)} Ticketbox events into {output_dir}")
+    return output_dir
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--capture", required=True, help="directory receiving the recorded responses")
+    parser.add_argument("--api-url", default=TICKETBOX_API_URL)
+    parser.add_argument("--page-size", type=int, default=5)
+    args = parser.parse_args()
+    capture_fixtures(args.capture, args.api_url, args.page_size)
+
+
+if __name__ == "__main__":
+    main()
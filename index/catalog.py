@@ -0,0 +1,69 @@
+import json
+import os
+import threading
+
+from common.formats import read_jsonl
+from common.lazy import lazy_module
+
+# Các chỉ mục cần numpy, chỉ nạp khi được dùng lần đầu (app khởi động không phải import numpy)
+open_hours = lazy_module('index.open_hours')
+search_index = lazy_module('index.search')
+spatial = lazy_module('index.spatial')
+
+
+def load_records(path):
+    # File kết quả crawl_momo_data/process_momo: mảng JSON hoặc JSON Lines (.jsonl, .jsonl.gz, .jsonl.zst)
+    if '.jsonl' in os.path.basename(path):
+        return list(read_jsonl(path))
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class MerchantCatalog:
+    # Danh sách merchant đã nạp cùng các chỉ mục dựng lười (chỉ khi được dùng lần đầu)
+    def __init__(self, records, source=None, search_root=None):
+        # search_root: thư mục lưu chỉ mục tìm kiếm trên đĩa (None thì chỉ dựng trong bộ nhớ)
+        self.records = records
+        self.source = source
+        self.search_root = search_root
+        self.lock = threading.Lock()
+        self._spatial = None
+        self._open_hours = None
+        self._search = None
+
+    @property
+    def spatial(self):
+        with self.lock:
+            if self._spatial is None:
+                self._spatial = spatial.SpatialIndex.from_records(self.records)
+            return self._spatial
+
+    @property
+    def open_hours(self):
+        with self.lock:
+            if self._open_hours is None:
+                self._open_hours = open_hours.OpenHoursIndex.from_records(self.records)
+            return self._open_hours
+
+    @property
+    def search(self):
+        with self.lock:
+            if self._search is None:
+                self._search = search_index.load_search_index(self.records, self.source, self.search_root)
+            return self._search
+
+
+_catalog = None
+_catalog_key = None
+_catalog_lock = threading.Lock()
+
+
+def load_catalog(path, search_root=None):
+    # Giữ catalog của file gần nhất trong bộ nhớ; nạp lại khi file đổi (đường dẫn hoặc mtime)
+    global _catalog, _catalog_key
+    key = (os.path.abspath(path), os.path.getmtime(path), search_root)
+    with _catalog_lock:
+        if _catalog_key != key:
+            _catalog = MerchantCatalog(load_records(path), source=path, search_root=search_root)
+            _catalog_key = key
+        return _catalog
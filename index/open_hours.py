@@ -0,0 +1,102 @@
+import re
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from common.formats import WEEK_DAYS
+
+# Mỗi ngày 96 ô 15 phút, cả tuần 7 x 96 = 672 bit = 84 byte cho mỗi merchant
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+SLOTS_PER_WEEK = 7 * SLOTS_PER_DAY
+# Giờ mở cửa của MoMo là giờ Việt Nam
+LOCAL_TIMEZONE = timezone(timedelta(hours=7))
+
+time_range_pattern = re.compile(r'(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})')
+
+
+def parse_time_range(text):
+    # "HH:MM - HH:MM" -> (phút bắt đầu, phút kết thúc) trong ngày, None nếu không đọc được.
+    # Kết thúc 23:59 được coi là hết ngày (24:00).
+    match = time_range_pattern.search(text or '')
+    if match is None:
+        return None
+    start_hour, start_minute, end_hour, end_minute = map(int, match.groups())
+    start, end = start_hour * 60 + start_minute, end_hour * 60 + end_minute
+    if start > 24 * 60 or end > 24 * 60 or start_minute > 59 or end_minute > 59:
+        return None
+    if end == 24 * 60 - 1:
+        end = 24 * 60
+    return start, end
+
+
+def compile_week(open_hour):
+    # openHour {'monday': ['08:00 - 22:00', ...], ...} -> mảng bool 672 ô của cả tuần.
+    # Ô được đánh dấu nếu khoảng mở cửa chạm vào nó (bắt đầu làm tròn xuống, kết thúc làm tròn lên).
+    # Khoảng qua đêm (22:00 - 02:00) tràn sang ngày hôm sau, chủ nhật tràn sang thứ hai;
+    # bắt đầu bằng kết thúc (00:00 - 00:00) được coi là mở cả ngày.
+    week = np.zeros(SLOTS_PER_WEEK, dtype=bool)
+    for day_index, day in enumerate(WEEK_DAYS):
+        for text in (open_hour or {}).get(day) or []:
+            parsed = parse_time_range(text)
+            if parsed is None:
+                continue
+            start, end = parsed
+            if end <= start:
+                end += 24 * 60
+            first = day_index * SLOTS_PER_DAY + start // SLOT_MINUTES
+            last = day_index * SLOTS_PER_DAY + -(-end // SLOT_MINUTES)
+            slots = np.arange(first, last) % SLOTS_PER_WEEK
+            week[slots] = True
+    return week
+
+
+def schedule_key(open_hour):
+    return tuple(tuple(open_hour.get(day) or ()) for day in WEEK_DAYS) if isinstance(open_hour, dict) else None
+
+
+def week_slot(when):
+    # datetime (không có múi giờ thì hiểu là giờ Việt Nam) -> chỉ số ô trong tuần
+    if when.tzinfo is not None:
+        when = when.astimezone(LOCAL_TIMEZONE)
+    return when.weekday() * SLOTS_PER_DAY + (when.hour * 60 + when.minute) // SLOT_MINUTES
+
+
+class OpenHoursIndex:
+    # Lịch mở cửa của mọi merchant (theo thứ tự bản ghi) là ma trận bit (n, 84) uint8, lưu chuyển vị
+    # (84, n) để "ai đang mở lúc T" chỉ đọc một hàng byte liền nhau cho cả n merchant.
+    # Lịch giống nhau chỉ được biên dịch một lần.
+    def __init__(self, bitmaps):
+        bitmaps = np.asarray(bitmaps, dtype=np.uint8).reshape(-1, SLOTS_PER_WEEK // 8)
+        self.columns = np.ascontiguousarray(bitmaps.T)
+
+    @classmethod
+    def from_records(cls, records):
+        compiled = {}
+        codes = np.empty(len(records), dtype=np.int64)
+        for position, record in enumerate(records):
+            key = schedule_key(record.get('openHour'))
+            code = compiled.get(key)
+            if code is None:
+                code = compiled[key] = len(compiled)
+            codes[position] = code
+        schedules = np.zeros((len(compiled), SLOTS_PER_WEEK), dtype=bool)
+        for key, code in compiled.items():
+            if key is not None:
+                schedules[code] = compile_week(dict(zip(WEEK_DAYS, key)))
+        return cls(np.packbits(schedules, axis=1)[codes])
+
+    def __len__(self):
+        return self.columns.shape[1]
+
+    def open_mask(self, slot):
+        byte, bit = divmod(slot, 8)
+        return (self.columns[byte] & (0x80 >> bit)) != 0
+
+    def open_at(self, when=None):
+        # Vị trí (trong danh sách bản ghi) các merchant mở cửa tại when (mặc định: bây giờ)
+        return np.flatnonzero(self.open_mask(week_slot(when or datetime.now(LOCAL_TIMEZONE))))
+
+    def is_open(self, position, when=None):
+        byte, bit = divmod(week_slot(when or datetime.now(LOCAL_TIMEZONE)), 8)
+        return bool(self.columns[byte, position] & (0x80 >> bit))
@@ -0,0 +1,378 @@
+import bisect
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from array import array
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+from crawl.classifier import normalize_label
+from crawl.momo_map import server_categories_map
+
+# Tăng khi đổi cách tách từ/chấm điểm để chỉ mục cũ trên đĩa không được dùng lại
+INDEX_VERSION = 1
+# Trọng số tf theo trường: khớp ở tên quan trọng hơn ở nhãn danh mục, địa chỉ và mô tả
+NAME_WEIGHT, LABEL_WEIGHT, ADDRESS_WEIGHT, DESCRIPTION_WEIGHT = 3, 2, 1, 1
+BM25_K1, BM25_B = 1.2, 0.75
+# Từ cuối của truy vấn (đang gõ dở) khớp thêm các từ bắt đầu bằng nó: tối đa MAX_PREFIX_TERMS từ
+# phổ biến nhất, điểm nhân PREFIX_FACTOR để khớp đúng từ vẫn đứng trước
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_TERMS = 64
+PREFIX_FACTOR = 0.5
+FACETS = ('categories', 'exts', 'type', 'district')
+# Số chỉ mục (mỗi phiên bản file nguồn một thư mục) giữ lại trên đĩa
+MAX_STORED_INDEXES = 4
+
+token_pattern = re.compile(r'[a-z0-9]+')
+# Số bit 1 của từng giá trị byte, cho numpy chưa có np.bitwise_count (< 2.0)
+POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+def fold_table():
+    # Bảng str.translate cho kết quả như normalize_label trên từng ký tự Latin có dấu (gồm cả chữ Việt
+    # dựng sẵn), dấu rời (NFD) thì bị xóa: nhanh hơn nhiều lần so với tách NFD rồi lọc từng ký tự
+    table = {code: None for code in range(0x300, 0x370)}
+    for start, end in ((0xC0, 0x250), (0x1E00, 0x1F00)):
+        for code in range(start, end):
+            folded = normalize_label(chr(code))
+            if folded != chr(code):
+                table[code] = folded
+    return table
+
+
+FOLD_TABLE = fold_table()
+
+
+def tokenize(text):
+    # Tiếng Việt viết tách âm tiết bằng khoảng trắng: bỏ dấu (đ -> d), chữ thường, lấy các cụm chữ/số.
+    # "Phở Bò" và "pho bo" cho cùng token
+    return token_pattern.findall(text.lower().translate(FOLD_TABLE)) if isinstance(text, str) else []
+
+
+def as_list(value):
+    if isinstance(value, str):
+        return [value]
+    return [item for item in value if isinstance(item, str)] if isinstance(value, list) else []
+
+
+@lru_cache(maxsize=4096)
+def label_tokens(key):
+    # Key danh mục/tiện ích (beef_noodle_soup) -> token của tên hiển thị tiếng Việt kèm chính key;
+    # số key ít nên tách từ mỗi key một lần
+    return tuple(tokenize(f"{server_categories_map.get(key, '')} {key.replace('_', ' ')}"))
+
+
+def record_district(record):
+    # districtName của crawl_momo_data, district của process_momo, không có thì lấy từ địa chỉ
+    district = record.get('districtName') or record.get('district')
+    if not isinstance(district, str) or not district:
+        district = (record.get('address') or {}).get('district')
+    return district if isinstance(district, str) and district else None
+
+
+def record_fields(record):
+    # (trọng số, danh sách token, có tạo cặp từ liền nhau không) của từng trường
+    address = record.get('address') if isinstance(record.get('address'), dict) else {}
+    labels = as_list(record.get('categories')) + as_list(record.get('exts')) + as_list(record.get('type'))
+    return [
+        (NAME_WEIGHT, tokenize(record.get('name')), True),
+        (LABEL_WEIGHT, [token for key in labels for token in label_tokens(key)], False),
+        (ADDRESS_WEIGHT, tokenize(' '.join(
+            value for value in (address.get('street'), address.get('ward'), record_district(record))
+            if isinstance(value, str)
+        )), False),
+        (DESCRIPTION_WEIGHT, tokenize(record.get('description')), True),
+    ]
+
+
+def record_terms(record):
+    # {term: tf có trọng số}, độ dài tài liệu. Cặp âm tiết liền nhau ("bun bo") cũng là một term
+    # để truy vấn nhiều từ ưu tiên merchant có đúng cụm từ đó
+    terms = Counter()
+    length = 0
+    for weight, tokens, bigrams in record_fields(record):
+        length += weight * len(tokens)
+        if bigrams:
+            tokens = tokens + list(map(' '.join, zip(tokens, tokens[1:])))
+        # Trọng số nguyên: lặp lại token weight lần để Counter đếm hết trong C
+        terms.update(tokens * weight)
+    return terms, length
+
+
+def record_facets(record):
+    district = record_district(record)
+    return {
+        'categories': as_list(record.get('categories')),
+        'exts': as_list(record.get('exts')),
+        'type': as_list(record.get('type')),
+        'district': [district] if district else [],
+    }
+
+
+def pack_bits(mask):
+    # Mảng bool n phần tử -> bitset np.packbits đệm tới bội của 64 bit, xem như mảng uint64
+    # để AND/OR/đếm bit trên từng word 8 byte thay vì từng byte
+    packed = np.packbits(mask)
+    padded = np.zeros(-(-len(packed) // 8) * 8, dtype=np.uint8)
+    padded[:len(packed)] = packed
+    return padded.view(np.uint64)
+
+
+def unpack_bits(words, count):
+    return np.unpackbits(words.view(np.uint8), count=count).astype(bool)
+
+
+def popcount(words):
+    # Số bit 1 theo hàng cuối của mảng uint64
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return POPCOUNT[words.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+
+def index_key(source):
+    # Chỉ mục đi theo đúng phiên bản file nguồn (đường dẫn, mtime, kích thước) và INDEX_VERSION
+    stat = os.stat(source)
+    return f'{os.path.abspath(source)}|{stat.st_mtime_ns}|{stat.st_size}|{INDEX_VERSION}'
+
+
+def index_path(root, key):
+    return os.path.join(root, hashlib.sha1(key.encode('utf-8')).hexdigest()[:20])
+
+
+class SearchIndex:
+    # Chỉ mục ngược dạng CSR: term i (vocab đã sắp xếp) có posting doc_ids[offsets[i]:offsets[i + 1]]
+    # (vị trí bản ghi, tăng dần) cùng trọng số BM25 tính sẵn; truy vấn chỉ còn cộng mảng numpy.
+    # Mỗi giá trị facet là một bitset n bit (pack_bits): lọc là OR/AND theo word, đếm facet là popcount.
+    def __init__(self, vocab, offsets, doc_ids, weights, facet_values, facet_bits, count):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.facet_values = facet_values
+        self.facet_bits = facet_bits
+        self.count = count
+        self.term_ids = {term: term_id for term_id, term in enumerate(vocab)}
+        self.value_ids = {facet: {value: row for row, value in enumerate(values)}
+                          for facet, values in facet_values.items()}
+
+    @classmethod
+    def from_records(cls, records):
+        count = len(records)
+        all_terms, posting_tfs = [], array('f')
+        term_counts = np.zeros(count, dtype=np.int64)
+        lengths = np.zeros(count, dtype=np.float32)
+        facet_rows = {facet: {} for facet in FACETS}
+        for position, record in enumerate(records):
+            terms, lengths[position] = record_terms(record)
+            all_terms.extend(terms)
+            posting_tfs.extend(terms.values())
+            term_counts[position] = len(terms)
+            for facet, values in record_facets(record).items():
+                rows = facet_rows[facet]
+                for value in values:
+                    rows.setdefault(value, []).append(position)
+
+        # Số term theo thứ tự chữ cái (để tìm tiền tố bằng bisect), rồi gom posting theo term;
+        # sắp xếp ổn định giữ doc_ids tăng dần trong mỗi term
+        vocab = sorted(set(all_terms))
+        term_ids = dict(zip(vocab, range(len(vocab))))
+        terms = np.fromiter(map(term_ids.__getitem__, all_terms), dtype=np.int32, count=len(all_terms))
+        del all_terms
+        order = np.argsort(terms, kind='stable')
+        terms = terms[order]
+        doc_ids = np.repeat(np.arange(count, dtype=np.int32), term_counts)[order]
+        tfs = np.frombuffer(posting_tfs, dtype=np.float32)[order]
+        df = np.bincount(terms, minlength=len(vocab))
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=offsets[1:])
+
+        idf = np.log1p((count - df + 0.5) / (df + 0.5)).astype(np.float32)
+        average = float(lengths.mean()) if count and lengths.mean() > 0 else 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc_ids] / average)
+        weights = (idf[terms] * tfs * (BM25_K1 + 1) / (tfs + norm)).astype(np.float32)
+
+        facet_values, facet_bits = {}, {}
+        for facet, rows in facet_rows.items():
+            values = sorted(rows)
+            bits = np.zeros((len(values), -(-count // 64)), dtype=np.uint64)
+            for row, value in enumerate(values):
+                members = np.zeros(count, dtype=bool)
+                members[rows[value]] = True
+                bits[row] = pack_bits(members)
+            facet_values[facet] = values
+            facet_bits[facet] = bits
+        return cls(vocab, offsets, doc_ids, weights, facet_values, facet_bits, count)
+
+    def save(self, path, key):
+        # Ghi vào thư mục tạm rồi rename: tiến trình khác không bao giờ đọc phải chỉ mục ghi dở
+        root = os.path.dirname(path)
+        os.makedirs(root, exist_ok=True)
+        temp = tempfile.mkdtemp(prefix='.tmp-', dir=root)
+        try:
+            np.save(os.path.join(temp, 'offsets.npy'), self.offsets)
+            np.save(os.path.join(temp, 'doc_ids.npy'), self.doc_ids)
+            np.save(os.path.join(temp, 'weights.npy'), self.weights)
+            for facet in FACETS:
+                np.save(os.path.join(temp, f'facet_{facet}.npy'), self.facet_bits[facet])
+            meta = {'key': key, 'count': self.count, 'vocab': self.vocab, 'facets': self.facet_values}
+            with open(os.path.join(temp, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.rename(temp, path)
+        except OSError:
+            # Tiến trình khác đã ghi xong cùng chỉ mục trước
+            shutil.rmtree(temp, ignore_errors=True)
+            if not os.path.isdir(path):
+                raise
+
+    @classmethod
+    def load(cls, path, key=None):
+        # Mảng posting/bitset được mmap, chỉ trang nào truy vấn chạm tới mới được đọc từ đĩa.
+        # None nếu không có chỉ mục hoặc chỉ mục của phiên bản nguồn khác
+        try:
+            with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if key is not None and meta.get('key') != key:
+            return None
+        return cls(
+            meta['vocab'],
+            np.load(os.path.join(path, 'offsets.npy'), mmap_mode='r'),
+            np.load(os.path.join(path, 'doc_ids.npy'), mmap_mode='r'),
+            np.load(os.path.join(path, 'weights.npy'), mmap_mode='r'),
+            meta['facets'],
+            {facet: np.load(os.path.join(path, f'facet_{facet}.npy'), mmap_mode='r') for facet in FACETS},
+            meta['count'],
+        )
+
+    def __len__(self):
+        return self.count
+
+    def postings(self, term_id):
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return self.doc_ids[start:end], self.weights[start:end]
+
+    def prefix_terms(self, prefix):
+        # Các term đơn bắt đầu bằng prefix, phổ biến nhất trước
+        start = bisect.bisect_left(self.vocab, prefix)
+        end = bisect.bisect_left(self.vocab, prefix + '\uffff')
+        term_ids = [term_id for term_id in range(start, end) if ' ' not in self.vocab[term_id]]
+        if len(term_ids) > MAX_PREFIX_TERMS:
+            df = np.diff(self.offsets)[term_ids]
+            term_ids = [term_ids[i] for i in np.argsort(-df, kind='stable')[:MAX_PREFIX_TERMS]]
+        return term_ids
+
+    def token_scores(self, token, prefix=False):
+        # Điểm của token trên mọi bản ghi (0 = không khớp)
+        scores = np.zeros(self.count, dtype=np.float32)
+        term_id = self.term_ids.get(token)
+        if term_id is not None:
+            docs, weights = self.postings(term_id)
+            scores[docs] = weights
+        if prefix and len(token) >= MIN_PREFIX_LENGTH:
+            for other in self.prefix_terms(token):
+                if other != term_id:
+                    docs, weights = self.postings(other)
+                    scores[docs] = np.maximum(scores[docs], weights * PREFIX_FACTOR)
+        return scores
+
+    def match(self, query, prefix=True):
+        # (mask các bản ghi chứa mọi từ của query, điểm BM25); mask None nếu query không có từ nào.
+        # Từ cuối được khớp theo tiền tố nếu query không kết thúc bằng khoảng trắng
+        tokens = tokenize(query)
+        if not tokens:
+            return None, np.zeros(self.count, dtype=np.float32)
+        prefix = prefix and not query[-1:].isspace()
+        total = np.zeros(self.count, dtype=np.float32)
+        mask = np.ones(self.count, dtype=bool)
+        for index, token in enumerate(tokens):
+            scores = self.token_scores(token, prefix and index == len(tokens) - 1)
+            mask &= scores > 0
+            total += scores
+        for first, second in zip(tokens, tokens[1:]):
+            term_id = self.term_ids.get(f'{first} {second}')
+            if term_id is not None:
+                docs, weights = self.postings(term_id)
+                total[docs] += weights
+        return mask, total
+
+    def filter_bits(self, filters):
+        # filters {facet: [giá trị]}: OR trong một facet, AND giữa các facet; bitset đã pack, None nếu không lọc
+        combined = None
+        for facet, values in (filters or {}).items():
+            if facet not in self.facet_bits:
+                raise ValueError(f"Unknown facet {facet!r}, expected one of {list(FACETS)}")
+            if not values:
+                continue
+            rows = [self.value_ids[facet][value] for value in values if value in self.value_ids[facet]]
+            bits = np.bitwise_or.reduce(self.facet_bits[facet][rows], axis=0) if rows else \
+                np.zeros(-(-self.count // 64), dtype=np.uint64)
+            combined = bits if combined is None else combined & bits
+        return combined
+
+    def facet_counts(self, bits, limit=None):
+        # Số bản ghi trong bitset có từng giá trị facet, nhiều nhất trước
+        counts = {}
+        for facet in FACETS:
+            totals = popcount(self.facet_bits[facet] & bits)
+            order = [row for row in np.argsort(-totals, kind='stable')[:limit] if totals[row] > 0]
+            counts[facet] = {self.facet_values[facet][row]: int(totals[row]) for row in order}
+        return counts
+
+    def search(self, query='', filters=None, limit=20, offset=0, facet_limit=None):
+        # Vị trí bản ghi khớp query và filters (điểm cao trước; không có query thì theo thứ tự bản ghi)
+        # cùng điểm, tổng số kết quả và số đếm facet trên toàn bộ kết quả
+        mask, scores = self.match(query)
+        bits = self.filter_bits(filters)
+        if mask is None and bits is None:
+            mask = np.ones(self.count, dtype=bool)
+        elif mask is None:
+            mask = unpack_bits(bits, self.count)
+        elif bits is not None:
+            mask &= unpack_bits(bits, self.count)
+        positions = np.flatnonzero(mask)
+        end = offset + limit
+        if not scores.any():
+            selected = positions[offset:end]
+        else:
+            if len(positions) > end:
+                # Chỉ sắp xếp end kết quả tốt nhất
+                positions_top = positions[np.argpartition(-scores[positions], end - 1)[:end]]
+            else:
+                positions_top = positions
+            selected = positions_top[np.lexsort((positions_top, -scores[positions_top]))][offset:end]
+        facets = self.facet_counts(pack_bits(mask), facet_limit)
+        return selected, scores[selected], len(positions), facets
+
+
+def prune_indexes(root, keep=MAX_STORED_INDEXES):
+    # Xóa các chỉ mục cũ nhất (của các phiên bản file nguồn trước), giữ lại keep thư mục
+    try:
+        entries = [entry for entry in os.scandir(root) if entry.is_dir() and not entry.name.startswith('.')]
+    except OSError:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[keep:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def load_search_index(records, source=None, root=None):
+    # Chỉ mục của records (nạp từ file source): đọc từ root nếu đã dựng cho đúng phiên bản file này,
+    # không thì dựng rồi lưu lại để lần khởi động sau không phải dựng lại
+    if source is None or root is None:
+        return SearchIndex.from_records(records)
+    key = index_key(source)
+    path = index_path(root, key)
+    index = SearchIndex.load(path, key)
+    if index is not None and len(index) == len(records):
+        return index
+    index = SearchIndex.from_records(records)
+    shutil.rmtree(path, ignore_errors=True)
+    index.save(path, key)
+    prune_indexes(root)
+    return index
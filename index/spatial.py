@@ -0,0 +1,153 @@
+import numpy as np
+
+EARTH_RADIUS_METERS = 6371008.8
+METERS_PER_DEGREE = np.pi * EARTH_RADIUS_METERS / 180
+# Ô lưới 0.01 độ (~1.1 km): truy vấn bán kính vài km chỉ chạm vài chục ô
+DEFAULT_CELL_DEGREES = 0.01
+# Vùng truy vấn phủ nhiều hàng ô hơn thế này thì lọc thẳng trên toàn bộ mảng
+MAX_ROW_SLICES = 64
+
+
+def haversine(lat, lon, lats, lons):
+    # Khoảng cách (mét) từ một điểm tới mảng các điểm
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def record_coordinates(record):
+    # locate của crawl_momo_data/process_momo, thiếu thì lấy từ geojson
+    locate = record.get('locate') or {}
+    lat, lon = locate.get('lat'), locate.get('long')
+    if lat in (None, '') or lon in (None, ''):
+        coordinates = (record.get('geojson') or {}).get('coordinates') or [None, None]
+        lon, lat = coordinates[0], coordinates[1]
+    try:
+        return float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+
+
+class SpatialIndex:
+    # Lưới đều theo độ trên mảng NumPy: điểm được sắp theo id ô, mỗi hàng ô trong vùng truy vấn
+    # là một đoạn liên tục nên chỉ cần hai searchsorted; khoảng cách chính xác tính bằng haversine.
+    # positions[i] là vị trí (trong danh sách bản ghi gốc) của điểm thứ i.
+    def __init__(self, lats, lons, positions=None, cell_degrees=DEFAULT_CELL_DEGREES):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.positions = np.arange(len(self.lats)) if positions is None else np.asarray(positions)
+        self.cell = cell_degrees
+        if len(self.lats):
+            self.lat0, self.lon0 = self.lats.min(), self.lons.min()
+            self.rows = int((self.lats.max() - self.lat0) // self.cell) + 1
+            self.cols = int((self.lons.max() - self.lon0) // self.cell) + 1
+        else:
+            self.lat0 = self.lon0 = 0.0
+            self.rows = self.cols = 0
+        cell_ids = self.cell_rows(self.lats) * self.cols + self.cell_cols(self.lons)
+        self.order = np.argsort(cell_ids, kind='stable')
+        self.sorted_ids = cell_ids[self.order]
+
+    @classmethod
+    def from_records(cls, records, cell_degrees=DEFAULT_CELL_DEGREES):
+        # Bỏ qua bản ghi không có tọa độ hợp lệ
+        lats, lons, positions = [], [], []
+        for position, record in enumerate(records):
+            coordinates = record_coordinates(record)
+            if coordinates is None or not (-90 <= coordinates[0] <= 90 and -180 <= coordinates[1] <= 180):
+                continue
+            lats.append(coordinates[0])
+            lons.append(coordinates[1])
+            positions.append(position)
+        return cls(lats, lons, np.asarray(positions, dtype=np.int64), cell_degrees)
+
+    def __len__(self):
+        return len(self.lats)
+
+    def cell_rows(self, lats):
+        return np.floor((np.asarray(lats) - self.lat0) / self.cell).astype(np.int64)
+
+    def cell_cols(self, lons):
+        return np.floor((np.asarray(lons) - self.lon0) / self.cell).astype(np.int64)
+
+    def lon_ranges(self, lat, lon, lat_span, meters):
+        # Các khoảng kinh độ phủ hình tròn: hình tròn chứa cực thì phủ mọi kinh độ,
+        # vượt kinh tuyến 180 thì thêm phần quấn sang phía bên kia
+        if abs(lat) + lat_span >= 90:
+            return [(-180.0, 180.0)]
+        lon_span = meters / (METERS_PER_DEGREE * np.cos(np.radians(abs(lat) + lat_span)))
+        if lon_span >= 180:
+            return [(-180.0, 180.0)]
+        ranges = [(lon - lon_span, lon + lon_span)]
+        if lon - lon_span < -180:
+            ranges.append((lon - lon_span + 360, 180.0))
+        if lon + lon_span > 180:
+            ranges.append((-180.0, lon + lon_span - 360))
+        return ranges
+
+    def candidates(self, lat, lon, meters):
+        # Chỉ số (trong mảng lats/lons) các điểm thuộc những ô phủ hình tròn bán kính meters
+        lat_span = meters / METERS_PER_DEGREE
+        row_lo = max(int(self.cell_rows(lat - lat_span)), 0)
+        row_hi = min(int(self.cell_rows(lat + lat_span)), self.rows - 1)
+        col_ranges = []
+        for lon_lo, lon_hi in self.lon_ranges(lat, lon, lat_span, meters):
+            col_lo = max(int(self.cell_cols(lon_lo)), 0)
+            col_hi = min(int(self.cell_cols(lon_hi)), self.cols - 1)
+            if col_lo <= col_hi:
+                col_ranges.append((col_lo, col_hi))
+        if row_lo > row_hi or not col_ranges:
+            return np.empty(0, dtype=np.int64)
+        if row_hi - row_lo >= MAX_ROW_SLICES:
+            # Vùng rất rộng: lọc theo khung bao trên toàn bộ điểm rẻ hơn ghép hàng trăm đoạn
+            cell_rows, cell_cols = np.divmod(self.sorted_ids, self.cols)
+            inside = np.zeros(len(cell_cols), dtype=bool)
+            for col_lo, col_hi in col_ranges:
+                inside |= (cell_cols >= col_lo) & (cell_cols <= col_hi)
+            inside &= (cell_rows >= row_lo) & (cell_rows <= row_hi)
+            return self.order[inside]
+        rows = np.arange(row_lo, row_hi + 1) * self.cols
+        slices = []
+        for col_lo, col_hi in col_ranges:
+            starts = np.searchsorted(self.sorted_ids, rows + col_lo, side='left')
+            ends = np.searchsorted(self.sorted_ids, rows + col_hi, side='right')
+            slices.extend((start, end) for start, end in zip(starts, ends) if end > start)
+        if len(slices) == 1:
+            return self.order[slices[0][0]:slices[0][1]]
+        return np.concatenate([self.order[start:end] for start, end in slices] or [np.empty(0, dtype=np.int64)])
+
+    def radius(self, lat, lon, meters, limit=None, mask=None):
+        # (positions, khoảng cách mét) của các điểm trong bán kính, gần nhất trước.
+        # mask: mảng bool theo vị trí bản ghi, chỉ giữ các bản ghi có mask True (vd đang mở cửa)
+        if not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        indices = self.candidates(lat, lon, meters)
+        if mask is not None:
+            indices = indices[mask[self.positions[indices]]]
+        distances = haversine(lat, lon, self.lats[indices], self.lons[indices])
+        inside = distances <= meters
+        indices, distances = indices[inside], distances[inside]
+        ranked = np.argsort(distances, kind='stable')
+        if limit is not None:
+            ranked = ranked[:limit]
+        return self.positions[indices[ranked]], distances[ranked]
+
+    def nearest(self, lat, lon, k, mask=None):
+        # k điểm gần nhất: nới rộng bán kính gấp đôi tới khi có đủ k điểm trong hình tròn
+        # (mọi điểm gần hơn điểm thứ k chắc chắn đã nằm trong đó). Khi hình tròn đã phủ quá
+        # MAX_ROW_SLICES hàng ô (điểm ở xa dữ liệu, dữ liệu thưa) thì quét toàn bộ một lần.
+        k = min(k, len(self) if mask is None else int(np.count_nonzero(mask[self.positions])))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        meters = self.cell * METERS_PER_DEGREE
+        while meters / METERS_PER_DEGREE < MAX_ROW_SLICES * self.cell / 2:
+            positions, distances = self.radius(lat, lon, meters, limit=k, mask=mask)
+            if len(positions) >= k:
+                return positions, distances
+            meters *= 2
+        indices = np.arange(len(self)) if mask is None else np.flatnonzero(mask[self.positions])
+        distances = haversine(lat, lon, self.lats[indices], self.lons[indices])
+        nearest = np.argpartition(distances, k - 1)[:k] if k < len(distances) else np.arange(len(distances))
+        ranked = nearest[np.argsort(distances[nearest], kind='stable')]
+        return self.positions[indices[ranked]], distances[ranked]
@@ -0,0 +1,129 @@
+# Xử lý nhiều file export cùng lúc trên nhiều tiến trình.
+#   python -m preprocessor.batch "uploads/*.json" -o outputs/processed -w 4
+import argparse
+import glob
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from common.formats import OUTPUT_FORMATS, check_format, output_suffix
+
+from .streaming import process_momo_stream
+from .thodiamomo import process_momo
+
+
+def find_inputs(source):
+    # source là thư mục (lấy mọi file .json/.jsonl bên trong) hoặc một glob
+    if os.path.isdir(source):
+        patterns = [os.path.join(source, '*.json'), os.path.join(source, '*.jsonl')]
+    else:
+        patterns = [source]
+    return sorted({path for pattern in patterns for path in glob.glob(pattern) if os.path.isfile(path)})
+
+
+def split_input_name(input_path):
+    # "a.v2.json.gz" -> ("a.v2", ".json"): bỏ đuôi nén rồi mới tách phần mở rộng
+    name = os.path.basename(input_path)
+    for compressed in ('.gz', '.zst'):
+        if name.endswith(compressed):
+            name = name[:-len(compressed)]
+    return os.path.splitext(name)
+
+
+def output_path_for(input_path, output_dir, output_format, compression):
+    name = split_input_name(input_path)[0]
+    return os.path.join(output_dir, f'{name}_processed{output_suffix(output_format, compression)}')
+
+
+def output_paths_for(inputs, output_dir, output_format, compression):
+    # {input: output}. Các input trùng tên gốc (a.json và a.jsonl) thêm phần mở rộng vào tên output;
+    # vẫn còn trùng (cùng tên ở hai thư mục) thì báo lỗi thay vì để các tiến trình ghi đè lên nhau
+    paths = {path: output_path_for(path, output_dir, output_format, compression) for path in inputs}
+    counts = Counter(paths.values())
+    suffix = output_suffix(output_format, compression)
+    for path, output_path in paths.items():
+        if counts[output_path] > 1:
+            name, extension = split_input_name(path)
+            paths[path] = os.path.join(output_dir, f"{name}_{extension.lstrip('.')}_processed{suffix}")
+    duplicates = sorted(path for path, count in Counter(paths.values()).items() if count > 1)
+    if duplicates:
+        raise ValueError(f'Nhiều file input cùng ghi ra {", ".join(duplicates)}')
+    return paths
+
+
+def process_one(input_path, output_path, output_format, compression, batch_size):
+    # Chạy trong tiến trình con: lỗi của một file không ảnh hưởng các file khác
+    start = time.perf_counter()
+    try:
+        if batch_size:
+            process_momo_stream(input_path, output_path, batch_size, output_format, compression)
+        else:
+            process_momo(input_path, output_path, output_format, compression)
+    except Exception as e:
+        return {'input': input_path, 'output': None, 'status': 'error', 'error': f'{type(e).__name__}: {e}',
+                'seconds': time.perf_counter() - start}
+    return {'input': input_path, 'output': output_path, 'status': 'ok', 'error': None,
+            'seconds': time.perf_counter() - start, 'bytes': os.path.getsize(output_path)}
+
+
+def process_momo_batch(source, output_dir, workers=None, output_format='json', compression=None, batch_size=None):
+    # batch_size: dùng chế độ streaming cho từng file (hữu ích với file rất lớn)
+    check_format(output_format, compression)
+    inputs = find_inputs(source)
+    output_paths = output_paths_for(inputs, output_dir, output_format, compression)
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=min(workers, max(len(inputs), 1))) as executor:
+        futures = {
+            executor.submit(
+                process_one, path, output_paths[path], output_format, compression, batch_size
+            ): path
+            for path in inputs
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # Tiến trình con chết (hết bộ nhớ, bị kill...)
+                result = {'input': futures[future], 'output': None, 'status': 'error',
+                          'error': f'{type(e).__name__}: {e}', 'seconds': None}
+            print(f"[{result['status']}] {result['input']} -> {result['output'] or result['error']}")
+            results.append(result)
+
+    results.sort(key=lambda result: inputs.index(result['input']))
+    elapsed = time.perf_counter() - start
+    succeeded = sum(1 for result in results if result['status'] == 'ok')
+    summary = {
+        'files': len(inputs),
+        'succeeded': succeeded,
+        'failed': len(inputs) - succeeded,
+        'workers': workers,
+        'seconds': elapsed,
+        'cpu_seconds': sum(result['seconds'] or 0 for result in results),
+        'results': results,
+    }
+    print(f"Processed {succeeded}/{len(inputs)} files in {elapsed:.2f}s with {workers} workers")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('source', help='thư mục hoặc glob các file export')
+    parser.add_argument('-o', '--output-dir', default='outputs/processed')
+    parser.add_argument('-w', '--workers', type=int, default=None)
+    parser.add_argument('-f', '--format', default='json', choices=OUTPUT_FORMATS)
+    parser.add_argument('-c', '--compression', default=None, choices=['gzip', 'zstd'])
+    parser.add_argument('-b', '--batch-size', type=int, default=None)
+    args = parser.parse_args()
+    summary = process_momo_batch(args.source, args.output_dir, args.workers, args.format, args.compression,
+                                 args.batch_size)
+    if summary['failed']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+# Gộp các merchant trùng nhau giữa nhiều nguồn (kết quả cào, các bản export Version2/Version6 đã xử lý).
+#   python -m preprocessor.dedup outputs/momo_data.json preprocessor/ThoDiaMoMo_Version6.json -o merged.json
+# Chỉ so các cặp cùng khối (cùng ô geohash hoặc ô kề, cùng một token tên hiếm; hoặc cùng số điện thoại)
+# thay vì mọi cặp, rồi chấm điểm theo độ giống tên, khoảng cách và số điện thoại, gộp cụm bằng union-find.
+import argparse
+import json
+import math
+import re
+import time
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations
+
+from common.models import Merchant, RecordError
+from crawl.classifier import normalize_label
+from index.catalog import load_records
+from index.spatial import EARTH_RADIUS_METERS, record_coordinates
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Geohash 7 ký tự: ô ~150 m x 150 m; xét thêm 2 vòng ô xung quanh để phủ đủ MAX_DISTANCE
+GEOHASH_PRECISION = 7
+NEIGHBOUR_CELLS = 2
+# Mỗi bản ghi chỉ tạo khối theo vài token hiếm nhất của tên, khối quá lớn bị bỏ
+BLOCK_TOKENS = 2
+MAX_BLOCK_SIZE = 200
+# Tọa độ lệch quá MAX_DISTANCE mét thì điểm khoảng cách bằng 0; khi đó tên và số điện thoại
+# cộng lại tối đa 0.7 < DEFAULT_THRESHOLD, nên chỉ cần so các bản ghi gần nhau hoặc cùng số điện thoại
+MAX_DISTANCE = 300.0
+NAME_WEIGHT, DISTANCE_WEIGHT, PHONE_WEIGHT = 0.55, 0.3, 0.15
+DEFAULT_THRESHOLD = 0.75
+LIST_FIELDS = ('imgs', 'categories', 'exts', 'phones')
+
+token_pattern = re.compile(r'[a-z0-9]+')
+
+
+def geohash_cell(lat, lon, precision=GEOHASH_PRECISION):
+    # Chỉ số (hàng, cột) của ô geohash: precision*5 bit xen kẽ, kinh độ lấy bit lẻ hơn
+    bits = precision * 5
+    lon_bits, lat_bits = (bits + 1) // 2, bits // 2
+    row = min(int((lat + 90) / 180 * (1 << lat_bits)), (1 << lat_bits) - 1)
+    col = min(int((lon + 180) / 360 * (1 << lon_bits)), (1 << lon_bits) - 1)
+    return row, col
+
+
+def geohash(lat, lon, precision=GEOHASH_PRECISION):
+    row, col = geohash_cell(lat, lon, precision)
+    bits = precision * 5
+    lon_bits, lat_bits = (bits + 1) // 2, bits // 2
+    value = 0
+    for i in range(bits):
+        # Bit chẵn (tính từ trái) là kinh độ, bit lẻ là vĩ độ
+        if i % 2 == 0:
+            value = (value << 1) | ((col >> (lon_bits - 1 - i // 2)) & 1)
+        else:
+            value = (value << 1) | ((row >> (lat_bits - 1 - i // 2)) & 1)
+    return ''.join(GEOHASH_ALPHABET[(value >> shift) & 31] for shift in range(bits - 5, -1, -5))
+
+
+def distance_meters(a, b):
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(min(h, 1.0)))
+
+
+def name_tokens(name):
+    return token_pattern.findall(normalize_label(name or ''))
+
+
+def normalize_phone(phone):
+    digits = re.sub(r'\D', '', str(phone or ''))
+    if digits.startswith('84') and len(digits) > 9:
+        digits = '0' + digits[2:]
+    return digits if len(digits) >= 8 else None
+
+
+class Entity:
+    # Dạng đã chuẩn hóa của một bản ghi, chỉ giữ những gì cần để chặn khối và chấm điểm
+    __slots__ = ('position', 'name', 'tokens', 'coordinates', 'cell', 'phones')
+
+    def __init__(self, position, record):
+        self.position = position
+        self.tokens = name_tokens(record.get('name'))
+        self.name = ' '.join(self.tokens)
+        self.coordinates = record_coordinates(record)
+        if self.coordinates is not None and not (-90 <= self.coordinates[0] <= 90
+                                                 and -180 <= self.coordinates[1] <= 180):
+            self.coordinates = None
+        self.cell = geohash_cell(*self.coordinates) if self.coordinates is not None else None
+        self.phones = {phone for phone in map(normalize_phone, record.get('phones') or []) if phone}
+
+
+def candidate_pairs(entities, max_block_size=MAX_BLOCK_SIZE):
+    # Khối (ô geohash, token): mỗi bản ghi vào khối của ô mình với BLOCK_TOKENS token hiếm nhất,
+    # khi sinh cặp thì xét khối cùng token ở ô mình và các ô trong NEIGHBOUR_CELLS vòng xung quanh.
+    # Bản ghi không tọa độ nằm ở ô None và được so với khối cùng token ở mọi ô (kể cả ô None).
+    document_frequency = Counter(token for entity in entities for token in set(entity.tokens))
+    blocks = defaultdict(list)
+    token_blocks = defaultdict(list)
+    phone_blocks = defaultdict(list)
+    for index, entity in enumerate(entities):
+        rare = sorted(set(entity.tokens), key=lambda token: (document_frequency[token], token))[:BLOCK_TOKENS]
+        for token in rare:
+            blocks[(entity.cell, token)].append(index)
+            token_blocks[token].append(index)
+        for phone in entity.phones:
+            phone_blocks[phone].append(index)
+
+    pairs = set()
+    for (cell, token), members in blocks.items():
+        if cell is None:
+            neighbours = [token_blocks[token]]
+        else:
+            row, col = cell
+            offsets = range(-NEIGHBOUR_CELLS, NEIGHBOUR_CELLS + 1)
+            neighbours = [blocks.get(((row + dr, col + dc), token), ()) for dr in offsets for dc in offsets]
+        others = [index for block in neighbours for index in block]
+        if len(others) > max_block_size:
+            continue
+        for i in members:
+            for j in others:
+                if i != j:
+                    pairs.add((i, j) if i < j else (j, i))
+    for members in phone_blocks.values():
+        if len(members) <= max_block_size:
+            pairs.update(combinations(sorted(members), 2))
+    return pairs
+
+
+def token_overlap(a, b):
+    # Hệ số chồng lấp: tên có thêm hậu tố ("... - Chi nhánh") vẫn được tính là giống hoàn toàn
+    if not a.tokens or not b.tokens:
+        return 0.0
+    tokens_a, tokens_b = set(a.tokens), set(b.tokens)
+    return len(tokens_a & tokens_b) / min(len(tokens_a), len(tokens_b))
+
+
+def score_pair(a, b, threshold=None):
+    # Điểm tối đa 1; thiếu tọa độ thì khoảng cách được tính trung tính (0.5). Cùng số điện thoại được cộng,
+    # cả hai đều có số nhưng không trùng số nào thì bị trừ (thường là các chi nhánh khác nhau của một chuỗi).
+    # Độ giống tên = trung bình độ chồng lấp token và tỉ lệ SequenceMatcher; với threshold, cặp không thể đạt
+    # ngưỡng kể cả khi SequenceMatcher = 1 được trả về ngay mà không chạy SequenceMatcher (phần đắt nhất).
+    if a.coordinates is not None and b.coordinates is not None:
+        distance_score = max(0.0, 1.0 - distance_meters(a.coordinates, b.coordinates) / MAX_DISTANCE)
+    else:
+        distance_score = 0.5
+    if a.phones & b.phones:
+        phone_score = 1.0
+    elif a.phones and b.phones:
+        phone_score = -1.0
+    else:
+        phone_score = 0.0
+    overlap = token_overlap(a, b)
+    score = NAME_WEIGHT * 0.5 * overlap + DISTANCE_WEIGHT * distance_score + PHONE_WEIGHT * phone_score
+    if not a.tokens or not b.tokens or (threshold is not None and score + NAME_WEIGHT * 0.5 < threshold):
+        return score
+    return score + NAME_WEIGHT * 0.5 * SequenceMatcher(None, a.name, b.name).ratio()
+
+
+class UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def is_empty(value, zero=True):
+    # Giá trị trống (zero: kể cả số 0); dict trống khi mọi giá trị bên trong đều trống ({'lat': None, 'long': None})
+    if isinstance(value, dict):
+        return all(is_empty(item, zero) for item in value.values())
+    return value in (None, '', []) or (zero and value == 0 and not isinstance(value, bool))
+
+
+def completeness(record):
+    return sum(1 for value in record.values() if not is_empty(value))
+
+
+def is_processed(record):
+    return 'avgRating' in record
+
+
+def crawl_shape(record):
+    # Dạng chung (bản ghi kết quả cào) để gộp/ghi các bản ghi từ nhiều nguồn; None nếu không khớp mô hình
+    try:
+        return Merchant.from_record(record).to_crawl()
+    except RecordError as e:
+        print(f"Không chuẩn hóa được bản ghi {record.get('name')!r}: {e}")
+        return None
+
+
+def merge_cluster(records):
+    # Mọi bản ghi được đưa về cùng một dạng trước (bản ghi không hợp lệ bị bỏ khỏi phép gộp).
+    # Bản ghi đầy đủ nhất (ưu tiên bản có id của MoMo) làm gốc; trường trống lấy từ bản khác,
+    # các trường danh sách được hợp lại, giữ thứ tự và bỏ trùng
+    shaped = [record for record in map(crawl_shape, records) if record is not None]
+    records = shaped or records
+    ordered = sorted(records, key=lambda record: (record.get('id') is None, -completeness(record)))
+    merged = dict(ordered[0])
+    for record in ordered[1:]:
+        for key, value in record.items():
+            if is_empty(merged.get(key)) and not is_empty(value, zero=False):
+                merged[key] = value
+            elif key in LIST_FIELDS and isinstance(value, list) and isinstance(merged.get(key), list):
+                merged[key] = list(dict.fromkeys(
+                    item for item in merged[key] + value if item not in (None, '') and isinstance(item, str)
+                ))
+    return merged
+
+
+def deduplicate(records, threshold=DEFAULT_THRESHOLD):
+    # Trả về (bản ghi đã gộp theo thứ tự xuất hiện đầu tiên, danh sách cụm vị trí có hơn một bản ghi)
+    entities = [Entity(position, record) for position, record in enumerate(records)]
+    pairs = candidate_pairs(entities)
+    matches = []
+    for i, j in pairs:
+        score = score_pair(entities[i], entities[j], threshold)
+        if score >= threshold:
+            matches.append((score, i, j))
+
+    # Gộp các cặp điểm cao trước; không nối hai cụm đều có số điện thoại mà không trùng số nào,
+    # để một bản ghi thiếu số điện thoại không kéo hai chi nhánh khác nhau vào cùng một cụm
+    clusters = UnionFind(len(records))
+    cluster_phones = {}
+    matched = 0
+    for _, i, j in sorted(matches, reverse=True):
+        root_i, root_j = clusters.find(i), clusters.find(j)
+        if root_i == root_j:
+            continue
+        phones_i = cluster_phones.get(root_i, entities[i].phones)
+        phones_j = cluster_phones.get(root_j, entities[j].phones)
+        if phones_i and phones_j and not phones_i & phones_j:
+            continue
+        clusters.union(i, j)
+        cluster_phones[clusters.find(i)] = phones_i | phones_j
+        matched += 1
+
+    members = defaultdict(list)
+    for position in range(len(records)):
+        members[clusters.find(position)].append(position)
+    merged = [merge_cluster([records[position] for position in group]) if len(group) > 1 else records[group[0]]
+              for group in members.values()]
+    # Đầu vào có cả hai dạng: các bản ghi không bị gộp cũng được đưa về dạng chung của bản đã gộp
+    if len({is_processed(record) for record in records}) > 1:
+        merged = [crawl_shape(record) or record for record in merged]
+    duplicates = [group for group in members.values() if len(group) > 1]
+    print(f"Compared {len(pairs)} candidate pairs, {matched} matches, "
+          f"{len(records)} records -> {len(merged)} ({len(duplicates)} clusters merged)")
+    return merged, duplicates
+
+
+def dedup_files(input_paths, output_path, clusters_path=None, threshold=DEFAULT_THRESHOLD):
+    start = time.perf_counter()
+    records = [record for path in input_paths for record in load_records(path)]
+    merged, duplicates = deduplicate(records, threshold)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(merged, f, ensure_ascii=False, indent=2)
+    if clusters_path:
+        with open(clusters_path, 'w', encoding='utf-8') as f:
+            json.dump([[records[position].get('name') for position in group] for group in duplicates], f,
+                      ensure_ascii=False, indent=2)
+    print(f"Deduplicated {len(records)} records in {time.perf_counter() - start:.2f}s -> {output_path}")
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('inputs', nargs='+', help='file kết quả cào hoặc file đã tiền xử lý (.json/.jsonl)')
+    parser.add_argument('-o', '--output', default='outputs/merchants_dedup.json')
+    parser.add_argument('--clusters', default=None, help='ghi tên các bản ghi bị gộp để kiểm tra lại')
+    parser.add_argument('-t', '--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+    dedup_files(args.inputs, args.output, args.clusters, args.threshold)
+
+
+if __name__ == '__main__':
+    main()
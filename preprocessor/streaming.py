@@ -0,0 +1,111 @@
+import json
+from io import StringIO
+from itertools import islice
+
+import pandas as pd
+
+from common.formats import check_format, dataframe_records, normalize_processed_record, open_text, write_records
+
+from .thodiamomo import coerce_raw_columns, is_json_lines, read_momo, transform_momo
+
+DEFAULT_BATCH_SIZE = 10000
+READ_CHUNK_CHARS = 1 << 20
+
+decoder = json.JSONDecoder()
+
+
+def iter_raw_records(input_path, chunk_chars=READ_CHUNK_CHARS):
+    # Đọc dần mảng JSON ngoài cùng theo từng khối, trả về chuỗi JSON thô của từng record.
+    # Bộ đệm chỉ giữ phần chưa xử lý nên bộ nhớ không phụ thuộc kích thước file.
+    with open(input_path, 'r', encoding='utf-8') as f:
+        buf = ''
+        pos = 0
+        eof = False
+        started = False
+        while True:
+            while pos < len(buf) and (buf[pos].isspace() or (started and buf[pos] == ',')):
+                pos += 1
+            if pos >= len(buf):
+                if eof:
+                    raise ValueError(f'Unexpected end of JSON array in {input_path}')
+                buf = f.read(chunk_chars)
+                eof = not buf
+                pos = 0
+                continue
+            if not started:
+                if buf[pos] != '[':
+                    raise ValueError(f'{input_path} is not a JSON array of records')
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == ']':
+                return
+            try:
+                _, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                end = None
+            # Record bị cắt ngang ở cuối khối: đọc thêm rồi giải mã lại
+            if end is None or (end >= len(buf) and not eof):
+                if eof:
+                    raise ValueError(f'Invalid JSON record in {input_path} near offset {pos}')
+                more = f.read(chunk_chars)
+                eof = not more
+                buf = buf[pos:] + more
+                pos = 0
+                continue
+            yield buf[pos:end]
+            pos = end
+
+
+def iter_batches(input_path, batch_size=DEFAULT_BATCH_SIZE):
+    # DataFrame theo từng lô, cùng kiểu cột như read_momo đọc cả file
+    if is_json_lines(input_path):
+        with pd.read_json(input_path, lines=True, chunksize=batch_size, dtype=False) as reader:
+            for batch in reader:
+                yield coerce_raw_columns(batch)
+        return
+    records = iter_raw_records(input_path)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        yield read_momo(StringIO('[' + ','.join(batch) + ']'))
+
+
+def iter_processed_batches(input_path, batch_size=DEFAULT_BATCH_SIZE):
+    # Bỏ cả các lô không còn dòng nào sau khi lọc dòng không hợp lệ
+    for batch in iter_batches(input_path, batch_size):
+        if batch.empty:
+            continue
+        momo = transform_momo(batch)
+        if not momo.empty:
+            yield momo
+
+
+def process_momo_stream(input_path, output_path, batch_size=DEFAULT_BATCH_SIZE, output_format='json',
+                        compression=None):
+    # Giống process_momo nhưng đọc, biến đổi và ghi theo lô: bộ nhớ tối đa phụ thuộc batch_size.
+    # Kết quả trùng byte với process_momo.
+    check_format(output_format, compression)
+    frames = iter_processed_batches(input_path, batch_size)
+    total = 0
+    if output_format == 'json':
+        with open(output_path, 'w', encoding='utf-8') as out:
+            out.write('[')
+            for momo in frames:
+                text = momo.to_json(orient='records', force_ascii=False, indent=4)
+                if total:
+                    out.write(',')
+                out.write(text[1:-2])
+                total += len(momo)
+            out.write('\n]' if total else '\n\n]')
+    elif output_format == 'jsonl':
+        with open_text(output_path, 'w', compression) as out:
+            for momo in frames:
+                out.write(momo.to_json(orient='records', force_ascii=False, lines=True))
+                total += len(momo)
+    else:
+        records = (normalize_processed_record(record) for momo in frames for record in dataframe_records(momo))
+        total = write_records(records, output_path, output_format)
+    print(f'Processed {total} records from {input_path} in batches of {batch_size}')
+    return output_path
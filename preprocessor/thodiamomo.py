@@ -1,10 +1,402 @@
-import pandas as pd
+import gc
 import re
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from common.formats import check_format, dataframe_records, normalize_processed_record, write_records
+from common.lazy import optional_module
+from common.models import PROCESSED_COLUMN_CHECKS, PROCESSED_COLUMN_FAST_CHECKS, RecordError
+
+# Tùy chọn: có pyarrow thì tách chuỗi địa chỉ, giờ mở cửa, tọa độ, ảnh bằng pyarrow.compute (.str của pandas
+# trên cột object chạy từng chuỗi bằng Python); không có thì dùng .str, kết quả như nhau
+pa = optional_module('pyarrow')
+pc = optional_module('pyarrow.compute')
+
+# Chuyển đổi openHour
+day_mapping = {
+    'thứ 2': 'monday',
+    'thứ 3': 'tuesday',
+    'thứ 4': 'wednesday',
+    'thứ 5': 'thursday',
+    'thứ 6': 'friday',
+    'thứ 7': 'saturday',
+    'chủ nhật': 'sunday'
+}
+
+image_columns = [f'Image{i}' for i in range(1, 13)]
+columns_to_drop = ['url_address', 'logo_avt', 'avt_ImageURL', 'avt_Image_URL_backup', 'review1', 'review2', 'review3', 'review4', 'review5']
+coordinates_pattern = r'query=([-+]?\d*\.\d+),([-+]?\d*\.\d+)'
+coordinates_regex = re.compile(coordinates_pattern)
+# RE2 của pyarrow: \d chỉ khớp chữ số ASCII nên chỉ dùng cho chuỗi ASCII, chuỗi khác đi qua re
+arrow_coordinates_pattern = r'query=(?P<lat>[-+]?\d*\.\d+),(?P<long>[-+]?\d*\.\d+)'
+JSON_LINES_SUFFIXES = ('.jsonl', '.ndjson')
+# Giá "150.000đ/ người" sau khi bỏ dấu chấm và khoảng trắng; chuỗi khác đi qua int() từng dòng
+price_pattern = r'[+-]?[0-9]{1,18}'
+
+
+@contextmanager
+def paused_gc():
+    # Tạo hàng trăm nghìn list/dict liên tiếp làm GC chạy liên tục; tạm tắt GC trong lúc biến đổi
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def non_empty_text(series):
+    # Chuỗi không rỗng, các giá trị còn lại (NaN, '', số...) thành NaN
+    text = series.astype(object)
+    is_text = text.map(type) == str
+    return text.where(is_text & (text != ''))
+
+
+def is_arrow_text(series):
+    # Cột chuỗi của pandas lưu bằng pyarrow (kiểu str mặc định khi có pyarrow)
+    return pa is not None and isinstance(series.dtype, pd.StringDtype) and series.dtype.storage == 'pyarrow'
+
+
+def arrow_text(values):
+    # Cột pyarrow các chuỗi không rỗng (null ở NaN, '', số...); None nếu không có pyarrow hoặc có chuỗi
+    # pyarrow không biểu diễn được (surrogate lẻ), khi đó dùng .str
+    if pa is None:
+        return None
+    if is_arrow_text(values):
+        text = pa.array(values)
+    else:
+        try:
+            text = pa.array(non_empty_text(values).to_numpy(), type=pa.large_string(), from_pandas=True)
+        except (UnicodeError, pa.ArrowException):
+            return None
+    if isinstance(text, pa.ChunkedArray):
+        text = text.combine_chunks()
+    return pc.if_else(pc.not_equal(text, ''), text, None)
+
+
+def arrow_strings(values):
+    # Mảng object các chuỗi Python của một cột pyarrow (None ở null), giá trị lặp lại dùng chung đối tượng
+    encoded = pc.dictionary_encode(values)
+    table = np.empty(len(encoded.dictionary) + 1, dtype=object)
+    table[:-1] = encoded.dictionary.to_pylist()
+    return table[encoded.indices.fill_null(len(table) - 1).to_numpy()]
+
+
+def list_items(lists, item, mask=None):
+    # Phần tử thứ item của từng list (pyarrow ListArray, null ở các dòng mask)
+    starts = lists.offsets.to_numpy()[:-1]
+    return lists.values.take(pa.array(starts + item, mask=mask))
+
+
+def per_unique(series, build):
+    # Biến đổi mỗi giá trị khác nhau đúng một lần rồi trải lại cho từng dòng theo mã factorize.
+    # Các dòng cùng giá trị dùng chung một list/dict kết quả: chép ra trước khi sửa.
+    if not is_arrow_text(series):
+        series = series.astype(object)
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    built = build(pd.Series(uniques, dtype=series.dtype))
+    if all(isinstance(value, int) for value in built):
+        table = np.asarray(built)
+    else:
+        table = np.empty(len(built), dtype=object)
+        for pos, value in enumerate(built):
+            table[pos] = value
+    return pd.Series(table[codes], index=series.index)
+
+
+def split_or_empty(series, sep):
+    def build(values):
+        return [p if isinstance(p, list) else [] for p in non_empty_text(values).str.split(sep)]
+    return per_unique(series, build)
+
+
+def build_imgs(momo):
+    # Gộp Image1..Image12 thành list, bỏ giá trị rỗng, giữ thứ tự cột.
+    # Trải phẳng ma trận ảnh theo hàng (giống stack) rồi cắt lại theo số ảnh của mỗi dòng
+    if all(is_arrow_text(momo[col]) for col in image_columns):
+        # Chỉ đổi sang chuỗi Python các ô có ảnh
+        columns = [arrow_text(momo[col]) for col in image_columns]
+        keep = np.column_stack([pc.is_valid(column).to_numpy(zero_copy_only=False) for column in columns])
+        images = np.empty(keep.shape, dtype=object)
+        for position, column in enumerate(columns):
+            images[keep[:, position], position] = arrow_strings(column.drop_null())
+    else:
+        images = momo[image_columns].to_numpy(dtype=object)
+        keep = pd.notna(images) & (images != '')
+    flat = images[keep].tolist()
+    bounds = np.cumsum(keep.sum(axis=1)).tolist()
+    starts = [0] + bounds[:-1]
+    return pd.Series([flat[a:b] for a, b in zip(starts, bounds)], index=momo.index, dtype=object)
+
+
+def parse_open_hours(values):
+    # "Thứ 2, 08:00 đến 22:00; Thứ 3, ..." -> {'monday': ['08:00 - 22:00'], ...}
+    result = [{v: [] for v in day_mapping.values()} for _ in range(len(values))]
+    text = arrow_text(values)
+    if text is not None:
+        return fill_open_hours_arrow(result, text)
+    entries = non_empty_text(values).str.split('; ').explode()
+    entries = entries[entries.notna() & entries.str.contains(',', regex=False)]
+    if entries.empty:
+        return result
+    parts = entries.str.split(', ', n=1, expand=True)
+    days = parts[0].str.strip().str.lower().map(day_mapping)
+    times = parts[1].str.replace(' đến ', ' - ', regex=False)
+    valid = days.notna()
+    for pos, day, time_part in zip(entries.index[valid], days[valid], times[valid]):
+        result[pos][day].append(time_part)
+    return result
+
+
+def fill_open_hours_arrow(result, text):
+    entries = pc.split_pattern(text, '; ')
+    rows = pc.list_parent_indices(entries)
+    entries = pc.list_flatten(entries)
+    has_comma = pc.match_substring(entries, ',')
+    rows = rows.filter(has_comma).to_numpy()
+    halves = pc.split_pattern(entries.filter(has_comma), ', ', max_splits=1)
+    if not len(halves):
+        return result
+    # Tên ngày chỉ có vài giá trị khác nhau: chuẩn hóa bằng strip/lower của Python như bản .str
+    day_parts = pc.dictionary_encode(pc.list_element(halves, 0))
+    day_names = np.array([day_mapping.get(part.strip().lower()) for part in day_parts.dictionary.to_pylist()]
+                         + [None], dtype=object)
+    days = day_names[day_parts.indices.to_numpy()]
+    # Mục không có ", " thì tên ngày còn dấu phẩy, không khớp ngày nào; phần giờ của nó để null
+    single = pc.list_value_length(halves).to_numpy() < 2
+    times = arrow_strings(pc.replace_substring(list_items(halves, 1, single), ' đến ', ' - '))
+    valid = pd.notna(days)
+    for pos, day, time_part in zip(rows[valid].tolist(), days[valid].tolist(), times[valid].tolist()):
+        result[pos][day].append(time_part)
+    return result
+
+
+def build_open_hour(series):
+    return per_unique(series, parse_open_hours)
+
+
+def extract_price(price_str):
+    if pd.isna(price_str) or not price_str:
+        return 0
+    try:
+        return int(price_str.split('đ')[0].replace('.', '').replace(' ', '').split('/')[0])
+    except:
+        return 0
+
+
+def parse_prices(values):
+    text = non_empty_text(values)
+    digits = (
+        text.str.split('đ').str[0]
+        .str.replace('.', '', regex=False)
+        .str.replace(' ', '', regex=False)
+        .str.split('/').str[0]
+        .str.strip()
+    )
+    fast = digits.str.fullmatch(price_pattern).fillna(False).astype(bool)
+    prices = [0] * len(values)
+    for pos, value in zip(np.flatnonzero(fast.to_numpy()), digits[fast]):
+        prices[pos] = int(value)
+    # Các chuỗi hiếm gặp (dấu _, chữ số unicode, số rất lớn) dùng lại đúng logic int()
+    for pos, value in zip(np.flatnonzero((text.notna() & ~fast).to_numpy()), text[text.notna() & ~fast]):
+        prices[pos] = extract_price(value)
+    return prices
+
+
+def build_price(series):
+    return per_unique(series, parse_prices)
+
+
+def parse_addresses(values):
+    text = arrow_text(values)
+    if text is not None:
+        return parse_addresses_arrow(text)
+    parts = non_empty_text(values).str.split(', ')
+    full = parts.str.len() >= 4
+    street = parts.str[0].where(full, values)
+    columns = [street, parts.str[1], parts.str[2], parts.str[3]]
+    addresses = []
+    for has_text, is_full, street_val, ward, district, province in zip(parts.notna(), full, *columns):
+        if not has_text:
+            addresses.append({'province': '', 'district': '', 'ward': '', 'street': ''})
+        elif is_full:
+            addresses.append({'province': province, 'district': district, 'ward': ward, 'street': street_val})
+        else:
+            addresses.append({'province': '', 'district': '', 'ward': '', 'street': street_val})
+    return addresses
+
+
+def parse_addresses_arrow(text):
+    parts = pc.split_pattern(text, ', ')
+    full = pc.list_value_length(parts).fill_null(0).to_numpy() >= 4
+    columns = [arrow_strings(list_items(parts, item, ~full)).tolist() for item in range(4)]
+    addresses = []
+    for is_full, value, street, ward, district, province in zip(full.tolist(), arrow_strings(text).tolist(),
+                                                                *columns):
+        if is_full:
+            addresses.append({'province': province, 'district': district, 'ward': ward, 'street': street})
+        else:
+            addresses.append({'province': '', 'district': '', 'ward': '', 'street': value or ''})
+    return addresses
+
+
+def build_address(series):
+    return per_unique(series, parse_addresses)
+
+
+def parse_coordinates(values):
+    text = arrow_text(values)
+    if text is not None:
+        return parse_coordinates_arrow(text)
+    coords = non_empty_text(values).str.extract(coordinates_pattern)
+    lat = coords[0].astype(float)
+    long = coords[1].astype(float)
+    return [
+        {'long': lo, 'lat': la} if matched else {'long': '', 'lat': ''}
+        for matched, lo, la in zip(coords[0].notna(), long, lat)
+    ]
+
+
+def parse_coordinates_arrow(text):
+    matches = pc.extract_regex(text, arrow_coordinates_pattern)
+    matched = pc.is_valid(matches).to_numpy(zero_copy_only=False)
+    found = matches.filter(matched)
+    lat = np.full(len(text), np.nan)
+    long = np.full(len(text), np.nan)
+    lat[matched] = pc.cast(pc.struct_field(found, 'lat'), pa.float64()).to_numpy()
+    long[matched] = pc.cast(pc.struct_field(found, 'long'), pa.float64()).to_numpy()
+    locates = [
+        {'long': lo, 'lat': la} if is_matched else {'long': '', 'lat': ''}
+        for is_matched, lo, la in zip(matched.tolist(), long.tolist(), lat.tolist())
+    ]
+    # Chuỗi có ký tự ngoài ASCII (có thể có chữ số Unicode) tìm lại bằng re như bản .str
+    others = pc.invert(pc.string_is_ascii(text)).fill_null(False).to_numpy(zero_copy_only=False)
+    for pos in np.flatnonzero(others).tolist():
+        match = coordinates_regex.search(text[pos].as_py())
+        locates[pos] = (
+            {'long': float(match.group(2)), 'lat': float(match.group(1))} if match else {'long': '', 'lat': ''}
+        )
+    return locates
+
+
+def build_locate(series):
+    # Trích xuất tọa độ từ url_address
+    return per_unique(series, parse_coordinates)
+
+
+def build_phones(series):
+    present = series.notna().tolist()
+    text = series.astype(str).tolist()
+    return pd.Series([[t] if p else [''] for p, t in zip(present, text)], index=series.index, dtype=object)
+
+
+def distinct_values(series):
+    # (mã của từng dòng, các giá trị khác nhau): theo giá trị nếu hash được, không thì theo đối tượng
+    # (list/dict dựng bằng per_unique vốn đã dùng chung giữa các dòng)
+    try:
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+        return codes, uniques.tolist()
+    except TypeError:
+        pass
+    values = series.to_numpy(dtype=object)
+    codes, _ = pd.factorize(np.fromiter(map(id, values), dtype=np.uint64, count=len(values)))
+    # Vị trí xuất hiện đầu tiên của từng mã
+    first = np.empty(codes.max() + 1 if len(codes) else 0, dtype=np.int64)
+    first[codes[::-1]] = np.arange(len(codes) - 1, -1, -1)
+    return codes, values[first].tolist()
+
+
+def invalid_rows(momo):
+    # Vị trí các dòng không khớp mô hình Merchant (common.models) -> lỗi đầu tiên của dòng đó.
+    # Mỗi giá trị khác nhau của một cột chỉ được kiểm tra một lần; các cột có giá trị gần như khác nhau
+    # ở mọi dòng (tên, địa chỉ, tọa độ...) lọc nhanh trước, chỉ giá trị còn nghi ngờ mới qua check đầy đủ.
+    errors = {}
+    for column, check in PROCESSED_COLUMN_CHECKS.items():
+        if column not in momo.columns:
+            continue
+        codes, uniques = distinct_values(momo[column])
+        accept = PROCESSED_COLUMN_FAST_CHECKS.get(column)
+        if accept is not None:
+            suspects = np.flatnonzero(~np.asarray(accept(uniques), dtype=bool)).tolist()
+        else:
+            suspects = range(len(uniques))
+        failed = {}
+        for code in suspects:
+            try:
+                check(uniques[code])
+            except RecordError as error:
+                failed[code] = error
+        if failed:
+            for position in np.flatnonzero(np.isin(codes, list(failed))).tolist():
+                errors.setdefault(position, failed[codes[position]])
+    return errors
+
+
+def drop_invalid_rows(momo):
+    errors = invalid_rows(momo)
+    if not errors:
+        return momo
+    positions = sorted(errors)
+    print(f"Bỏ {len(positions)} dòng không hợp lệ (dòng {positions[0]}: {errors[positions[0]]})")
+    return momo.drop(index=momo.index[positions])
+
+
+def parse_number(value, integral=False):
+    # Chuỗi số ("5.0", "1") -> số; giá trị khác giữ nguyên để bước kiểm tra Merchant quyết định
+    if isinstance(value, str):
+        try:
+            number = float(value)
+        except ValueError:
+            return value
+    elif type(value) in (int, float):
+        number = value
+    else:
+        return value
+    if integral and number.is_integer():
+        return int(number)
+    return float(number)
 
-def process_momo(input_path, output_path):
-    # Đọc file JSON
-    momo = pd.read_json(input_path, orient='records')
 
+def coerce_numbers(series, integral=False):
+    def build(values):
+        return [parse_number(value, integral) for value in values]
+    return per_unique(series, build)
+
+
+def coerce_raw_columns(momo):
+    # Export thô lưu rating, count_comments dạng chuỗi. Đổi từng giá trị thay vì để pandas suy luận
+    # kiểu cả cột: kết quả suy luận phụ thuộc vào các dòng được đọc cùng nhau (cả file hay một lô),
+    # ví dụ một lô toàn số điện thoại chỉ có chữ số sẽ thành int64 và mất số 0 ở đầu
+    if 'rating' in momo.columns:
+        momo['rating'] = coerce_numbers(momo['rating'])
+    if 'count_comments' in momo.columns:
+        momo['count_comments'] = coerce_numbers(momo['count_comments'], integral=True)
+    return momo
+
+
+def is_json_lines(input_path):
+    # Export dạng JSON Lines (một record mỗi dòng), kể cả khi nén .gz/.zst
+    path = str(input_path).lower()
+    for compressed in ('.gz', '.zst'):
+        if path.endswith(compressed):
+            path = path[:-len(compressed)]
+    return path.endswith(JSON_LINES_SUFFIXES)
+
+
+def read_momo(source, **kwargs):
+    # Đọc export thô với kiểu cột cố định, dùng chung cho process_momo và bản xử lý theo lô
+    return coerce_raw_columns(pd.read_json(source, orient='records', dtype=False, **kwargs))
+
+
+def transform_momo(momo):
+    with paused_gc():
+        return drop_invalid_rows(transform_columns(momo))
+
+
+def transform_columns(momo):
     # Đổi tên các cột
     momo = momo.rename(columns={
         'rating': 'avgRating',
@@ -15,110 +407,60 @@ def process_momo(input_path, output_path):
     })
 
     # Tạo cột imgs từ Image1 đến Image12
-    image_columns = [f'Image{i}' for i in range(1, 13)]
     # Đảm bảo các cột Image tồn tại, nếu không thì tạo cột rỗng
     for col in image_columns:
         if col not in momo.columns:
             momo[col] = ''
-    # Tạo cột imgs bằng cách gộp các giá trị từ Image1 đến Image12
-    momo['imgs'] = momo[image_columns].apply(
-        lambda row: [img for img in row if pd.notna(img) and img != ''], axis=1
-    )
+    momo['imgs'] = build_imgs(momo)
     momo = momo.drop(columns=image_columns)
 
-    # Chuyển đổi openHour
-    day_mapping = {
-        'thứ 2': 'monday',
-        'thứ 3': 'tuesday',
-        'thứ 4': 'wednesday',
-        'thứ 5': 'thursday',
-        'thứ 6': 'friday',
-        'thứ 7': 'saturday',
-        'chủ nhật': 'sunday'
-    }
-
-    def convert_open_hour(open_hour_str):
-        if pd.isna(open_hour_str) or not open_hour_str:
-            return {v: [] for v in day_mapping.values()}
-        open_hour_dict = {v: [] for v in day_mapping.values()}
-        entries = open_hour_str.split('; ')
-        for entry in entries:
-            if entry and ',' in entry:
-                day_part, time_part = entry.split(', ', 1)
-                day_part = day_part.strip().lower()
-                time_part = time_part.replace(' đến ', ' - ')
-                if day_part in day_mapping:
-                    day = day_mapping[day_part]
-                    open_hour_dict[day].append(time_part)
-        return open_hour_dict
-
-    momo['openHour'] = momo['openHour'].apply(convert_open_hour)
-
-    # Chuyển đổi exts
-    momo['exts'] = momo['exts'].apply(lambda x: x.split(';') if pd.notna(x) and x else [])
-
-    # Chuyển đổi categories
-    momo['categories'] = momo['categories'].apply(lambda x: x.split('-') if pd.notna(x) and x else [])
+    momo['openHour'] = build_open_hour(momo['openHour'])
 
-    # Xử lý price
-    def extract_price(price_str):
-        if pd.isna(price_str) or not price_str:
-            return 0
-        try:
-            return int(price_str.split('đ')[0].replace('.', '').replace(' ', '').split('/')[0])
-        except:
-            return 0
+    # Chuyển đổi exts và categories
+    momo['exts'] = split_or_empty(momo['exts'], ';')
+    momo['categories'] = split_or_empty(momo['categories'], '-')
 
-    momo['price'] = momo['price'].apply(extract_price)
+    # Xử lý price
+    momo['price'] = build_price(momo['price'])
 
     # Xử lý address
-    def parse_address(address_str):
-        if pd.isna(address_str) or not address_str:
-            return {'province': '', 'district': '', 'ward': '', 'street': ''}
-        parts = address_str.split(', ')
-        if len(parts) >= 4:
-            street = parts[0]
-            ward = parts[1]
-            district = parts[2]
-            province = parts[3]
-        else:
-            street = address_str
-            ward = district = province = ''
-        return {
-            'province': province,
-            'district': district,
-            'ward': ward,
-            'street': street
-        }
-
-    momo['address'] = momo['address'].apply(parse_address)
+    momo['address'] = build_address(momo['address'])
 
     # Trích xuất tọa độ từ url_address
-    def extract_coordinates(url):
-        if pd.isna(url) or not url:
-            return {'long': '', 'lat': ''}
-        match = re.search(r'query=([-+]?\d*\.\d+),([-+]?\d*\.\d+)', url)
-        if match:
-            lat = float(match.group(1))
-            long = float(match.group(2))
-            return {'long': long, 'lat': lat}
-        return {'long': '', 'lat': ''}
-
-    momo['locate'] = momo['url_address'].apply(extract_coordinates)
+    momo['locate'] = build_locate(momo['url_address'])
 
     # Xử lý phones
-    momo['phones'] = momo['phones'].apply(lambda x: [str(x)] if pd.notna(x) else [''])
+    momo['phones'] = build_phones(momo['phones'])
 
     # Thêm cột type
-    momo['type'] = momo['type'] if 'type' in momo.columns else ['family_meal']
+    momo['type'] = momo['type'] if 'type' in momo.columns else 'family_meal'
 
     # Bỏ các cột không cần thiết
-    columns_to_drop = ['url_address', 'logo_avt', 'avt_ImageURL', 'avt_Image_URL_backup', 'review1', 'review2', 'review3', 'review4', 'review5']
     momo = momo.drop(columns=[col for col in columns_to_drop if col in momo.columns])
 
     # Xóa cột trùng lặp
     momo = momo.loc[:, ~momo.columns.duplicated()]
+    return momo
+
+
+def write_momo(momo, output_path, output_format='json', compression=None):
+    if output_format == 'json':
+        momo.to_json(output_path, orient='records', force_ascii=False, indent=4)
+    elif output_format == 'jsonl':
+        momo.to_json(output_path, orient='records', force_ascii=False, lines=True, compression=compression)
+    else:
+        records = map(normalize_processed_record, dataframe_records(momo))
+        write_records(records, output_path, output_format)
+
+
+def process_momo(input_path, output_path, output_format='json', compression=None):
+    check_format(output_format, compression)
+
+    # Đọc file JSON (mảng records hoặc JSON Lines)
+    momo = read_momo(input_path, lines=is_json_lines(input_path))
+
+    momo = transform_momo(momo)
 
-    # Lưu file JSON
-    momo.to_json(output_path, orient='records', force_ascii=False, indent=4)
-    return output_path
\ No newline at end of file
+    # Lưu file theo định dạng yêu cầu (mặc định JSON có thụt lề như trước)
+    write_momo(momo, output_path, output_format, compression)
+    return output_path
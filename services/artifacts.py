@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+# Mặc định: giữ tối đa 2 GB hoặc 7 ngày, file tạm bỏ dở quá 1 ngày thì xóa
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+STALE_TMP_AGE = 24 * 3600
+
+# <hash key 16 ký tự>-<thời điểm tạo ms>-<ngẫu nhiên 8 ký tự><đuôi file>. Tuổi của file tính từ lúc commit
+# (mtime), không phải thời điểm tạo trong tên: một job chạy lâu vẫn có kết quả "mới" khi xong
+ARTIFACT_NAME = re.compile(r'^(?P<key>[0-9a-f]{16})-(?P<created>\d+)-[0-9a-f]{8}(?P<suffix>\..+)$')
+
+
+def key_hash(key):
+    payload = json.dumps(list(key) if isinstance(key, tuple) else key, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class Artifact:
+    def __init__(self, store, key, suffix):
+        self.key = key
+        now_ms = int(time.time() * 1000)
+        self.name = f'{key_hash(key)}-{now_ms}-{uuid.uuid4().hex[:8]}{suffix}'
+        self.tmp_path = os.path.join(store.tmp_dir, self.name)
+        self.path = os.path.join(store.root, self.name)
+
+
+class ArtifactStore:
+    # Kho file kết quả: mỗi job có đường dẫn riêng, ghi vào thư mục tạm rồi rename nguyên tử,
+    # dọn theo tuổi và tổng dung lượng. Chỉ quản lý các file do chính kho tạo ra (ARTIFACT_NAME).
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        self.root = root
+        self.tmp_dir = os.path.join(root, '.tmp')
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.lock = threading.Lock()
+
+    def create(self, key, suffix):
+        return Artifact(self, key, suffix)
+
+    def commit(self, artifact):
+        # os.replace trên cùng filesystem là nguyên tử: người đọc không bao giờ thấy file dở dang.
+        # mtime đặt lại ngay trước đó là thời điểm commit
+        os.utime(artifact.tmp_path)
+        os.replace(artifact.tmp_path, artifact.path)
+        self.evict()
+        return artifact.path
+
+    def discard(self, artifact):
+        try:
+            os.remove(artifact.tmp_path)
+        except OSError:
+            pass
+
+    def entries(self):
+        # (đường dẫn, hash key, thời điểm commit, kích thước) của các file đã commit
+        result = []
+        for name in os.listdir(self.root):
+            match = ARTIFACT_NAME.match(name)
+            if match is None:
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            result.append((path, match.group('key'), stat.st_mtime, stat.st_size))
+        return result
+
+    def find_recent(self, key, max_age):
+        # File mới nhất của cùng key còn trong max_age giây, để dùng lại thay vì chạy lại
+        wanted = key_hash(key)
+        cutoff = time.time() - max_age
+        recent = [entry for entry in self.entries() if entry[1] == wanted and entry[2] >= cutoff]
+        if not recent:
+            return None
+        return max(recent, key=lambda entry: entry[2])[0]
+
+    def latest(self, suffix):
+        # File mới nhất có đuôi suffix (vd '.json' là kết quả cào full), None nếu kho trống
+        matches = [entry for entry in self.entries() if entry[0].endswith(suffix)]
+        if not matches:
+            return None
+        return max(matches, key=lambda entry: entry[2])[0]
+
+    def evict(self):
+        with self.lock:
+            now = time.time()
+            entries = sorted(self.entries(), key=lambda entry: entry[2])
+            total = sum(entry[3] for entry in entries)
+            removed = 0
+            for path, _, committed, size in entries:
+                if now - committed <= self.max_age and total <= self.max_bytes:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+            for name in os.listdir(self.tmp_dir):
+                path = os.path.join(self.tmp_dir, name)
+                try:
+                    if now - os.path.getmtime(path) > STALE_TMP_AGE:
+                        os.remove(path)
+                except OSError:
+                    pass
+            return removed
@@ -0,0 +1,270 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+ERROR = 'error'
+
+# Giữ thông tin job đã xong trong bộ nhớ bao lâu (giây)
+DEFAULT_JOB_TTL = 3600
+# Ghi tiến độ ra đĩa tối đa mỗi giây một lần
+PROGRESS_FLUSH_INTERVAL = 1.0
+# Worker khác vừa lấy khóa của key nhưng chưa kịp ghi id job: chờ tối đa chừng này giây
+ACTIVE_JOB_WAIT = 2.0
+# Quét file trạng thái job trên đĩa để dọn tối đa mỗi chừng này giây một lần
+PRUNE_FILES_INTERVAL = 60.0
+
+
+@contextmanager
+def file_lock(path):
+    # Khóa độc quyền giữa các tiến trình (và giữa các luồng), chờ tới khi lấy được
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def try_lock(path):
+    # File đã khóa độc quyền (giữ tới khi đóng), None nếu tiến trình khác đang giữ khóa
+    lock_file = open(path, 'a+')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+class Job:
+    def __init__(self, key, total=None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = QUEUED
+        self.progress = 0
+        self.total = total
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.flushed_at = 0.0
+        self.lock_file = None
+
+    @classmethod
+    def from_dict(cls, data):
+        # Job do worker khác tạo, dựng lại từ trạng thái đã ghi ra đĩa
+        job = cls(tuple(data['key']), data['total'])
+        job.id = data['id']
+        job.status = data['status']
+        job.progress = data['progress']
+        job.created_at = data['createdAt']
+        job.started_at = data['startedAt']
+        job.finished_at = data['finishedAt']
+        job.result = data['result']
+        job.error = data['error']
+        return job
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'key': list(self.key),
+            'status': self.status,
+            'progress': self.progress,
+            'total': self.total,
+            'createdAt': self.created_at,
+            'startedAt': self.started_at,
+            'finishedAt': self.finished_at,
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+class JobQueue:
+    # Chạy các tác vụ dài (cào dữ liệu) nền trên một pool giới hạn số luồng.
+    # Các yêu cầu giống nhau (cùng key) đang chờ/chạy được gộp vào một job.
+    # Trạng thái job được ghi ra jobs_dir để worker gunicorn khác cũng đọc được.
+    # Việc gộp cũng có hiệu lực giữa các worker: job đang chờ/chạy giữ khóa flock của file
+    # locks/<hash key>.lock, trong file là id của job; worker khác thấy khóa đang bị giữ thì trả về job đó.
+    def __init__(self, jobs_dir, max_workers=2, job_ttl=DEFAULT_JOB_TTL):
+        self.jobs_dir = jobs_dir
+        self.locks_dir = os.path.join(jobs_dir, 'locks')
+        os.makedirs(self.locks_dir, exist_ok=True)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.job_ttl = job_ttl
+        self.jobs = {}
+        self.active = {}
+        self.lock = threading.Lock()
+        self.files_pruned_at = None
+
+    def submit(self, key, func, total=None):
+        # func(job) chạy trong pool, trả về kết quả (dict có thể serialize) của job.
+        # Không giữ self.lock khi chờ worker khác ghi id job: luồng khác vẫn tạo job/kết thúc job được
+        with self.lock:
+            self.prune()
+        self.prune_files()
+        lock_path = self.key_lock_path(key)
+        deadline = time.monotonic() + ACTIVE_JOB_WAIT
+        while True:
+            with self.lock:
+                job = self.active.get(key)
+                if job is not None:
+                    return job, False
+                lock_file = try_lock(lock_path)
+                if lock_file is not None:
+                    job = self.create(key, total, lock_file)
+                    break
+            job = self.active_elsewhere(lock_path)
+            if job is not None:
+                return job, False
+            if time.monotonic() > deadline:
+                raise RuntimeError(f'Job {key} is locked by another worker but has no status')
+            time.sleep(0.05)
+        self.executor.submit(self.run, job, func)
+        return job, True
+
+    def create(self, key, total, lock_file):
+        # Job mới giữ khóa của key; gọi khi đang giữ self.lock
+        job = Job(key, total)
+        job.lock_file = lock_file
+        try:
+            self.save(job)
+            lock_file.truncate(0)
+            lock_file.write(job.id)
+            lock_file.flush()
+        except BaseException:
+            lock_file.close()
+            raise
+        self.jobs[job.id] = job
+        self.active[key] = job
+        return job
+
+    def key_lock_path(self, key):
+        digest = hashlib.sha1(json.dumps(list(key), ensure_ascii=False).encode('utf-8')).hexdigest()
+        return os.path.join(self.locks_dir, f'{digest}.lock')
+
+    def active_elsewhere(self, lock_path):
+        # Job đang chờ/chạy ở worker khác đang giữ khóa, None nếu nó chưa ghi xong id/trạng thái
+        try:
+            with open(lock_path, 'r', encoding='utf-8') as f:
+                job_id = f.read().strip()
+        except OSError:
+            return None
+        data = self.get(job_id) if job_id else None
+        if data is None or data['status'] in (DONE, ERROR):
+            return None
+        return Job.from_dict(data)
+
+    def run(self, job, func):
+        job.status = RUNNING
+        job.started_at = time.time()
+        self.save(job)
+        try:
+            job.result = func(job)
+            job.status = DONE
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = ERROR
+        finally:
+            job.finished_at = time.time()
+            self.save(job)
+            with self.lock:
+                if self.active.get(job.key) is job:
+                    del self.active[job.key]
+                job.lock_file.close()
+                job.lock_file = None
+
+    def report_progress(self, job, done):
+        job.progress = done
+        now = time.time()
+        if now - job.flushed_at >= PROGRESS_FLUSH_INTERVAL:
+            self.save(job)
+
+    def get(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job.as_dict()
+        # Job do worker khác tạo: đọc trạng thái đã ghi ra đĩa
+        path = self.job_path(job_id)
+        if path is None or not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def job_path(self, job_id):
+        if not job_id.isalnum():
+            return None
+        return os.path.join(self.jobs_dir, f'{job_id}.json')
+
+    def save(self, job):
+        job.flushed_at = time.time()
+        path = self.job_path(job.id)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(job.as_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def prune(self):
+        # Bỏ các job đã xong quá job_ttl khỏi bộ nhớ và đĩa
+        cutoff = time.time() - self.job_ttl
+        for job_id, job in list(self.jobs.items()):
+            if job.finished_at is not None and job.finished_at < cutoff:
+                del self.jobs[job_id]
+                try:
+                    os.remove(self.job_path(job_id))
+                except OSError:
+                    pass
+
+    def prune_files(self):
+        # File trạng thái job của mọi worker (kể cả các lần chạy trước) không đổi quá job_ttl: xóa nếu
+        # job đã xong, file hỏng, hoặc job còn chờ/chạy nhưng không ai giữ khóa của key (worker đã chết).
+        # Quét thư mục tối đa mỗi PRUNE_FILES_INTERVAL giây
+        if self.files_pruned_at is not None and time.monotonic() - self.files_pruned_at < PRUNE_FILES_INTERVAL:
+            return
+        self.files_pruned_at = time.monotonic()
+        cutoff = time.time() - self.job_ttl
+        try:
+            entries = [entry for entry in os.scandir(self.jobs_dir) if entry.is_file()]
+        except OSError:
+            return
+        for entry in entries:
+            if not entry.name.endswith(('.json', '.json.tmp')) or entry.name[:-5] in self.jobs:
+                continue
+            try:
+                if entry.stat().st_mtime >= cutoff:
+                    continue
+                if entry.name.endswith('.json') and not self.finished_file(entry.path):
+                    continue
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def finished_file(self, path):
+        # True nếu không còn job nào dùng file trạng thái: file hỏng, job đã xong, hoặc không ai giữ khóa của key
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            status, key = data['status'], tuple(data['key'])
+        except (ValueError, KeyError, TypeError):
+            return True
+        if status in (DONE, ERROR):
+            return True
+        lock_file = try_lock(self.key_lock_path(key))
+        if lock_file is None:
+            return False
+        lock_file.close()
+        return True
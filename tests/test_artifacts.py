@@ -0,0 +1,59 @@
+import os
+import time
+
+from services import artifacts as artifacts_module
+from services.artifacts import ArtifactStore
+
+
+def write(artifact, data=b'{}'):
+    with open(artifact.tmp_path, 'wb') as f:
+        f.write(data)
+
+
+def test_long_job_result_is_reused_after_commit(tmp_path, monkeypatch):
+    # Job bắt đầu một giờ trước (thời điểm trong tên file), vừa xong: vẫn là kết quả mới
+    store = ArtifactStore(str(tmp_path))
+    started = time.time() - 3600
+    monkeypatch.setattr(artifacts_module.time, 'time', lambda: started)
+    artifact = store.create(('thodiamomo', 100, 'full'), '.thodiamomo.json')
+    monkeypatch.undo()
+    write(artifact)
+    path = store.commit(artifact)
+    assert os.path.exists(path)
+    assert store.find_recent(('thodiamomo', 100, 'full'), 600) == path
+    assert store.find_recent(('thodiamomo', 200, 'full'), 600) is None
+
+
+def test_evict_by_commit_age(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_age=600)
+    old, new = store.create('old', '.json'), store.create('new', '.json')
+    write(old)
+    old_path = store.commit(old)
+    committed = time.time() - 3600
+    os.utime(old_path, (committed, committed))
+    write(new)
+    new_path = store.commit(new)
+    assert not os.path.exists(old_path)
+    assert os.path.exists(new_path)
+    assert store.find_recent('old', 600) is None
+
+
+def test_evict_by_size_keeps_newest(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_bytes=150)
+    paths = []
+    for index in range(3):
+        artifact = store.create(('job', index), '.json')
+        write(artifact, b'x' * 100)
+        paths.append(store.commit(artifact))
+        committed = time.time() - 30 + index
+        os.utime(paths[-1], (committed, committed))
+    store.evict()
+    assert [os.path.exists(path) for path in paths] == [False, False, True]
+
+
+def test_other_files_are_left_alone(tmp_path):
+    (tmp_path / 'ThoDiaMoMo_Version2.json').write_text('[]')
+    store = ArtifactStore(str(tmp_path), max_age=0)
+    os.utime(tmp_path / 'ThoDiaMoMo_Version2.json', (0, 0))
+    store.evict()
+    assert (tmp_path / 'ThoDiaMoMo_Version2.json').exists()
@@ -0,0 +1,48 @@
+import json
+import os
+
+import pytest
+
+from preprocessor.batch import output_path_for, output_paths_for, process_momo_batch
+from preprocessor.thodiamomo import process_momo
+
+EXPORT_PATH = 'preprocessor/ThoDiaMoMo_Version2.json'
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_output_path_keeps_dotted_names():
+    assert output_path_for('in/a.v2.json.gz', 'out', 'json', None) == os.path.join('out', 'a.v2_processed.json')
+    assert output_path_for('in/a.v3.json', 'out', 'jsonl', 'gzip') == os.path.join('out', 'a.v3_processed.jsonl.gz')
+
+
+def test_output_paths_disambiguate_extensions():
+    paths = output_paths_for(['in/a.json', 'in/a.jsonl', 'in/b.json'], 'out', 'json', None)
+    assert paths == {
+        'in/a.json': os.path.join('out', 'a_json_processed.json'),
+        'in/a.jsonl': os.path.join('out', 'a_jsonl_processed.json'),
+        'in/b.json': os.path.join('out', 'b_processed.json'),
+    }
+
+
+def test_output_paths_reject_same_name_in_two_directories():
+    with pytest.raises(ValueError):
+        output_paths_for(['x/a.json', 'y/a.json'], 'out', 'json', None)
+
+
+@pytest.mark.parametrize('batch_size', [None, 3])
+def test_batch_processes_mixed_json_and_jsonl(tmp_path, batch_size):
+    with open(EXPORT_PATH, 'r', encoding='utf-8') as f:
+        rows = json.load(f)
+    source = tmp_path / 'uploads'
+    source.mkdir()
+    (source / 'a.json').write_text(json.dumps(rows), encoding='utf-8')
+    (source / 'b.jsonl').write_text(''.join(json.dumps(row) + '\n' for row in rows), encoding='utf-8')
+    summary = process_momo_batch(str(source), str(tmp_path / 'out'), workers=2, batch_size=batch_size)
+    assert summary['failed'] == 0, summary['results']
+    expected = read_bytes(process_momo(EXPORT_PATH, tmp_path / 'expected.json'))
+    for result in summary['results']:
+        assert read_bytes(result['output']) == expected
@@ -0,0 +1,89 @@
+import threading
+import time
+
+from crawl import build_id
+from crawl.build_id import BuildIdResolver
+from crawl.response_cache import ResponseCache
+from crawl.thodiamomo import fetch_oa_data
+
+
+class CountingResolver(BuildIdResolver):
+    # Reads the home page by counting calls instead of going to the network
+    def __init__(self, build_ids, delay=0.0, **kwargs):
+        super().__init__("http://thodia.invalid", fallback="fallback", **kwargs)
+        self.build_ids = list(build_ids)
+        self.delay = delay
+        self.fetches = 0
+
+    def fetch_build_id(self):
+        self.fetches += 1
+        time.sleep(self.delay)
+        return self.build_ids[min(self.fetches, len(self.build_ids)) - 1]
+
+
+def run_threads(target, count):
+    results = [None] * count
+
+    def run(position):
+        results[position] = target()
+
+    threads = [threading.Thread(target=run, args=(position,)) for position in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_get_discovers_once():
+    resolver = CountingResolver(["build-1"], delay=0.05)
+    assert run_threads(resolver.get, 16) == ["build-1"] * 16
+    assert resolver.fetches == 1
+
+
+def test_fresh_get_does_not_fetch():
+    resolver = CountingResolver(["build-1"])
+    resolver.get()
+    resolver.lock.acquire()
+    try:
+        # Fresh id: returned without taking the lock
+        assert resolver.get() == "build-1"
+    finally:
+        resolver.lock.release()
+    assert resolver.fetches == 1
+
+
+def test_expired_id_is_used_while_refreshing():
+    resolver = CountingResolver(["build-1", "build-2"], ttl=0.01)
+    resolver.get()
+    time.sleep(0.02)
+    resolver.delay = 0.2
+    refresh = threading.Thread(target=resolver.get)
+    refresh.start()
+    time.sleep(0.05)
+    start = time.perf_counter()
+    assert resolver.get() == "build-1"
+    assert time.perf_counter() - start < 0.1
+    refresh.join()
+    assert resolver.get() == "build-2"
+    assert resolver.fetches == 2
+
+
+def test_concurrent_not_found_discovers_once():
+    resolver = CountingResolver(["build-1", "build-2"], burst=1)
+    resolver.get()
+    resolver.delay = 0.05
+    assert run_threads(lambda: resolver.not_found("build-1"), 8) == ["build-2"] * 8
+    assert resolver.fetches == 2
+
+
+def test_fresh_cache_entry_skips_build_id(tmp_path, monkeypatch):
+    resolver = CountingResolver(["build-1"])
+    monkeypatch.setitem(build_id._resolvers, resolver.base_url, resolver)
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    try:
+        cache.put("oa-1", {"id": "oa-1"})
+        assert fetch_oa_data("oa-1", thodia_url=resolver.base_url, cache=cache) == {"id": "oa-1"}
+        assert resolver.fetches == 0
+    finally:
+        cache.close()
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from benchmarks.mock_momo import MockMomoProcess
+from crawl.checkpoint import CHUNKS_FILE, RECORDS_FILE
+from crawl.thodiamomo import crawl_momo_data
+
+SIZE = 300
+CHUNK_SIZE = 50
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupt_after(items):
+    def progress(done):
+        if done >= items:
+            raise Interrupted(done)
+    return progress
+
+
+@pytest.fixture(scope="module")
+def server():
+    # The mock serves merchants built from outputs/momo_data.json: run from the repository root
+    with MockMomoProcess(SIZE, latency=0.001) as server:
+        yield server
+
+
+def crawl(server, output_path, **kwargs):
+    return crawl_momo_data(SIZE, max_workers=4, main_url=server.main_url, thodia_url=server.base_url,
+                           output_path=str(output_path), chunk_size=CHUNK_SIZE, **kwargs)
+
+
+def read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_resume_after_interrupted_crawl(server, tmp_path):
+    expected = crawl(server, tmp_path / "reference.json")
+    checkpoint_dir = str(tmp_path / "checkpoint")
+
+    with pytest.raises(Interrupted):
+        crawl(server, tmp_path / "resumed.json", checkpoint_dir=checkpoint_dir, progress=interrupt_after(150))
+    with open(os.path.join(checkpoint_dir, CHUNKS_FILE), "rb") as f:
+        assert len(f.readlines()) == 3
+    # A crash in the middle of the next chunk leaves partial lines behind
+    with open(os.path.join(checkpoint_dir, RECORDS_FILE), "ab") as f:
+        f.write(b'{"id": 1, "na')
+    with open(os.path.join(checkpoint_dir, CHUNKS_FILE), "ab") as f:
+        f.write(b'{"page": 4, "it')
+
+    progress = []
+    actual = crawl(server, tmp_path / "resumed.json", checkpoint_dir=checkpoint_dir, progress=progress.append)
+    assert progress[0] == 150 and progress[-1] == SIZE
+    assert read_bytes(actual) == read_bytes(expected)
+    assert not os.path.exists(checkpoint_dir)
+
+
+def test_uninterrupted_checkpointed_crawl_matches(server, tmp_path):
+    expected = crawl(server, tmp_path / "reference.json")
+    actual = crawl(server, tmp_path / "checkpointed.json", checkpoint_dir=str(tmp_path / "checkpoint"))
+    assert read_bytes(actual) == read_bytes(expected)
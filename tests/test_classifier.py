@@ -0,0 +1,82 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from crawl.classifier import CategoryClassifier, classifier, normalize_label
+from crawl.momo_map import server_categories_map, type_map
+
+
+def legacy_lookup(name):
+    # The reverse map crawl_momo_data used before the classifier
+    return {label.lower(): key for key, label in server_categories_map.items()}.get(name.lower())
+
+
+def legacy_classify(categories, default=None):
+    for type_key, type_categories in type_map.items():
+        if any(category in type_categories for category in categories):
+            return type_key
+    return default
+
+
+def test_normalize_label():
+    assert normalize_label('  Cà   Phê Đá ') == 'ca phe da'
+    assert normalize_label('BÚN ĐẬU') == 'bun dau'
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('Cà phê', 'coffee'),
+    ('CÀ PHÊ', 'coffee'),
+    ('ca phe', 'coffee'),
+    ('Ca  Phe', 'coffee'),
+    ('Cà phê trứng', 'egg_coffee'),
+    # Duplicate labels: the last key wins, as in the old reverse map
+    ('Lẩu', 'hot_pot'),
+    ('Món Âu', 'western_dishes'),
+    # 'bac xiu' folds to two keys, so only the exact spellings resolve
+    ('Bạc xỉu', 'vietnamese_iced_coffee'),
+    ('Bạc xĩu', 'vietnamese_iced_coffee_with_milk'),
+    ('bac xiu', None),
+    ('Không có', None),
+])
+def test_lookup(name, expected):
+    assert classifier.lookup(name) == expected
+
+
+def test_lookup_agrees_with_legacy_reverse_map():
+    for label in server_categories_map.values():
+        assert classifier.lookup(label) == legacy_lookup(label)
+
+
+def test_classify_picks_first_type_in_map_order():
+    assert classifier.classify(['milk_tea']) == legacy_classify(['milk_tea']) == 'play'
+    assert classifier.classify(['unknown'], default='food') == 'food'
+    assert classifier.classify([]) is None
+    assert classifier.types_for('milk_tea') == {'cinema', 'date_night', 'play'}
+    assert classifier.types_for('unknown') == frozenset()
+
+
+def test_classify_agrees_with_legacy_loop():
+    categories = sorted({category for values in type_map.values() for category in values} | {'unknown'})
+    for index, category in enumerate(categories):
+        for combination in ([category], [category, categories[index - 1]], [categories[-index], category]):
+            assert classifier.classify(combination, 'x') == legacy_classify(combination, 'x')
+
+
+def test_conflicts_are_reported():
+    small = CategoryClassifier(
+        {'a': 'Lẩu', 'b': 'Lẩu', 'c': 'Bạc xỉu', 'd': 'Bạc xĩu'},
+        {'first': ['a', 'missing'], 'second': ['a']},
+    )
+    assert small.lookup('lẩu') == 'b'
+    assert small.lookup('bac xiu') is None
+    assert small.classify(['a']) == 'first'
+    assert len(small.conflicts) == 4
+
+
+def test_import_does_not_warn():
+    code = 'import logging; logging.basicConfig(level=logging.INFO); import crawl.classifier'
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.stderr == ''
@@ -0,0 +1,71 @@
+import json
+
+from common.models import Merchant
+from preprocessor.dedup import Entity, candidate_pairs, dedup_files, deduplicate, merge_cluster
+
+PROCESSED_PATH = 'preprocessor/ThoDiaMoMo_Version6.json'
+
+
+def sample_pair():
+    with open(PROCESSED_PATH, 'r', encoding='utf-8') as f:
+        processed = json.load(f)[0]
+    crawled = Merchant.from_processed(processed).to_crawl()
+    crawled.update(id=123, locate={'lat': None, 'long': None}, phones=['0909000111'])
+    processed = dict(processed, locate={'lat': 10.77, 'long': 106.7}, phones=['0909000111', '0909000222'])
+    return crawled, processed
+
+
+def test_merge_mixed_shapes_gives_one_crawl_record():
+    crawled, processed = sample_pair()
+    merged = merge_cluster([processed, crawled])
+    assert list(merged) == list(crawled)
+    assert merged['id'] == 123
+    assert merged['locate'] == {'lat': 10.77, 'long': 106.7}
+    assert merged['phones'] == ['0909000111', '0909000222']
+    assert 'avgRating' not in merged
+
+
+def test_deduplicate_mixed_inputs_share_one_schema():
+    crawled, processed = sample_pair()
+    other = dict(processed, name='Quán khác hẳn', phones=[''], locate={'lat': '', 'long': ''})
+    merged, duplicates = deduplicate([crawled, processed, other])
+    assert duplicates == [[0, 1]]
+    assert len(merged) == 2
+    assert {tuple(record) for record in merged} == {tuple(crawled)}
+
+
+def located(name, lat, lon, **fields):
+    return dict(name=name, locate={'lat': lat, 'long': lon}, **fields)
+
+
+def test_records_without_coordinates_are_compared_across_cells():
+    records = [
+        located('Phở Thìn Lò Đúc', 10.77, 106.70),
+        located('Phở Thìn Lò Đúc', 21.02, 105.85),
+        located('Phở Thìn Lò Đúc', '', ''),
+        located('Bánh mì Huỳnh Hoa', None, None),
+        located('Phở Thìn Lò Đúc', None, None),
+    ]
+    pairs = candidate_pairs([Entity(position, record) for position, record in enumerate(records)])
+    # Hai bản ghi có tọa độ ở xa nhau không cùng khối; bản không tọa độ được so với cả hai
+    assert pairs == {(0, 2), (1, 2), (0, 4), (1, 4), (2, 4)}
+
+
+def test_record_without_coordinates_merges_with_located_duplicate():
+    records = [
+        located('Bún chả Hương Liên', 21.01, 105.85, phones=['0909000111']),
+        located('Quán khác', 10.77, 106.70),
+        located('Bún chả Hương Liên', None, None),
+    ]
+    _, duplicates = deduplicate(records, threshold=0.7)
+    assert duplicates == [[0, 2]]
+    assert deduplicate(records)[1] == []
+
+
+def test_dedup_files_writes_two_space_indent(tmp_path):
+    crawled, processed = sample_pair()
+    source, output = tmp_path / 'input.json', tmp_path / 'merged.json'
+    source.write_text(json.dumps([crawled, processed], ensure_ascii=False), encoding='utf-8')
+    dedup_files([str(source)], str(output))
+    merged = json.loads(output.read_text(encoding='utf-8'))
+    assert output.read_text(encoding='utf-8') == json.dumps(merged, ensure_ascii=False, indent=2)
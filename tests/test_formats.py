@@ -0,0 +1,120 @@
+import gzip
+import json
+import os
+import zlib
+
+import pytest
+
+from common.formats import (
+    check_format, compression_for_path, gzip_stream, iter_json_array, normalize_processed_record, output_suffix,
+    parquet_schema_for_crawl, pa, pq, read_jsonl, write_parquet, write_records, zstandard,
+)
+
+CRAWL_SAMPLE = 'outputs/momo_data.json'
+PROCESSED_SAMPLE = 'preprocessor/ThoDiaMoMo_Version6.json'
+
+needs_pyarrow = pytest.mark.skipif(pa is None, reason='pyarrow is not installed')
+JSONL_COMPRESSIONS = [
+    None,
+    'gzip',
+    pytest.param('zstd', marks=pytest.mark.skipif(zstandard is None, reason='zstandard is not installed')),
+]
+PARQUET_COMPRESSIONS = [None, 'zstd', 'snappy']
+
+
+def load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def processed_records():
+    return [normalize_processed_record(record) for record in load(PROCESSED_SAMPLE)]
+
+
+def conform(value, data_type):
+    # Parquet reads back every schema field: fields missing from a record come back as None
+    if value is None:
+        return None
+    if pa.types.is_struct(data_type):
+        return {field.name: conform(value.get(field.name), field.type) for field in data_type}
+    if pa.types.is_list(data_type):
+        return [conform(item, data_type.value_type) for item in value]
+    return value
+
+
+def read_parquet(path):
+    return pq.read_table(path).to_pylist()
+
+
+@pytest.mark.parametrize('compression', JSONL_COMPRESSIONS)
+@pytest.mark.parametrize('sample', [CRAWL_SAMPLE, PROCESSED_SAMPLE])
+def test_jsonl_round_trip(tmp_path, sample, compression):
+    records = load(sample)
+    path = str(tmp_path / ('records' + output_suffix('jsonl', compression)))
+    assert write_records(iter(records), path, 'jsonl', compression) == len(records)
+    assert compression_for_path(path) == compression
+    assert list(read_jsonl(path)) == records
+
+
+def test_jsonl_is_actually_compressed(tmp_path):
+    records = load(CRAWL_SAMPLE)
+    plain, packed = str(tmp_path / 'records.jsonl'), str(tmp_path / 'records.jsonl.gz')
+    write_records(records, plain, 'jsonl')
+    write_records(records, packed, 'jsonl', 'gzip')
+    with gzip.open(packed, 'rb') as f, open(plain, 'rb') as raw:
+        assert f.read() == raw.read()
+    assert os.path.getsize(packed) < os.path.getsize(plain)
+
+
+@needs_pyarrow
+@pytest.mark.parametrize('compression', PARQUET_COMPRESSIONS)
+def test_parquet_round_trip_with_crawl_schema(tmp_path, compression):
+    records = load(CRAWL_SAMPLE)
+    path = str(tmp_path / 'records.parquet')
+    assert write_parquet(records, path, parquet_schema_for_crawl(), batch_size=7, compression=compression) \
+        == len(records)
+    schema = parquet_schema_for_crawl()
+    assert read_parquet(path) == [conform(record, pa.struct(list(schema))) for record in records]
+    metadata = pq.ParquetFile(path).metadata
+    assert metadata.num_row_groups == -(-len(records) // 7)
+    assert metadata.row_group(0).column(0).compression == (compression or 'uncompressed').upper()
+
+
+@needs_pyarrow
+@pytest.mark.parametrize('compression', PARQUET_COMPRESSIONS)
+def test_parquet_round_trip_with_inferred_schema(tmp_path, compression):
+    records = processed_records()
+    path = str(tmp_path / 'records.parquet')
+    assert write_parquet(records, path, batch_size=5, compression=compression) == len(records)
+    assert read_parquet(path) == records
+
+
+@needs_pyarrow
+def test_parquet_widens_columns_empty_in_first_batch(tmp_path):
+    records = [{'id': 1, 'note': None, 'tags': []}, {'id': 2, 'note': 'mở cửa', 'tags': ['wifi']}]
+    path = str(tmp_path / 'records.parquet')
+    write_records(records, path, 'parquet')
+    assert read_parquet(path) == records
+
+
+@needs_pyarrow
+def test_parquet_without_records(tmp_path):
+    path = str(tmp_path / 'records.parquet')
+    assert write_parquet([], path, parquet_schema_for_crawl()) == 0
+    table = pq.read_table(path)
+    assert table.num_rows == 0 and table.schema.names == parquet_schema_for_crawl().names
+
+
+def test_gzip_stream_round_trip():
+    records = load(CRAWL_SAMPLE) * 20
+    chunks = list(gzip_stream(iter_json_array(records), flush_bytes=1024))
+    assert len(chunks) > 2
+    assert json.loads(zlib.decompress(b''.join(chunks), 31)) == records
+
+
+@pytest.mark.parametrize('output_format, compression', [
+    ('csv', None), ('json', 'gzip'), ('parquet', 'zstd'), ('jsonl', 'brotli'),
+])
+def test_check_format_rejects_unsupported(output_format, compression):
+    with pytest.raises(ValueError):
+        check_format(output_format, compression)
@@ -0,0 +1,134 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from crawl import http_client
+from crawl.http_client import HttpClient, TokenBucket
+
+
+class FakeClock:
+    # Time only moves when something sleeps. Tests use rates whose waits are exact binary fractions
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            status, headers = server.script.pop(0) if server.script else (200, {})
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+
+@pytest.fixture
+def server():
+    # Answers each GET with the next (status, headers) of server.script, then 200
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.script = []
+    server.requests = []
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f'http://127.0.0.1:{server.server_address[1]}/item'
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Backoff jitter at its upper bound so the waits are exact
+    monkeypatch.setattr(http_client.random, 'uniform', lambda low, high: high)
+    return FakeClock()
+
+
+def client(clock, **kwargs):
+    return HttpClient(pool_size=2, clock=clock, sleep=clock.sleep, timeout=5, **kwargs)
+
+
+def test_retries_transient_statuses(server, clock):
+    server.script = [(503, {}), (500, {}), (429, {})]
+    response = client(clock, backoff_factor=0.5).get(server.url)
+    assert response.status_code == 200
+    assert len(server.requests) == 4
+    assert clock.sleeps == [0.5, 1.0, 2.0]
+
+
+def test_honours_retry_after_up_to_max_backoff(server, clock):
+    server.script = [(429, {'Retry-After': '7'}), (503, {'Retry-After': '120'})]
+    response = client(clock, max_backoff=30).get(server.url)
+    assert response.status_code == 200
+    assert clock.sleeps == [7.0, 30.0]
+
+
+def test_backoff_is_capped(server, clock):
+    server.script = [(502, {})] * 5
+    client(clock, max_retries=5, backoff_factor=1, max_backoff=3).get(server.url)
+    assert clock.sleeps == [1, 2, 3, 3, 3]
+
+
+def test_gives_up_after_max_retries(server, clock):
+    server.script = [(503, {})] * 10
+    response = client(clock, max_retries=2).get(server.url)
+    assert response.status_code == 503
+    assert len(server.requests) == 3
+    assert len(clock.sleeps) == 2
+
+
+def test_other_errors_are_not_retried(server, clock):
+    server.script = [(404, {})]
+    assert client(clock).get(server.url).status_code == 404
+    assert len(server.requests) == 1
+    assert clock.sleeps == []
+
+
+def test_connection_errors_are_retried_then_raised(clock):
+    # Nothing listens on a port just released by a closed server
+    closed = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    port = closed.server_address[1]
+    closed.server_close()
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client(clock, max_retries=2, backoff_factor=1).get(f'http://127.0.0.1:{port}/')
+    assert clock.sleeps == [1, 2]
+
+
+def test_rate_limit_spaces_requests(server, clock):
+    session = client(clock, rate=2, burst=2)
+    for _ in range(6):
+        session.get(server.url)
+    assert len(server.requests) == 6
+    # Two requests from the full bucket, then one every half second
+    assert clock.sleeps == [0.5] * 4
+    assert clock.now == 1002.0
+
+
+def test_token_bucket_refills_up_to_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=4, capacity=3, clock=clock, sleep=clock.sleep)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.sleeps == []
+    clock.now += 60
+    for _ in range(4):
+        bucket.acquire()
+    # An idle minute refills 3 tokens, not 240
+    assert clock.sleeps == [0.25]
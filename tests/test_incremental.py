@@ -0,0 +1,22 @@
+from crawl.incremental import load_state, read_delta, write_delta
+
+
+def run(records, tmp_path, seen=None):
+    state_path, delta_path = str(tmp_path / "state.json"), str(tmp_path / "delta.jsonl")
+    counts = write_delta(iter(records), state_path, delta_path, seen)
+    return counts, list(read_delta(delta_path)), load_state(state_path)
+
+
+def test_invalid_records_keep_their_previous_state(tmp_path):
+    first = [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}, {"id": 3, "name": "c"}]
+    _, _, state = run(first, tmp_path)
+
+    # Merchant 2 is still listed but its record failed validation; merchant 3 is gone
+    counts, delta, new_state = run([{"id": 1, "name": "a"}], tmp_path, seen={1, 2})
+    assert counts == {"added": 0, "changed": 0, "removed": 1, "unchanged": 1, "invalid": 1}
+    assert delta == [{"op": "removed", "id": "3"}]
+    assert new_state == {"1": state["1"], "2": state["2"]}
+
+    # Valid again and unchanged: nothing to report
+    counts, delta, _ = run(first[:2], tmp_path, seen={1, 2})
+    assert counts["unchanged"] == 2 and delta == []
@@ -0,0 +1,131 @@
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+import services.jobs as jobs_module
+from services.jobs import DONE, ERROR, RUNNING, Job, JobQueue, file_lock, try_lock
+
+
+def submit_in_child(jobs_dir, queue):
+    jobs = JobQueue(jobs_dir)
+    job, created = jobs.submit(('source', 10), lambda job: None)
+    queue.put((job.id, created))
+
+
+def test_submit_deduplicates_across_processes(tmp_path):
+    jobs = JobQueue(str(tmp_path))
+    release = threading.Event()
+    job, created = jobs.submit(('source', 10), lambda job: release.wait(10) and {'ok': True})
+    assert created
+
+    queue = multiprocessing.Queue()
+    child = multiprocessing.Process(target=submit_in_child, args=(str(tmp_path), queue))
+    child.start()
+    child.join(10)
+    assert queue.get(timeout=1) == (job.id, False)
+
+    release.set()
+    deadline = time.time() + 5
+    while jobs.get(job.id)['status'] != DONE and time.time() < deadline:
+        time.sleep(0.01)
+    assert jobs.get(job.id)['status'] == DONE
+
+    # Job đã xong thì yêu cầu mới tạo job mới
+    child = multiprocessing.Process(target=submit_in_child, args=(str(tmp_path), queue))
+    child.start()
+    child.join(10)
+    child_id, created = queue.get(timeout=1)
+    assert created and child_id != job.id
+
+
+def hold_lock(path, queue):
+    with file_lock(path):
+        queue.put('locked')
+        time.sleep(0.5)
+
+
+def test_file_lock_excludes_other_processes(tmp_path):
+    path = str(tmp_path / 'state.lock')
+    queue = multiprocessing.Queue()
+    child = multiprocessing.Process(target=hold_lock, args=(path, queue))
+    child.start()
+    assert queue.get(timeout=5) == 'locked'
+    start = time.perf_counter()
+    with file_lock(path):
+        waited = time.perf_counter() - start
+    child.join(5)
+    assert waited > 0.2
+
+
+def test_submit_waits_for_other_worker_without_blocking_queue(tmp_path):
+    jobs = JobQueue(str(tmp_path))
+    key = ('source', 10)
+    # Worker khác vừa lấy khóa của key nhưng chưa ghi id job
+    other = try_lock(jobs.key_lock_path(key))
+    results = []
+    waiting = threading.Thread(target=lambda: results.append(jobs.submit(key, lambda job: None)))
+    waiting.start()
+    time.sleep(0.2)
+
+    # Trong lúc đó key khác vẫn tạo job ngay
+    start = time.perf_counter()
+    job, created = jobs.submit(('source', 20), lambda job: None)
+    assert created and time.perf_counter() - start < 0.5
+
+    # Worker kia ghi xong trạng thái và id job: luồng đang chờ nhận job đó
+    elsewhere = Job(key)
+    jobs.save(elsewhere)
+    other.write(elsewhere.id)
+    other.flush()
+    waiting.join(5)
+    assert [(job.id, created) for job, created in results] == [(elsewhere.id, False)]
+    other.close()
+
+
+def test_submit_gives_up_when_lock_holder_has_no_status(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs_module, 'ACTIVE_JOB_WAIT', 0.2)
+    jobs = JobQueue(str(tmp_path))
+    other = try_lock(jobs.key_lock_path(('source', 10)))
+    with pytest.raises(RuntimeError):
+        jobs.submit(('source', 10), lambda job: None)
+    other.close()
+    assert jobs.submit(('source', 10), lambda job: None)[1]
+
+
+def write_job(jobs, key, status, age):
+    job = Job(key)
+    job.status = status
+    jobs.save(job)
+    path = jobs.job_path(job.id)
+    old = time.time() - age
+    os.utime(path, (old, old))
+    return os.path.basename(path)
+
+
+def test_old_job_files_are_pruned(tmp_path):
+    jobs = JobQueue(str(tmp_path), job_ttl=100)
+    held = try_lock(jobs.key_lock_path(('running', 1)))
+    kept = {
+        write_job(jobs, ('recent', 1), DONE, 10),
+        write_job(jobs, ('running', 1), RUNNING, 1000),
+    }
+    removed = {
+        write_job(jobs, ('done', 1), DONE, 1000),
+        write_job(jobs, ('failed', 1), ERROR, 1000),
+        # Worker của job này đã chết: không ai giữ khóa
+        write_job(jobs, ('orphan', 1), RUNNING, 1000),
+    }
+    for name, text in (('broken.json', '{'), ('partial.json.tmp', '{}'), ('notes.txt', '')):
+        path = tmp_path / name
+        path.write_text(text)
+        os.utime(path, (time.time() - 1000,) * 2)
+    removed |= {'broken.json', 'partial.json.tmp'}
+    kept.add('notes.txt')
+
+    job, created = jobs.submit(('new', 1), lambda job: None)
+    kept.add(f'{job.id}.json')
+    assert {entry.name for entry in tmp_path.iterdir() if entry.is_file()} == kept
+    held.close()
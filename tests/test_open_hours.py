@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from index.open_hours import (SLOTS_PER_DAY, SLOTS_PER_WEEK, OpenHoursIndex, compile_week, parse_time_range,
+                              week_slot)
+
+# 2026-10-19 là thứ hai
+MONDAY = datetime(2026, 10, 19)
+
+
+def at(day, hour, minute=0):
+    return MONDAY + timedelta(days=day, hours=hour, minutes=minute)
+
+
+def open_slots(week):
+    return np.flatnonzero(week).tolist()
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('08:00 - 22:00', (480, 1320)),
+    ('8:30-21:45', (510, 1305)),
+    ('00:00 - 23:59', (0, 1440)),
+    ('22:00 - 02:00', (1320, 120)),
+    ('Mở cửa 07:00 - 11:00', (420, 660)),
+    ('25:00 - 26:00', None),
+    ('08:60 - 09:00', None),
+    ('', None),
+    (None, None),
+])
+def test_parse_time_range(text, expected):
+    assert parse_time_range(text) == expected
+
+
+def test_bitmap_marks_slots_touched_by_range():
+    # Bắt đầu làm tròn xuống, kết thúc làm tròn lên theo ô 15 phút
+    week = compile_week({'tuesday': ['08:10 - 09:20']})
+    tuesday = SLOTS_PER_DAY
+    assert open_slots(week) == list(range(tuesday + 32, tuesday + 38))
+    assert compile_week({'monday': ['08:00 - 22:00']}).sum() == (22 - 8) * 4
+
+
+def test_multiple_ranges_and_full_day():
+    week = compile_week({'monday': ['07:00 - 11:00', '13:00 - 17:00'], 'friday': ['00:00 - 00:00']})
+    assert week.sum() == 32 + SLOTS_PER_DAY
+    assert week[4 * SLOTS_PER_DAY:5 * SLOTS_PER_DAY].all()
+    assert not week[11 * 4:13 * 4].any()
+
+
+def test_overnight_range_spills_into_next_day():
+    week = compile_week({'wednesday': ['22:00 - 02:00']})
+    wednesday, thursday = 2 * SLOTS_PER_DAY, 3 * SLOTS_PER_DAY
+    assert open_slots(week) == list(range(wednesday + 88, thursday + 8))
+
+
+def test_sunday_overnight_wraps_to_monday():
+    week = compile_week({'sunday': ['22:00 - 02:00']})
+    sunday = 6 * SLOTS_PER_DAY
+    assert open_slots(week) == list(range(8)) + list(range(sunday + 88, SLOTS_PER_WEEK))
+
+
+def test_missing_or_invalid_schedule_is_closed():
+    assert not compile_week(None).any()
+    assert not compile_week({'monday': ['cả ngày'], 'tuesday': None}).any()
+
+
+def test_week_slot_uses_vietnam_time():
+    assert week_slot(at(0, 0)) == 0
+    assert week_slot(at(6, 23, 59)) == SLOTS_PER_WEEK - 1
+    # 17:00 UTC chủ nhật là 00:00 thứ hai giờ Việt Nam
+    assert week_slot(datetime(2026, 10, 18, 17, tzinfo=timezone.utc)) == 0
+
+
+def test_index_matches_compiled_schedules():
+    records = [
+        {'openHour': {'monday': ['08:00 - 22:00'], 'sunday': ['22:00 - 02:00']}},
+        {'openHour': {day: ['00:00 - 23:59'] for day in ('monday', 'tuesday', 'wednesday', 'thursday',
+                                                         'friday', 'saturday', 'sunday')}},
+        {'openHour': {'monday': ['08:00 - 22:00'], 'sunday': ['22:00 - 02:00']}},
+        {'openHour': ''},
+        {},
+    ]
+    index = OpenHoursIndex.from_records(records)
+    assert len(index) == 5
+    for slot in range(SLOTS_PER_WEEK):
+        expected = [position for position, record in enumerate(records)
+                    if isinstance(record.get('openHour'), dict) and compile_week(record['openHour'])[slot]]
+        assert index.open_mask(slot).nonzero()[0].tolist() == expected
+    assert index.open_at(at(0, 1)).tolist() == [0, 1, 2]
+    assert index.open_at(at(0, 2)).tolist() == [1]
+    assert index.open_at(at(6, 23)).tolist() == [0, 1, 2]
+    assert index.is_open(0, at(0, 21, 59)) and not index.is_open(0, at(0, 22))
+    assert not index.is_open(3, at(0, 12))
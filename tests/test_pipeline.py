@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from crawl.pipeline import Source, SourceMetrics, crawl_source, iter_paged
+from crawl.thodiamomo import iter_recommend_items
+
+
+class RecommendHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        page_number, page_size = int(query["pageNumber"][0]), int(query["pageSize"][0])
+        self.server.pages.append((page_number, page_size))
+        start = (page_number - 1) * page_size
+        content = [{"id": index} for index in range(start, min(start + page_size, self.server.size))]
+        body = json.dumps({"data": {"content": content}}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def recommend_server():
+    # Stub of the recommend listing: server.size merchants, records the (page, size) requested
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RecommendHandler)
+    server.size = 0
+    server.pages = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/recommend"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("size, limit, expected_pages", [
+    (25, 100, [1, 2, 3]),       # short last page ends the walk
+    (100, 25, [1, 2, 3]),       # limit reached in the middle of page 3
+    (0, 100, [1]),              # empty first page
+    (30, 100, [1, 2, 3, 4]),    # full last page: one more (empty) page confirms the end
+    (100, 30, [1, 2, 3]),       # limit reached exactly at a page boundary
+])
+def test_paging_stops_at_limit_or_last_page(recommend_server, size, limit, expected_pages):
+    recommend_server.size = size
+    items = list(iter_recommend_items(limit, chunk_size=10, main_url=recommend_server.url))
+    assert [item["id"] for item in items] == list(range(min(size, limit)))
+    assert recommend_server.pages == [(page, 10) for page in expected_pages]
+
+
+def test_page_size_never_exceeds_limit(recommend_server):
+    recommend_server.size = 100
+    items = list(iter_recommend_items(5, chunk_size=50, main_url=recommend_server.url))
+    assert len(items) == 5
+    assert recommend_server.pages == [(1, 5)]
+
+
+class ListSource(Source):
+    name = "list"
+    output_name = "list"
+    metrics = SourceMetrics("test_list", "Test list")
+
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+
+    def iter_items(self, limit, chunk_size=10, metrics=None, start_page=1):
+        def fetch_page(page_number, page_size):
+            start = (page_number - 1) * page_size
+            return [{"id": index} for index in range(start, min(start + page_size, self.size))]
+        return iter_paged(fetch_page, limit, chunk_size, start_page)
+
+    def build_record(self, item, detail):
+        return {"id": item["id"]}
+
+
+def test_checkpoint_kept_when_output_is_not_stored(tmp_path):
+    checkpoint_dir = str(tmp_path / "checkpoint")
+
+    def fail(path):
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        crawl_source(ListSource(25), 25, str(tmp_path / "out.json"), chunk_size=10,
+                     checkpoint_dir=checkpoint_dir, on_complete=fail)
+    assert os.path.exists(os.path.join(checkpoint_dir, "chunks.jsonl"))
+
+    final_path = str(tmp_path / "final.json")
+    output_path = crawl_source(ListSource(25), 25, str(tmp_path / "out.json"), chunk_size=10,
+                               checkpoint_dir=checkpoint_dir,
+                               on_complete=lambda path: os.replace(path, final_path) or final_path)
+    assert output_path == final_path
+    assert not os.path.exists(checkpoint_dir)
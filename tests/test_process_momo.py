@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from benchmarks.bench_pipeline import synthetic_export
+from preprocessor import thodiamomo
+from preprocessor.thodiamomo import process_momo
+from reference_momo import reference_process_momo
+
+EXPORT_PATH = 'preprocessor/ThoDiaMoMo_Version2.json'
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def use_engine(monkeypatch, engine):
+    # pyarrow: tách chuỗi bằng pyarrow.compute; pandas: .str của pandas như khi không cài pyarrow
+    if engine == 'pyarrow':
+        pytest.importorskip('pyarrow')
+    else:
+        monkeypatch.setattr(thodiamomo, 'pa', None)
+
+
+@pytest.mark.parametrize('engine', ['pyarrow', 'pandas'])
+def test_bundled_export_matches_reference(tmp_path, monkeypatch, engine):
+    use_engine(monkeypatch, engine)
+    expected = reference_process_momo(EXPORT_PATH, tmp_path / 'reference.json')
+    actual = process_momo(EXPORT_PATH, tmp_path / 'processed.json')
+    assert read_bytes(actual) == read_bytes(expected)
+
+
+@pytest.mark.parametrize('engine', ['pyarrow', 'pandas'])
+@pytest.mark.parametrize('seed', [0, 1])
+def test_synthetic_export_matches_reference(tmp_path, monkeypatch, engine, seed):
+    # Địa chỉ, tọa độ khác nhau ở mỗi dòng; giá, giờ mở cửa, địa chỉ "bẩn"
+    use_engine(monkeypatch, engine)
+    input_path = tmp_path / 'export.json'
+    input_path.write_text(json.dumps(synthetic_export(2000, seed=seed), ensure_ascii=False), encoding='utf-8')
+    expected = reference_process_momo(str(input_path), tmp_path / 'reference.json')
+    actual = process_momo(str(input_path), tmp_path / 'processed.json')
+    assert read_bytes(actual) == read_bytes(expected)
+
+
+def test_engines_match_on_values_the_reference_rejects(tmp_path, monkeypatch):
+    # Bản gốc lỗi với các giá trị này (số trong cột địa chỉ, mục giờ mở cửa không có ", "): hai nhánh
+    # vẫn phải cho cùng kết quả
+    pytest.importorskip('pyarrow')
+    with open(EXPORT_PATH, 'r', encoding='utf-8') as f:
+        template = json.load(f)[0]
+    values = [
+        ('address', 'a, b, c'), ('address', 'a, b, c, d, e'), ('address', 5), ('address', '  '),
+        ('open_hour', 'Thứ 2,08:00; Thứ 3, 08:00 đến 09:00'), ('open_hour', ' THỨ 4 , 08:00, 09:00'),
+        ('open_hour', 'Chủ Nhật, 07:00 đến 11:00; Chủ nhật, 13:00 đến 23:00; ; Ngày lễ, 08:00'),
+        ('url_address', 'query=١٠.٥,١٠٦.٧'), ('url_address', 'é query=10.5,106.7'),
+        ('url_address', 'query=+.5,-.25'), ('url_address', 'query=abc'), ('url_address', None),
+        ('Image1', ''), ('Image2', None), ('Image12', 'https://example.com/a.jpg'),
+    ]
+    rows = [dict(template, name=f'{template["name"]} {index}', **{column: value})
+            for index, (column, value) in enumerate(values)]
+    input_path = tmp_path / 'export.json'
+    input_path.write_text(json.dumps(rows, ensure_ascii=False), encoding='utf-8')
+    arrow = read_bytes(process_momo(str(input_path), tmp_path / 'arrow.json'))
+    monkeypatch.setattr(thodiamomo, 'pa', None)
+    assert read_bytes(process_momo(str(input_path), tmp_path / 'pandas.json')) == arrow
+    assert len(json.loads(arrow)) >= len(rows) - 2
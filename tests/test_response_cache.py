@@ -0,0 +1,43 @@
+from crawl.response_cache import ResponseCache
+
+
+def table_bytes(cache):
+    return cache.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+
+def test_running_total_matches_table(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=2000)
+    for index in range(200):
+        cache.put(index % 50, {"id": index, "body": "x" * (index % 17)})
+        assert cache.total_bytes() == table_bytes(cache)
+    assert cache.stats()["bytes"] <= 2000
+    cache.close()
+
+
+def test_eviction_keeps_recently_read_entries(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=10 ** 6)
+    for key in range(10):
+        cache.put(key, {"body": "x" * 100})
+    cache.get(0)
+    cache.max_bytes = cache.total_bytes() - 1
+    cache.put(10, {"body": "x" * 100})
+    assert cache.get(0) is not None
+    assert cache.get(1) is None
+    cache.close()
+
+
+def test_total_and_access_times_survive_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(path)
+    cache.put("a", {"body": "a"})
+    cache.put("b", {"body": "b"})
+    accessed_before = cache.conn.execute("SELECT accessed_at FROM responses WHERE key = 'a'").fetchone()[0]
+    cache.get("a")
+    total = cache.total_bytes()
+    cache.close()
+
+    cache = ResponseCache(path)
+    assert cache.total_bytes() == total == table_bytes(cache)
+    accessed_after = cache.conn.execute("SELECT accessed_at FROM responses WHERE key = 'a'").fetchone()[0]
+    assert accessed_after > accessed_before
+    cache.close()
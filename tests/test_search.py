@@ -0,0 +1,145 @@
+import math
+
+import numpy as np
+import pytest
+
+from index.search import BM25_B, BM25_K1, PREFIX_FACTOR, SearchIndex, load_search_index, record_terms, tokenize
+
+RECORDS = [
+    {'name': 'Cà Phê Sữa Đá', 'categories': ['coffee'], 'district': 'Quận 1',
+     'address': {'street': 'Lê Lợi', 'ward': 'Bến Nghé'}},
+    {'name': 'Phở Bò Hà Nội', 'categories': ['pho'], 'exts': ['parking'], 'district': 'Quận 3',
+     'description': 'Phở bò gia truyền, có cà phê'},
+    {'name': 'Trà sữa Phúc Long', 'categories': ['milk_tea'], 'district': 'Quận 1'},
+    {'name': 'Cafe Phố', 'categories': ['coffee'], 'exts': ['parking', 'wifi'], 'district': 'Quận 3'},
+    {'name': 'Bún bò Huế', 'categories': ['noodle'], 'districtName': 'Quận 10',
+     'description': 'Bún bò, bò viên'},
+    {'name': 'Phô mai que', 'type': ['snack'], 'address': {'district': 'Quận 1'}},
+]
+
+
+def brute_bm25(records, term):
+    # BM25 tính thẳng từ record_terms, không qua chỉ mục
+    documents = [record_terms(record) for record in records]
+    average = sum(length for _, length in documents) / len(documents)
+    df = sum(1 for terms, _ in documents if term in terms)
+    idf = math.log1p((len(documents) - df + 0.5) / (df + 0.5))
+    scores = []
+    for terms, length in documents:
+        tf = terms.get(term, 0)
+        scores.append(idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / average)))
+    return np.array(scores)
+
+
+@pytest.fixture(scope='module')
+def index():
+    return SearchIndex.from_records(RECORDS)
+
+
+def test_tokenize_folds_diacritics():
+    assert tokenize('Cà Phê Sữa Đá') == ['ca', 'phe', 'sua', 'da']
+    assert tokenize('Phở Bò') == tokenize('pho bo') == ['pho', 'bo']
+    # Dấu rời (NFD) cũng bị bỏ
+    assert tokenize('Cà phê') == ['ca', 'phe']
+    assert tokenize(None) == []
+
+
+@pytest.mark.parametrize('term', ['pho', 'bo', 'ca', 'quan', 'parking'])
+def test_scores_match_bm25_formula(index, term):
+    _, scores = index.match(term + ' ')
+    np.testing.assert_allclose(scores, brute_bm25(RECORDS, term), rtol=1e-5)
+
+
+def test_ranking_prefers_name_and_repeated_terms(index):
+    # "bò" ở tên và lặp lại trong mô tả của Bún bò Huế, chỉ ở tên và mô tả của Phở Bò
+    positions, scores, total, _ = index.search('bò ')
+    assert positions.tolist() == [4, 1]
+    assert total == 2 and scores[0] > scores[1]
+
+
+def test_phrase_bigram_boosts_exact_phrase(index):
+    positions, scores, _, _ = index.search('pho bo ')
+    assert positions.tolist() == [1]
+    _, single = index.match('pho ')
+    assert scores[0] > single[1]
+
+
+def test_diacritic_folding_in_queries(index):
+    folded = index.search('ca phe ')
+    accented = index.search('cà phê ')
+    assert folded[0].tolist() == accented[0].tolist() == [0, 1, 3]
+    np.testing.assert_array_equal(folded[1], accented[1])
+
+
+def test_prefix_matches_last_token_only(index):
+    mask, scores = index.match('ph')
+    # ph -> pho, phe, phuc; khớp tiền tố bị giảm điểm so với khớp đúng từ
+    assert np.flatnonzero(mask).tolist() == [0, 1, 2, 3, 5]
+    _, exact = index.match('pho ')
+    _, prefix = index.match('pho')
+    np.testing.assert_allclose(prefix[[1, 5]], exact[[1, 5]])
+    # Từ không ở cuối không khớp theo tiền tố
+    assert index.search('ph bo')[2] == 0
+    # Kết thúc bằng khoảng trắng: khớp đúng từ
+    assert index.search('ph ')[2] == 0
+
+
+def test_prefix_score_is_scaled(index):
+    _, scores = index.match('phuc')
+    _, prefix = index.match('phu')
+    np.testing.assert_allclose(prefix[2], scores[2] * PREFIX_FACTOR, rtol=1e-6)
+
+
+def test_facet_filters_or_within_and_across(index):
+    def found(filters, query=''):
+        return index.search(query, filters=filters)[0].tolist()
+
+    assert found({'categories': ['coffee']}) == [0, 3]
+    assert found({'categories': ['coffee', 'pho']}) == [0, 1, 3]
+    assert found({'categories': ['coffee', 'pho'], 'district': ['Quận 3']}) == [1, 3]
+    assert found({'exts': ['parking'], 'district': ['Quận 1']}) == []
+    assert found({'district': ['Quận 1']}) == [0, 2, 5]
+    assert found({'categories': ['unknown']}) == []
+    assert found({'categories': []}) == list(range(len(RECORDS)))
+    assert found({'district': ['Quận 3']}, 'cà phê ') == [1, 3]
+    with pytest.raises(ValueError):
+        index.search('', filters={'color': ['red']})
+
+
+def test_facet_counts_cover_all_results(index):
+    _, _, total, facets = index.search('', filters={'district': ['Quận 3']}, limit=1)
+    assert total == 2
+    assert facets['exts'] == {'parking': 2, 'wifi': 1}
+    assert facets['categories'] == {'coffee': 1, 'pho': 1}
+    assert facets['district'] == {'Quận 3': 2}
+
+
+def test_bitsets_match_brute_force_on_many_records():
+    # Hơn 64 bản ghi để bitset có nhiều word
+    rng = np.random.default_rng(0)
+    categories = ['coffee', 'pho', 'milk_tea', 'noodle']
+    districts = ['Quận 1', 'Quận 3', 'Quận 10']
+    records = [{'name': f'Quán {i}', 'categories': [categories[rng.integers(4)]],
+                'district': districts[rng.integers(3)]} for i in range(300)]
+    index = SearchIndex.from_records(records)
+    filters = {'categories': ['coffee', 'noodle'], 'district': ['Quận 10']}
+    expected = [i for i, record in enumerate(records)
+                if record['categories'][0] in filters['categories'] and record['district'] == 'Quận 10']
+    positions, _, total, facets = index.search('', filters=filters, limit=300)
+    assert positions.tolist() == expected and total == len(expected)
+    assert sum(facets['categories'].values()) == len(expected)
+
+
+def test_saved_index_gives_same_results(tmp_path, index):
+    source = tmp_path / 'momo.json'
+    source.write_text('[]')
+    root = tmp_path / 'indexes'
+    built = load_search_index(RECORDS, str(source), str(root))
+    loaded = load_search_index(RECORDS, str(source), str(root))
+    for query, filters in (('ca phe ', None), ('ph', {'district': ['Quận 1']})):
+        expected = index.search(query, filters=filters)
+        for other in (built, loaded):
+            result = other.search(query, filters=filters)
+            assert result[0].tolist() == expected[0].tolist()
+            np.testing.assert_allclose(result[1], expected[1])
+            assert result[2:] == expected[2:]
@@ -0,0 +1,53 @@
+import json
+import math
+
+import pytest
+
+from benchmarks.bench_serializer import EDGE_CASES, SAMPLES, synthetic_records
+from common.formats import iter_json_array, iter_jsonl
+from common.serializer import OrjsonSerializer, StdlibSerializer, create_serializer, orjson
+
+SERIALIZERS = [
+    StdlibSerializer(),
+    pytest.param(OrjsonSerializer() if orjson is not None else None, id='orjson',
+                 marks=pytest.mark.skipif(orjson is None, reason='orjson is not installed')),
+]
+
+
+def sample_records():
+    records = list(EDGE_CASES) + synthetic_records(200)
+    for path in SAMPLES:
+        with open(path, 'r', encoding='utf-8') as f:
+            records.extend(json.load(f))
+    return records
+
+
+@pytest.mark.parametrize('serializer', SERIALIZERS)
+def test_dumps_matches_stdlib_json(serializer):
+    for record in sample_records():
+        assert serializer.dumps(record, indent=2) == json.dumps(record, ensure_ascii=False, indent=2)
+        assert serializer.dumps(record) == json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        assert serializer.dumps(record, indent=4) == json.dumps(record, ensure_ascii=False, indent=4)
+
+
+@pytest.mark.parametrize('serializer', SERIALIZERS)
+def test_loads_round_trips(serializer):
+    for record in sample_records():
+        text = json.dumps(record, ensure_ascii=False)
+        # NaN != NaN: compare the canonical text instead of the values
+        assert json.dumps(serializer.loads(text), ensure_ascii=False) == json.dumps(json.loads(text),
+                                                                                   ensure_ascii=False)
+    assert math.isnan(serializer.loads('[NaN]')[0])
+
+
+def test_writers_match_stdlib_json():
+    records = synthetic_records(200)
+    assert ''.join(iter_json_array(records)) == json.dumps(records, ensure_ascii=False, indent=2)
+    assert ''.join(iter_jsonl(records)) == ''.join(
+        json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n' for record in records
+    )
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_serializer('simdjson')
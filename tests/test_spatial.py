@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from index.spatial import SpatialIndex, haversine
+
+
+def brute_radius(lats, lons, lat, lon, meters, mask=None):
+    distances = haversine(lat, lon, lats, lons)
+    inside = distances <= meters
+    if mask is not None:
+        inside &= mask
+    return set(np.flatnonzero(inside).tolist())
+
+
+def brute_nearest(lats, lons, lat, lon, k, mask=None):
+    distances = haversine(lat, lon, lats, lons)
+    if mask is not None:
+        distances = distances[mask]
+    return np.sort(distances)[:k]
+
+
+def check_queries(index, lats, lons, queries, mask=None):
+    for lat, lon, meters in queries:
+        positions, distances = index.radius(lat, lon, meters, mask=mask)
+        assert set(positions.tolist()) == brute_radius(lats, lons, lat, lon, meters, mask), (lat, lon, meters)
+        assert np.all(np.diff(distances) >= 0)
+        for k in (1, 5, 50):
+            positions, distances = index.nearest(lat, lon, k, mask=mask)
+            np.testing.assert_allclose(distances, brute_nearest(lats, lons, lat, lon, k, mask), rtol=1e-12)
+            np.testing.assert_allclose(haversine(lat, lon, lats[positions], lons[positions]), distances)
+
+
+@pytest.fixture(scope='module')
+def city():
+    # Điểm dày trong một thành phố và vài điểm rải rác xa
+    rng = np.random.default_rng(0)
+    lats = np.concatenate([10.77 + rng.normal(0, 0.05, 3000), rng.uniform(-60, 60, 50)])
+    lons = np.concatenate([106.70 + rng.normal(0, 0.05, 3000), rng.uniform(-170, 170, 50)])
+    return lats, lons
+
+
+def test_matches_brute_force_in_a_city(city):
+    lats, lons = city
+    index = SpatialIndex(lats, lons)
+    rng = np.random.default_rng(1)
+    queries = [(10.77 + rng.normal(0, 0.05), 106.70 + rng.normal(0, 0.05), meters)
+               for meters in (50, 500, 2000, 20000) for _ in range(10)]
+    queries += [(0.0, 0.0, 1000), (48.85, 2.35, 5_000_000)]
+    check_queries(index, lats, lons, queries)
+
+
+def test_mask_filters_positions(city):
+    lats, lons = city
+    index = SpatialIndex(lats, lons)
+    mask = np.random.default_rng(2).random(len(lats)) < 0.3
+    check_queries(index, lats, lons, [(10.77, 106.70, 1000), (10.8, 106.6, 20000)], mask=mask)
+
+
+def test_points_and_queries_on_cell_boundaries():
+    # Lưới 0.01 độ bắt đầu từ điểm nhỏ nhất: mọi điểm nằm đúng trên cạnh ô
+    grid = np.arange(0, 0.2, 0.01)
+    lats, lons = (values.ravel() for values in np.meshgrid(10 + grid, 106 + grid))
+    index = SpatialIndex(lats, lons, cell_degrees=0.01)
+    queries = [(10.05, 106.05, meters) for meters in (0, 1, 1111.95, 1112, 5000)]
+    queries += [(10.0, 106.0, 1112), (10.19, 106.19, 3000), (9.99, 105.99, 2000)]
+    check_queries(index, lats, lons, queries)
+
+
+def test_across_the_antimeridian():
+    rng = np.random.default_rng(3)
+    lats = rng.uniform(-20, 20, 2000)
+    lons = np.concatenate([rng.uniform(179, 180, 1000), rng.uniform(-180, -179, 1000)])
+    index = SpatialIndex(lats, lons)
+    queries = [(0.0, 179.99, 5000), (0.0, -179.99, 5000), (5.0, 180.0, 50000), (-5.0, -180.0, 200000)]
+    check_queries(index, lats, lons, queries)
+
+
+def test_near_the_poles():
+    rng = np.random.default_rng(4)
+    lats = np.concatenate([rng.uniform(89.5, 90, 1000), rng.uniform(-90, -89.5, 1000)])
+    lons = rng.uniform(-180, 180, 2000)
+    index = SpatialIndex(lats, lons)
+    # Hình tròn chứa cực phủ mọi kinh độ
+    queries = [(89.9, 0.0, 20000), (89.99, 170.0, 5000), (-89.9, -90.0, 30000), (89.7, 45.0, 10000)]
+    check_queries(index, lats, lons, queries)
+
+
+def test_empty_index():
+    index = SpatialIndex([], [])
+    positions, distances = index.radius(10, 106, 1000)
+    assert len(positions) == 0 and len(distances) == 0
+    assert len(index.nearest(10, 106, 5)[0]) == 0
+
+
+def test_from_records_skips_invalid_coordinates():
+    records = [
+        {'locate': {'lat': 10.77, 'long': 106.70}},
+        {'locate': {'lat': '', 'long': ''}, 'geojson': {'coordinates': [106.71, 10.78]}},
+        {'locate': {'lat': 'x', 'long': 1}},
+        {'locate': {'lat': 91, 'long': 0}},
+        {},
+    ]
+    index = SpatialIndex.from_records(records)
+    assert sorted(index.positions.tolist()) == [0, 1]
+    assert index.nearest(10.78, 106.71, 1)[0].tolist() == [1]
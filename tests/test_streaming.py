@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from preprocessor.streaming import process_momo_stream
+from preprocessor.thodiamomo import process_momo
+
+EXPORT_PATH = 'preprocessor/ThoDiaMoMo_Version2.json'
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('batch_size', [1, 3, 4, 100])
+def test_stream_matches_process_momo(tmp_path, batch_size):
+    # Lô 3 dòng đầu có số điện thoại toàn chữ số, lô thứ hai có rating "0"
+    expected = process_momo(EXPORT_PATH, tmp_path / 'batch.json')
+    actual = process_momo_stream(EXPORT_PATH, tmp_path / 'stream.json', batch_size=batch_size)
+    assert read_bytes(actual) == read_bytes(expected)
+
+
+def test_stream_keeps_phone_leading_zero_and_float_rating(tmp_path):
+    with open(EXPORT_PATH, 'r', encoding='utf-8') as f:
+        rows = json.load(f)
+    input_path = tmp_path / 'export.json'
+    input_path.write_text(json.dumps([rows[0], rows[4]]), encoding='utf-8')
+    output_path = process_momo_stream(str(input_path), tmp_path / 'out.json', batch_size=1)
+    with open(output_path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    assert records[0]['phones'] == ['0973902690']
+    assert records[1]['avgRating'] == 0.0 and isinstance(records[1]['avgRating'], float)
+
+
+@pytest.mark.parametrize('suffix', ['.json', '.jsonl'])
+def test_stream_input_formats_match(tmp_path, suffix):
+    with open(EXPORT_PATH, 'r', encoding='utf-8') as f:
+        rows = json.load(f)
+    input_path = tmp_path / f'export{suffix}'
+    if suffix == '.jsonl':
+        input_path.write_text(''.join(json.dumps(row) + '\n' for row in rows), encoding='utf-8')
+    else:
+        input_path.write_text(json.dumps(rows), encoding='utf-8')
+    expected = process_momo(EXPORT_PATH, tmp_path / 'batch.json')
+    actual = process_momo_stream(str(input_path), tmp_path / 'stream.json', batch_size=3)
+    assert read_bytes(actual) == read_bytes(expected)
+
+
+def test_stream_skips_batches_emptied_by_validation(tmp_path):
+    # Cả lô thứ hai bị loại vì thiếu tên: không được để lại dấu phẩy thừa
+    with open(EXPORT_PATH, 'r', encoding='utf-8') as f:
+        rows = json.load(f)
+    rows = rows[:4] + [dict(row, name='') for row in rows[4:8]] + rows[8:]
+    input_path = tmp_path / 'export.json'
+    input_path.write_text(json.dumps(rows), encoding='utf-8')
+    expected = process_momo(str(input_path), tmp_path / 'batch.json')
+    actual = process_momo_stream(str(input_path), tmp_path / 'stream.json', batch_size=4)
+    with open(actual, 'r', encoding='utf-8') as f:
+        assert len(json.load(f)) == len(rows) - 4
+    assert read_bytes(actual) == read_bytes(expected)
+
+
+def test_stream_all_rows_invalid(tmp_path):
+    with open(EXPORT_PATH, 'r', encoding='utf-8') as f:
+        rows = [dict(row, name='') for row in json.load(f)[:3]]
+    input_path = tmp_path / 'export.json'
+    input_path.write_text(json.dumps(rows), encoding='utf-8')
+    for output_format in ('json', 'jsonl'):
+        actual = process_momo_stream(str(input_path), tmp_path / f'stream.{output_format}', batch_size=2,
+                                     output_format=output_format)
+        if output_format == 'json':
+            with open(actual, 'r', encoding='utf-8') as f:
+                assert json.load(f) == []
+        else:
+            assert read_bytes(actual) == b''
@@ -0,0 +1,51 @@
+import json
+
+import pandas as pd
+
+from common.models import PROCESSED_COLUMN_CHECKS, RecordError
+from preprocessor.thodiamomo import invalid_rows
+
+PROCESSED_PATH = 'preprocessor/ThoDiaMoMo_Version6.json'
+
+BROKEN_VALUES = {
+    'name': ['', '   ', None, 5],
+    'avgRating': [7.5, 'abc', -1],
+    'ratingCount': [1.5, -3],
+    'phones': ['0909', [1], ['0909', None]],
+    'imgs': [[None], 'x', [['nested']]],
+    'address': ['text', {'province': 1}, {'street': ['a']}],
+    'locate': [{'lat': 100.0, 'long': 0.0}, {'lat': 10.0, 'long': ''}, {'lat': '10.5', 'long': '106.1'},
+               {'lat': [1], 'long': [2]}, 'x'],
+    'openHour': [{'someday': []}, {'monday': [1]}],
+}
+
+
+def reference_invalid_rows(momo):
+    # Kiểm tra từng dòng, từng cột, không gộp giá trị trùng và không lọc nhanh
+    errors = {}
+    for column, check in PROCESSED_COLUMN_CHECKS.items():
+        if column not in momo.columns:
+            continue
+        for position, value in enumerate(momo[column].tolist()):
+            try:
+                check(value)
+            except RecordError as error:
+                errors.setdefault(position, str(error))
+    return errors
+
+
+def test_invalid_rows_matches_row_by_row_checks():
+    with open(PROCESSED_PATH, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    rows = list(records)
+    for column, values in BROKEN_VALUES.items():
+        for index, value in enumerate(values):
+            rows.append(dict(records[index % len(records)], **{column: value}))
+    # Các dòng hợp lệ có tọa độ số và tọa độ rỗng
+    rows.append(dict(records[0], locate={'lat': 10.5, 'long': 106.5}))
+    rows.append(dict(records[0], locate={'lat': '', 'long': ''}))
+    momo = pd.DataFrame(rows)
+
+    errors = {position: str(error) for position, error in invalid_rows(momo).items()}
+    assert errors == reference_invalid_rows(momo)
+    assert len(errors) == sum(map(len, BROKEN_VALUES.values()))